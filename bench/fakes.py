@@ -0,0 +1,148 @@
+"""Local stand-ins for the external APIs the bot talks to.
+
+One HTTP server answers for Telegram, DeepSeek, OpenAI, Textbelt, Twilio
+(voice, SMS and account lookups) and the translator health probe, routing
+on the request path. Every response can be delayed and a fraction of
+requests can fail, so the benchmark can model slow or flaky upstreams.
+"""
+import json
+import time
+import random
+import socket
+import itertools
+import multiprocessing
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BOT_USER = {
+    'id': 1000000001,
+    'is_bot': True,
+    'first_name': 'Jarvis',
+    'username': 'jarvis_bench_bot'
+}
+
+AI_ANSWER = "This is a canned answer from the local AI stand-in."
+
+
+def free_port() -> int:
+    """Ask the OS for an unused TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_handler(latency: float, error_rate: float):
+    """Build the request handler class with the given injected latency and errors."""
+    message_ids = itertools.count(1)
+
+    class FakeAPIHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _params(self) -> dict:
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length).decode('utf-8', 'replace') if length else ''
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                return json.loads(body or '{}')
+            return {key: values[0] for key, values in parse_qs(body).items()}
+
+        def _reply(self, status: int, payload: dict):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self.do_POST()
+
+        def do_POST(self):
+            params = self._params()
+            if latency:
+                time.sleep(latency)
+            if error_rate and random.random() < error_rate:
+                self._reply(500, {'ok': False, 'error': 'injected failure'})
+                return
+
+            path = self.path.split('?')[0]
+            if path.startswith('/telegram/'):
+                self._telegram(path.rsplit('/', 1)[-1], params)
+            elif path.startswith('/deepseek') or path.startswith('/openai'):
+                self._reply(200, {
+                    'choices': [{'message': {'role': 'assistant', 'content': AI_ANSWER}}],
+                    'usage': {'prompt_tokens': 120, 'completion_tokens': 12, 'total_tokens': 132}
+                })
+            elif path.startswith('/textbelt'):
+                self._reply(200, {'success': True, 'quotaRemaining': 1000, 'textId': str(next(message_ids))})
+            elif path.endswith('/Messages.json'):
+                self._reply(201, {'sid': f"SM{next(message_ids):032d}", 'status': 'queued'})
+            elif path.endswith('/Calls.json'):
+                self._reply(201, {
+                    'sid': f"CA{next(message_ids):032d}",
+                    'status': 'queued',
+                    'to': params.get('To'),
+                    'from': params.get('From')
+                })
+            elif '/Accounts/' in path and path.endswith('.json'):
+                self._reply(200, {'sid': path.rsplit('/', 1)[-1][:-5], 'status': 'active'})
+            elif path.startswith('/translate'):
+                self._reply(200, {'ok': True})
+            else:
+                self._reply(404, {'ok': False, 'error': f'unknown path {path}'})
+
+        def _telegram(self, method: str, params: dict):
+            if method == 'getMe':
+                self._reply(200, {'ok': True, 'result': BOT_USER})
+                return
+            if method in ('sendMessage', 'editMessageText', 'sendDocument'):
+                chat_id = params.get('chat_id', 0)
+                try:
+                    chat_id = int(json.loads(str(chat_id)))
+                except ValueError:
+                    chat_id = 0
+                self._reply(200, {'ok': True, 'result': {
+                    'message_id': int(params.get('message_id', 0) or next(message_ids)),
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'from': BOT_USER,
+                    'text': params.get('text', '')
+                }})
+                return
+            self._reply(200, {'ok': True, 'result': True})
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeAPIHandler
+
+
+def serve(port: int, latency: float, error_rate: float):
+    """Run the fake API server until the process is terminated."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(latency, error_rate))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def start_fake_server(latency: float = 0.0, error_rate: float = 0.0) -> tuple:
+    """Start the fake APIs in a separate process so they don't share the bot's GIL.
+
+    Returns:
+        tuple: (process, base_url)
+    """
+    port = free_port()
+    process = multiprocessing.get_context('spawn').Process(
+        target=serve, args=(port, latency, error_rate), name='fake-apis', daemon=True)
+    process.start()
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        process.terminate()
+        raise RuntimeError("Fake API server did not start")
+
+    return process, f'http://127.0.0.1:{port}'
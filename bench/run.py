@@ -0,0 +1,256 @@
+"""Offline load test: replay synthetic updates through the real handlers.
+
+Starts local stand-ins for every external API, points the bot at them via
+environment variables, builds the real application with ``build_application``
+and feeds it a stream of synthetic Telegram updates. Reports throughput,
+latency percentiles and memory, and can compare against a previous run.
+
+Usage:
+    python -m bench.run --updates 2000 --concurrency 50 --latency-ms 50
+    python -m bench.run --mix start=1,sms=2,text=5 --out after.json --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import statistics
+
+# Synthetic message templates per update kind
+MESSAGE_TEMPLATES = {
+    'start': '/start',
+    'help': '/help',
+    'health': '/health',
+    'sms': '/sms +15555550{n:03d} Benchmark message {n}',
+    'sms_twilio': '/sms +15555550{n:03d} Benchmark message {n} --provider twilio',
+    'call': '/call +15555550{n:03d} Benchmark call',
+    'ai': '/ai What is the capital of France? ({n})',
+    'stats': '/stats',
+    'text': 'Can you explain how photosynthesis works? ({n})',
+    'intent': 'please send sms to my friend ({n})',
+}
+
+DEFAULT_MIX = 'start=1,sms=2,call=1,ai=2,text=4'
+
+
+def parse_mix(value: str) -> list:
+    """Parse 'kind=weight,...' into [(kind, weight)]."""
+    mix = []
+    for part in value.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in MESSAGE_TEMPLATES:
+            raise argparse.ArgumentTypeError(
+                f"Unknown update kind '{kind}'. Available: {', '.join(MESSAGE_TEMPLATES)}")
+        mix.append((kind, float(weight or 1)))
+    return mix
+
+
+def make_update(update_id: int, kind: str, users: int) -> dict:
+    """Build the JSON of one synthetic Telegram message update."""
+    user_id = 100000 + update_id % users
+    text = MESSAGE_TEMPLATES[kind].format(n=update_id % 1000)
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'Bench', 'username': f'bench{user_id}'},
+        'text': text
+    }
+    if text.startswith('/'):
+        command_length = len(text.split()[0])
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': command_length}]
+    return {'update_id': update_id, 'message': message}
+
+
+def configure_environment(base_url: str, workdir: str):
+    """Point every external API at the fakes. Must run before importing bot modules."""
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': '123456:BENCHMARK',
+        'TELEGRAM_API_URL': f'{base_url}/telegram/bot',
+        'DEEPSEEK_API_KEY': 'bench',
+        'DEEPSEEK_API_URL': f'{base_url}/deepseek/v1/chat/completions',
+        'OPENAI_API_BASE': f'{base_url}/openai/v1',
+        'TEXTBELT_URL': f'{base_url}/textbelt/text',
+        'TEXTBELT_KEY': 'bench',
+        'TWILIO_ACCOUNT_SID': 'ACbenchmark',
+        'TWILIO_AUTH_TOKEN': 'bench',
+        'TWILIO_PHONE_NUMBER': '+15550000000',
+        'TWILIO_API_URL': base_url,
+        'TRANSLATOR_HEALTH_URL': f'{base_url}/translate',
+        'RATE_LIMIT_PER_MINUTE': '0',
+        'LOOP_MONITOR_ENABLED': 'false',
+    })
+    os.environ.setdefault('OPENAI_API_KEY', '')
+    # Logs and databases go to a scratch directory
+    os.chdir(workdir)
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def replay(updates: list, concurrency: int, verbose: bool = False) -> dict:
+    """Run the updates through the real application and time each one."""
+    from telegram import Update
+    from bot.main import build_application
+    from bot.metrics import HANDLER_LATENCY, OUTCOME_ERROR
+
+    if not verbose:
+        # Per-request INFO logs would dominate both the output and the timings
+        logging.disable(logging.INFO)
+
+    app = build_application(run_scheduler=False)
+    latencies = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process(data: dict, kind: str):
+        async with semaphore:
+            update = Update.de_json(data, app.bot)
+            start = time.perf_counter()
+            await app.process_update(update)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+
+    async with app:
+        started = time.perf_counter()
+        await asyncio.gather(*(process(data, kind) for kind, data in updates))
+        elapsed = time.perf_counter() - started
+
+    # The application swallows handler exceptions; the handler metrics record them
+    errors = sum(
+        count for (handler, outcome), (counts, total, count) in HANDLER_LATENCY.samples().items()
+        if outcome == OUTCOME_ERROR)
+    return {'elapsed': elapsed, 'latencies': latencies, 'errors': errors}
+
+
+def summarize(args, outcome: dict) -> dict:
+    """Build the result document for one run."""
+    all_latencies = [value for values in outcome['latencies'].values() for value in values]
+    total = len(all_latencies)
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        'timestamp': time.time(),
+        'config': {
+            'updates': args.updates,
+            'concurrency': args.concurrency,
+            'mix': args.mix,
+            'latency_ms': args.latency_ms,
+            'error_rate': args.error_rate,
+            'users': args.users,
+            'seed': args.seed
+        },
+        'updates_per_second': total / outcome['elapsed'] if outcome['elapsed'] else 0.0,
+        'elapsed_seconds': outcome['elapsed'],
+        'errors': outcome['errors'],
+        'latency_ms': {
+            'p50': percentile(all_latencies, 0.50) * 1000,
+            'p99': percentile(all_latencies, 0.99) * 1000,
+            'mean': statistics.fmean(all_latencies) * 1000 if all_latencies else 0.0
+        },
+        'per_kind': {
+            kind: {
+                'count': len(values),
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000
+            }
+            for kind, values in sorted(outcome['latencies'].items())
+        },
+        'max_rss_mb': max_rss_kb / 1024
+    }
+
+
+def format_results(results: dict, baseline: dict = None) -> str:
+    """Render the results, with deltas against a baseline run if given."""
+
+    def delta(key_path: tuple, higher_is_better: bool) -> str:
+        if not baseline:
+            return ''
+        old, new = baseline, results
+        for key in key_path:
+            old, new = old.get(key, {}), new.get(key, {})
+        if not old:
+            return ''
+        change = (new - old) / old * 100
+        better = change > 0 if higher_is_better else change < 0
+        return f"  ({change:+.1f}% {'better' if better else 'worse'})"
+
+    lines = [
+        f"Updates/sec: {results['updates_per_second']:.1f}{delta(('updates_per_second',), True)}",
+        f"p50 latency: {results['latency_ms']['p50']:.1f} ms{delta(('latency_ms', 'p50'), False)}",
+        f"p99 latency: {results['latency_ms']['p99']:.1f} ms{delta(('latency_ms', 'p99'), False)}",
+        f"Max RSS:     {results['max_rss_mb']:.1f} MB{delta(('max_rss_mb',), False)}",
+        f"Errors:      {results['errors']}",
+        "",
+        f"{'kind':<12} {'count':>6} {'p50 ms':>9} {'p99 ms':>9}"]
+    for kind, stats in results['per_kind'].items():
+        lines.append(f"{kind:<12} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv: list = None) -> int:
+    """Command-line entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for the bot")
+    parser.add_argument('--updates', type=int, default=1000, help="Number of updates to replay")
+    parser.add_argument('--concurrency', type=int, default=20, help="Updates processed at once")
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f"Weighted update kinds (default: {DEFAULT_MIX})")
+    parser.add_argument('--users', type=int, default=500, help="Distinct synthetic users")
+    parser.add_argument('--latency-ms', type=float, default=20.0,
+                        help="Latency injected into every fake API response")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Fraction of fake API requests that fail with HTTP 500")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for the update mix")
+    parser.add_argument('--out', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Previous results JSON to compare against")
+    parser.add_argument('--verbose', action='store_true', help="Keep the bot's INFO logging")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    kinds = rng.choices([kind for kind, _ in mix], weights=[weight for _, weight in mix], k=args.updates)
+    updates = [(kind, make_update(index + 1, kind, args.users)) for index, kind in enumerate(kinds)]
+
+    # Resolve output paths before changing into the scratch directory
+    out_path = os.path.abspath(args.out) if args.out else None
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, repo_root)
+
+    from bench.fakes import start_fake_server
+
+    fake_process, base_url = start_fake_server(args.latency_ms / 1000, args.error_rate)
+    try:
+        with tempfile.TemporaryDirectory(prefix='jarvis-bench-') as workdir:
+            configure_environment(base_url, workdir)
+            outcome = asyncio.run(replay(updates, args.concurrency, args.verbose))
+            os.chdir(repo_root)
+    finally:
+        fake_process.terminate()
+
+    results = summarize(args, outcome)
+    print(format_results(results, baseline))
+
+    if out_path:
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {out_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
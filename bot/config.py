@@ -5,13 +5,153 @@ load_dotenv()
 
 # Telegram Bot Configuration
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
 
 # SMS Provider Configuration
 # Textbelt
-TEXTBELT_URL = "https://textbelt.com/text"
+TEXTBELT_URL = os.getenv("TEXTBELT_URL", "https://textbelt.com/text")
 TEXTBELT_KEY = os.getenv("TEXTBELT_KEY", "textbelt")  # Default to demo key
 
 # Twilio
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+TWILIO_API_URL = os.getenv("TWILIO_API_URL", "https://api.twilio.com")
+
+# Voice call dispatch
+# Size of the thread pool used to run blocking Twilio REST calls off the event loop
+TWILIO_CALL_WORKERS = int(os.getenv("TWILIO_CALL_WORKERS", "8"))
+# /callbulk campaign limits
+CALL_BULK_CONCURRENCY = int(os.getenv("CALL_BULK_CONCURRENCY", "5"))
+CALL_BULK_RATE = float(os.getenv("CALL_BULK_RATE", "1"))  # calls per second
+CALL_BULK_MAX_NUMBERS = int(os.getenv("CALL_BULK_MAX_NUMBERS", "100"))
+
+# Phone number validation
+# Country calling code assumed for numbers given without '+' (e.g. "1" or "44");
+# leave empty to require full E.164 numbers
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "").lstrip("+")
+# Recently validated numbers kept in memory
+PHONE_CACHE_SIZE = int(os.getenv("PHONE_CACHE_SIZE", "4096"))
+
+# Scheduled SMS and calls
+SCHEDULER_DB = os.getenv("SCHEDULER_DB", "scheduled_jobs.db")
+# Timezone used to interpret --at times such as 09:00
+SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "UTC")
+# Shortest allowed --every interval, in seconds
+SCHEDULER_MIN_INTERVAL = int(os.getenv("SCHEDULER_MIN_INTERVAL", "60"))
+# Furthest ahead a job may be scheduled, and the longest --every interval, in days
+SCHEDULER_MAX_DAYS = int(os.getenv("SCHEDULER_MAX_DAYS", "366"))
+
+# User preference storage
+# Backend: sqlite (default), compact (every user held in compact arrays, backed by
+# SQLite) or json (legacy single-file store)
+PREFERENCE_BACKEND = os.getenv("PREFERENCE_BACKEND", "sqlite")
+PREFERENCE_DB = os.getenv("PREFERENCE_DB", "user_preferences.db")
+# Memory-mapped snapshot file for the compact backend; empty keeps it in memory only
+PREFERENCE_SNAPSHOT = os.getenv("PREFERENCE_SNAPSHOT", "")
+# Legacy JSON file; migrated into the SQLite store on first start
+LANG_FILE = os.getenv("LANG_FILE", "user_languages.json")
+# Number of recently active users whose language is kept in memory
+PREFERENCE_CACHE_SIZE = int(os.getenv("PREFERENCE_CACHE_SIZE", "10000"))
+
+# Shared state for multi-worker deployments
+# Backend: memory (single process), sqlite (workers on one host) or redis
+SHARED_BACKEND = os.getenv("SHARED_BACKEND", "memory")
+SHARED_DB = os.getenv("SHARED_DB", "shared_state.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Per-user limit on /sms, /call and /callbulk across all workers (0 disables)
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "10"))
+# Seconds a translated message is cached in the shared backend
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", "86400"))
+
+# Webhook workers (python -m bot.workers)
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "2"))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Public URL Telegram posts updates to
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+# How often the scheduler worker picks up jobs created by other workers
+SCHEDULER_POLL_INTERVAL = float(os.getenv("SCHEDULER_POLL_INTERVAL", "0"))
+# Seconds a cached user preference may be served before re-reading the store (0 = no expiry)
+PREFERENCE_CACHE_TTL = float(os.getenv("PREFERENCE_CACHE_TTL", "0"))
+
+# Administration and metrics
+# Comma-separated Telegram user IDs allowed to run admin commands
+ADMIN_USER_IDS = {
+    int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",")
+    if user_id.strip().isdigit()}
+# Local Prometheus endpoint port (0 disables); worker N listens on METRICS_PORT + N
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Request tracing
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+# Fraction of fast traces kept; traces slower than the threshold are always kept
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_SLOW_THRESHOLD_MS = float(os.getenv("TRACE_SLOW_THRESHOLD_MS", "1000"))
+
+# Event loop monitoring and profiling
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+# Stalls longer than this are logged with the blocking stack
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250"))
+# Longest /profile run an admin may request, in seconds
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# Health checks
+# Seconds a /health result is reused before dependencies are probed again
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "30"))
+# Per-dependency probe timeout in seconds
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "3"))
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 'text' for human-readable lines, 'json' for one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Fraction of INFO/DEBUG records kept per logger, e.g. "bot.messages=0.1,httpx=0.05";
+# warnings and errors are always kept
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (
+        item.partition("=") for item in os.getenv("LOG_SAMPLE_RATES", "bot.messages=0.1").split(","))
+    if name.strip() and rate.strip()}
+
+# Request and suggestion logs
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+# A log segment is sealed and compressed once it reaches this size or age
+LOG_SEGMENT_MAX_BYTES = int(os.getenv("LOG_SEGMENT_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_SEGMENT_MAX_AGE = int(os.getenv("LOG_SEGMENT_MAX_AGE", "86400"))
+# Sealed segments older than this are deleted (0 keeps them forever)
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "0"))
+# SQLite full-text index behind the admin /logs command
+LOG_SEARCH_DB = os.getenv("LOG_SEARCH_DB", os.path.join(LOG_DIR, "search.db"))
+# Seconds between background syncs of that index with the request log (0 = only on /logs)
+LOG_SEARCH_SYNC_INTERVAL = float(os.getenv("LOG_SEARCH_SYNC_INTERVAL", "60"))
+
+# Feature suggestion clustering
+SUGGESTION_DB = os.getenv("SUGGESTION_DB", os.path.join(LOG_DIR, "suggestions.db"))
+# Estimated Jaccard similarity above which a suggestion joins an existing cluster
+SUGGESTION_SIMILARITY = float(os.getenv("SUGGESTION_SIMILARITY", "0.5"))
+
+# Analytics export
+# Directory for nightly exports of the previous day's request log
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+# Local time (HH:MM) of the nightly export; empty disables it
+EXPORT_NIGHTLY_AT = os.getenv("EXPORT_NIGHTLY_AT", "")
+# 'parquet' (requires pyarrow) or 'csv'
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "parquet").lower()
+
+# AI prompt budgeting
+# Maximum tokens sent per AI request (system prompt + question, at least 128);
+# longer questions are trimmed
+AI_PROMPT_BUDGET = int(os.getenv("AI_PROMPT_BUDGET", "1024"))
+# Upper bound on max_tokens for any answer; short factual questions get less
+AI_MAX_TOKENS = int(os.getenv("AI_MAX_TOKENS", "500"))
+# USD per million input/output tokens, e.g. "deepseek-chat=0.27/1.10"; used for cost logging
+AI_PRICES = {
+    model.strip(): tuple(float(price) for price in prices.split("/", 1))
+    for model, _, prices in (
+        item.partition("=") for item in os.getenv(
+            "AI_PRICES", "deepseek-chat=0.27/1.10,gpt-3.5-turbo=0.50/1.50").split(","))
+    if model.strip() and "/" in prices}
@@ -0,0 +1,267 @@
+"""Columnar export of the request log for analytics.
+
+Streams entries from the log segments (see ``bot.logstore``) in fixed-size
+batches, so memory stays bounded however large the log is. Time filters
+use the segment index, so out-of-range segments are never decompressed.
+
+Parquet output (optional ``pyarrow`` package) stores timestamps as a typed
+column, dictionary-encodes the low-cardinality ``username`` and ``intent``
+columns and compresses with zstd; ``pandas.read_parquet`` loads it
+directly. Without pyarrow, ``csv`` writes gzip-compressed CSV.
+
+Usage:
+    python -m bot.export --out requests.parquet --last 30d
+    python -m bot.export --out requests.csv.gz --since 2026-10-01 --until 2026-10-08
+"""
+import os
+import sys
+import csv
+import gzip
+import asyncio
+import logging
+import argparse
+import importlib.util
+from datetime import datetime, timedelta
+from bot.config import EXPORT_DIR, EXPORT_NIGHTLY_AT, EXPORT_FORMAT
+from bot.logstore import get_log
+from bot.scheduler import parse_duration
+from bot.log_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+FORMAT_PARQUET = 'parquet'
+FORMAT_CSV = 'csv'
+FORMAT_EXTENSIONS = {FORMAT_PARQUET: '.parquet', FORMAT_CSV: '.csv.gz'}
+
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+DEFAULT_BATCH_SIZE = 50000
+COLUMNS = ('timestamp', 'user_id', 'username', 'intent', 'message', 'response')
+
+
+class ExportWriter:
+    """Base class for streaming export writers."""
+
+    def write_batch(self, batch: dict) -> None:
+        """Write one batch given as {column: list of values}."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+class ParquetExportWriter(ExportWriter):
+    """Parquet writer with typed timestamps and dictionary-encoded strings."""
+
+    def __init__(self, path: str):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError(
+                "Parquet export requires the 'pyarrow' package (pip install pyarrow); "
+                "use --format csv otherwise")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = pa.schema([
+            ('timestamp', pa.timestamp('us')),
+            ('user_id', pa.int64()),
+            ('username', pa.dictionary(pa.int32(), pa.string())),
+            ('intent', pa.dictionary(pa.int32(), pa.string())),
+            ('message', pa.string()),
+            ('response', pa.string())
+        ])
+        self._writer = pq.ParquetWriter(
+            path, self.schema, compression='zstd',
+            use_dictionary=['username', 'intent'])
+
+    def write_batch(self, batch: dict) -> None:
+        pa = self._pa
+        arrays = [
+            pa.array(batch['timestamp'], pa.timestamp('us')),
+            pa.array(batch['user_id'], pa.int64()),
+            pa.array(batch['username'], pa.string()).dictionary_encode(),
+            pa.array(batch['intent'], pa.string()).dictionary_encode(),
+            pa.array(batch['message'], pa.string()),
+            pa.array(batch['response'], pa.string())
+        ]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class CSVExportWriter(ExportWriter):
+    """CSV writer, gzip-compressed for .gz paths; needs no extra packages."""
+
+    def __init__(self, path: str):
+        opener = gzip.open if path.endswith('.gz') else open
+        self._file = opener(path, 'wt', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write_batch(self, batch: dict) -> None:
+        self._writer.writerows(zip(*(
+            [value.isoformat() if value else '' for value in batch[column]]
+            if column == 'timestamp' else batch[column]
+            for column in COLUMNS)))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def create_writer(fmt: str, path: str) -> ExportWriter:
+    """Factory function to build the export writer for a format."""
+    if fmt == FORMAT_PARQUET:
+        return ParquetExportWriter(path)
+    if fmt == FORMAT_CSV:
+        return CSVExportWriter(path)
+    raise ValueError(f"Unknown export format: {fmt}. Available formats: parquet, csv")
+
+
+def format_for_path(path: str) -> str:
+    """Guess the export format from the output file name."""
+    return FORMAT_CSV if path.endswith(('.csv', '.csv.gz')) else FORMAT_PARQUET
+
+
+def _parse_timestamp(value: str):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def export_requests(
+        path: str,
+        fmt: str = None,
+        since: str = None,
+        until: str = None,
+        batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Stream request log entries in [since, until) into a columnar file.
+
+    The file is written under a temporary name and moved into place when
+    complete, so readers never see a partial export.
+
+    Returns:
+        int: Number of rows exported
+    """
+    fmt = fmt or format_for_path(path)
+    # Prefixed rather than suffixed so the writer still sees the .gz extension
+    directory, filename = os.path.split(path)
+    temp_path = os.path.join(directory, f".partial-{filename}")
+    writer = create_writer(fmt, temp_path)
+    batch = {column: [] for column in COLUMNS}
+    rows = 0
+
+    try:
+        for entry in get_log('requests').entries(since=since, until=until):
+            batch['timestamp'].append(_parse_timestamp(entry.get('timestamp')))
+            batch['user_id'].append(entry.get('user_id'))
+            batch['username'].append(entry.get('username'))
+            batch['intent'].append(entry.get('detected_intent'))
+            batch['message'].append(entry.get('message'))
+            batch['response'].append(entry.get('response'))
+            rows += 1
+            if len(batch['timestamp']) >= batch_size:
+                writer.write_batch(batch)
+                batch = {column: [] for column in COLUMNS}
+        if batch['timestamp'] or not rows:
+            writer.write_batch(batch)
+        writer.close()
+    except BaseException:
+        writer.close()
+        os.remove(temp_path)
+        raise
+
+    os.replace(temp_path, path)
+    logger.info(f"Exported {rows} request log entries to {path}")
+    return rows
+
+
+class NightlyExporter:
+    """Exports the previous day's requests to EXPORT_DIR once a day."""
+
+    def __init__(self, at: str = EXPORT_NIGHTLY_AT, directory: str = EXPORT_DIR,
+                 fmt: str = EXPORT_FORMAT):
+        self.at = datetime.strptime(at, '%H:%M').time() if at else None
+        self.directory = directory
+        self.fmt = fmt
+        self._task = None
+
+    def start(self):
+        """Start the daily export task on the running event loop."""
+        if self.at is None or self._task is not None:
+            return
+        if self.fmt == FORMAT_PARQUET and not PYARROW_AVAILABLE:
+            # Otherwise every nightly run would fail the same way
+            logger.warning("pyarrow is not installed; nightly exports will be written as CSV")
+            self.fmt = FORMAT_CSV
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Nightly request export scheduled at {self.at.strftime('%H:%M')}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def export_day(self, day) -> str:
+        """Export one calendar day unless its file already exists. Blocking."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"requests-{day.isoformat()}{FORMAT_EXTENSIONS[self.fmt]}")
+        if not os.path.exists(path):
+            start = datetime.combine(day, datetime.min.time())
+            export_requests(
+                path, self.fmt, start.isoformat(), (start + timedelta(days=1)).isoformat())
+        return path
+
+    async def _run(self):
+        while True:
+            now = datetime.now()
+            next_run = datetime.combine(now.date(), self.at)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            await asyncio.sleep((next_run - now).total_seconds())
+            try:
+                await asyncio.to_thread(self.export_day, next_run.date() - timedelta(days=1))
+            except Exception as e:
+                logger.error(f"Nightly request export failed: {e}", exc_info=True)
+
+
+nightly_exporter = NightlyExporter()
+
+
+def main(argv: list = None) -> int:
+    """Command-line entry point for exports."""
+    parser = argparse.ArgumentParser(description="Export the request log to a columnar file")
+    parser.add_argument('--out', required=True, help="Output file (.parquet or .csv.gz)")
+    parser.add_argument('--format', choices=(FORMAT_PARQUET, FORMAT_CSV),
+                        help="Output format (default: from the file extension)")
+    parser.add_argument('--since', help="Only entries at or after this ISO date/time")
+    parser.add_argument('--until', help="Only entries before this ISO date/time")
+    parser.add_argument('--last', help="Only entries from this recent period, e.g. 7d")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows buffered per write")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    try:
+        since = args.since
+        if args.last:
+            seconds = parse_duration(args.last)
+            try:
+                since = (datetime.now() - timedelta(seconds=seconds)).isoformat()
+            except OverflowError:
+                raise ValueError(f"Duration too long: {args.last}")
+        rows = export_requests(args.out, args.format, since, args.until, max(1, args.batch_size))
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {rows} rows to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Admin-only commands for operating the bot."""
+import io
+import asyncio
+import logging
+import functools
+from telegram import Update
+from telegram.ext import ContextTypes
+from bot.config import ADMIN_USER_IDS, PROFILE_MAX_SECONDS
+from bot.metrics import format_summary
+from bot.tracing import TRACE_BUFFER, format_trace_summary
+from bot.profiling import sample_profile, format_profile
+from bot.logsearch import search_logs, format_results
+from bot.suggestions import get_suggestion_clusters, format_report
+
+logger = logging.getLogger(__name__)
+
+# Only one profile may run at a time
+_profile_lock = asyncio.Lock()
+
+
+def is_admin(user_id: int) -> bool:
+    """Check whether the user is listed in ADMIN_USER_IDS."""
+    return user_id in ADMIN_USER_IDS
+
+
+def admin_only(callback):
+    """Restrict a command handler to admins."""
+
+    @functools.wraps(callback)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if not user or not is_admin(user.id):
+            logger.warning(
+                f"Unauthorized admin command attempt by {user.id if user else 'unknown'}")
+            await update.message.reply_text("⛔ This command is restricted to administrators.")
+            return
+        return await callback(update, context)
+
+    return wrapper
+
+
+@admin_only
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show latency and outcome metrics for handlers, intents and providers."""
+    # Telegram rejects messages longer than 4096 characters
+    await update.message.reply_text(format_summary()[:4000])
+
+
+@admin_only
+async def traces_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the slowest recent traces and attach all buffered traces as JSON."""
+    await update.message.reply_text(format_trace_summary()[:4000])
+
+    if TRACE_BUFFER.traces():
+        document = io.BytesIO(TRACE_BUFFER.export_json().encode('utf-8'))
+        await update.message.reply_document(document=document, filename='traces.json')
+
+
+@admin_only
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Run the sampling profiler for a few seconds and send the hottest functions."""
+    try:
+        seconds = float(context.args[0]) if context.args else 10.0
+    except ValueError:
+        await update.message.reply_text("❌ Usage: /profile <seconds>")
+        return
+    seconds = min(max(seconds, 1.0), PROFILE_MAX_SECONDS)
+
+    if _profile_lock.locked():
+        await update.message.reply_text("⏳ A profile is already running.")
+        return
+
+    async with _profile_lock:
+        await update.message.reply_text(f"🔬 Profiling for {seconds:g} seconds...")
+        profile = await asyncio.to_thread(sample_profile, seconds)
+
+    report = io.BytesIO(format_profile(profile).encode('utf-8'))
+    await update.message.reply_document(
+        document=report,
+        filename='profile.txt',
+        caption=f"🔬 {profile['samples']} samples over {seconds:g} s")
+
+
+@admin_only
+async def logs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Search the request log, e.g. /logs user:12345 intent:sms last:7d refund."""
+    if not context.args:
+        await update.message.reply_text(
+            "🔎 Usage: /logs [user:<id|@name>] [intent:<name>] [last:7d] "
+            "[since:YYYY-MM-DD] [until:YYYY-MM-DD] [limit:n] [words...]\n"
+            "Example: /logs user:12345 intent:sms last:7d")
+        return
+
+    try:
+        result = await asyncio.to_thread(search_logs, ' '.join(context.args))
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+
+    # Telegram rejects messages longer than 4096 characters
+    await update.message.reply_text(format_results(result)[:4000])
+
+
+def _suggestion_report(limit: int) -> str:
+    clusters = get_suggestion_clusters()
+    return format_report(clusters.top(limit), clusters.totals())
+
+
+@admin_only
+async def suggestions_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the most frequent clusters of near-duplicate feature suggestions."""
+    try:
+        limit = int(context.args[0]) if context.args else 10
+    except ValueError:
+        await update.message.reply_text("❌ Usage: /suggestions [count]")
+        return
+    limit = min(max(limit, 1), 30)
+
+    report = await asyncio.to_thread(_suggestion_report, limit)
+    await update.message.reply_text(report[:4000])
@@ -1,9 +1,24 @@
 import os
+import math
+import time
+import asyncio
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from telegram import Update
 from telegram.ext import ContextTypes
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
+from telegram.helpers import escape_markdown
+from bot.config import (
+    TWILIO_API_URL,
+    TWILIO_CALL_WORKERS,
+    CALL_BULK_CONCURRENCY,
+    CALL_BULK_RATE,
+    CALL_BULK_MAX_NUMBERS)
+from bot.scheduler import scheduler, extract_schedule_args, format_run_at, JOB_CALL
+from bot.shared import is_rate_limited, increment_counter
+from bot.metrics import track_provider, OUTCOME_FAILED
+from bot.phone import normalize_phone, validate_numbers, PhoneNumberError
+from bot.handlers.admin import admin_only
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,6 +28,14 @@ TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
 
+# Minimum seconds between progress edits of a /callbulk status message
+BULK_PROGRESS_INTERVAL = 2.0
+
+# Shared pool for blocking Twilio REST requests so they never run on the event loop
+_call_executor = ThreadPoolExecutor(
+    max_workers=TWILIO_CALL_WORKERS,
+    thread_name_prefix='twilio-call')
+
 
 class TwilioCallHandler:
     """Handler for Twilio voice call operations."""
@@ -22,7 +45,10 @@ class TwilioCallHandler:
         self.client = None
         if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
             try:
+                from twilio.rest import Client
+
                 self.client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+                self.client.api.base_url = TWILIO_API_URL
                 logger.info("Twilio client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Twilio client: {e}")
@@ -30,15 +56,25 @@ class TwilioCallHandler:
             logger.warning("Twilio credentials not configured")
 
     def make_call(self, to_number: str, message: str = None) -> dict:
+        """Make an outgoing voice call, recording latency and outcome metrics."""
+        with track_provider('call', 'twilio') as tracked:
+            result = self._make_call(to_number, message)
+            if not result['success']:
+                tracked.outcome = OUTCOME_FAILED
+        return result
+
+    def _make_call(self, to_number: str, message: str = None) -> dict:
         """Make an outgoing voice call using Twilio.
 
         Args:
-            to_number: The phone number to call (E.164 format: +1234567890)
+            to_number: The phone number to call (E.164 format: +12025550123)
             message: Optional custom message to play during call
 
         Returns:
             dict: Call status information including call_sid, status, and error if any
         """
+        from twilio.base.exceptions import TwilioRestException
+
         if not self.client:
             return {
                 'success': False,
@@ -68,7 +104,7 @@ class TwilioCallHandler:
                 twiml=twiml
             )
 
-            logger.info(f"Call initiated successfully. SID: {call.sid}")
+            logger.info("Call initiated successfully. SID: %s", call.sid)
             return {
                 'success': True,
                 'call_sid': call.sid,
@@ -96,17 +132,112 @@ class TwilioCallHandler:
                 'status': 'failed'
             }
 
+    async def make_call_async(self, to_number: str, message: str = None) -> dict:
+        """Make an outgoing voice call without blocking the event loop.
+
+        The synchronous Twilio request runs on the shared call thread pool.
+
+        Args:
+            to_number: The phone number to call (E.164 format: +12025550123)
+            message: Optional custom message to play during call
+
+        Returns:
+            dict: Same structure as :meth:`make_call`
+        """
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context so the call is traced under its handler
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            _call_executor, context.run, self.make_call, to_number, message)
+
+
+class CallRateLimiter:
+    """Spaces out call starts so no more than ``rate`` calls begin per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self) -> None:
+        """Sleep until the next free call slot."""
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+_twilio_handler = None
 
-# Initialize the handler
-twilio_handler = TwilioCallHandler()
+
+def get_twilio_handler() -> TwilioCallHandler:
+    """Return the shared call handler, creating the Twilio client on first use."""
+    global _twilio_handler
+    if _twilio_handler is None:
+        _twilio_handler = TwilioCallHandler()
+    return _twilio_handler
+
+
+async def run_call_campaign(
+        numbers: list,
+        message: str = None,
+        concurrency: int = CALL_BULK_CONCURRENCY,
+        rate: float = CALL_BULK_RATE,
+        on_progress=None) -> dict:
+    """Place calls to many numbers with bounded concurrency and call rate.
+
+    Args:
+        numbers: Phone numbers to call; normalized to E.164 and deduplicated
+        message: Optional custom message to play during each call
+        concurrency: Maximum number of calls being placed at once
+        rate: Maximum number of calls started per second
+        on_progress: Optional coroutine function called with the running
+            totals after each call completes
+
+    Returns:
+        dict: Aggregate totals (total, completed, succeeded, failed) and a
+        mapping of failed numbers to their error
+    """
+    # Malformed numbers fail up front and never reach Twilio
+    numbers, invalid = validate_numbers(numbers)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = CallRateLimiter(rate)
+    totals = {
+        'total': len(numbers) + len(invalid),
+        'completed': len(invalid),
+        'succeeded': 0,
+        'failed': len(invalid),
+        'errors': dict(invalid)
+    }
+
+    async def place(number: str):
+        async with semaphore:
+            await limiter.wait()
+            result = await get_twilio_handler().make_call_async(number, message)
+
+        totals['completed'] += 1
+        if result['success']:
+            totals['succeeded'] += 1
+        else:
+            totals['failed'] += 1
+            totals['errors'][number] = result['error']
+
+        if on_progress:
+            await on_progress(totals)
+
+    await asyncio.gather(*(place(number) for number in numbers))
+    return totals
 
 
 async def call(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /call command with Twilio voice call integration.
 
     Usage:
-        /call +1234567890
-        /call +1234567890 Custom message to play during the call
+        /call +12025550123
+        /call +12025550123 Custom message to play during the call
+        /call +12025550123 Wake up --at 07:30 --every 1d
 
     Args:
         update: Incoming update from Telegram.
@@ -118,25 +249,63 @@ async def call(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             "❌ *Usage Error*\n\n"
             "Please provide a phone number to call.\n\n"
             "*Format:*\n"
-            "`/call +1234567890`\n"
-            "`/call +1234567890 Your custom message`\n\n"
-            "*Note:* Phone number must be in E.164 format (e.g., +1234567890)",
+            "`/call +12025550123`\n"
+            "`/call +12025550123 Your custom message`\n\n"
+            "*Note:* Phone number must be in E.164 format (e.g., +12025550123)",
             parse_mode='Markdown'
         )
         return
 
-    # Extract phone number and optional message
+    if is_rate_limited(update.effective_user.id, 'call'):
+        await update.message.reply_text(
+            "⏳ Too many requests. Please wait a minute and try again.")
+        return
+
+    # Extract phone number, schedule flags and optional message
     to_number = context.args[0]
-    custom_message = ' '.join(context.args[1:]) if len(
-        context.args) > 1 else None
+    try:
+        message_args, run_at, interval = extract_schedule_args(
+            context.args[1:])
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    custom_message = ' '.join(message_args) if message_args else None
+    # User text goes into Markdown replies; unescaped _ or * makes Telegram reject them
+    shown_message = escape_markdown(custom_message) if custom_message else 'Default greeting'
 
-    # Validate phone number format (basic validation)
-    if not to_number.startswith('+'):
+    # Normalize to E.164 and reject malformed numbers before contacting Twilio
+    try:
+        to_number = normalize_phone(to_number)
+    except PhoneNumberError as e:
         await update.message.reply_text(
             "❌ *Invalid Phone Number*\n\n"
-            f"The number `{to_number}` is not in valid E.164 format.\n\n"
+            f"{escape_markdown(str(e))}\n\n"
             "Phone numbers must start with '+' followed by country code and number.\n"
-            "Example: +1234567890",
+            "Example: +12025550123",
+            parse_mode='Markdown'
+        )
+        return
+
+    if run_at is not None:
+        try:
+            job_id = scheduler.add_job(
+                JOB_CALL,
+                run_at,
+                {'phone': to_number, 'message': custom_message},
+                chat_id=update.effective_chat.id,
+                user_id=update.effective_user.id,
+                interval=interval)
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+            return
+
+        repeat = f"*Repeats:* every {interval // 60} min\n" if interval else ""
+        await update.message.reply_text(
+            f"⏰ *Call Scheduled* (job #{job_id})\n\n"
+            f"*To:* `{to_number}`\n"
+            f"*At:* {format_run_at(run_at)}\n"
+            f"{repeat}"
+            f"*Message:* {shown_message}",
             parse_mode='Markdown'
         )
         return
@@ -145,12 +314,12 @@ async def call(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     status_message = await update.message.reply_text(
         "📞 *Initiating Call...*\n\n"
         f"*To:* `{to_number}`\n"
-        f"*Message:* {custom_message or 'Default greeting'}",
+        f"*Message:* {shown_message}",
         parse_mode='Markdown'
     )
 
     # Make the call
-    result = twilio_handler.make_call(to_number, custom_message)
+    result = await get_twilio_handler().make_call_async(to_number, custom_message)
 
     # Send response based on result
     if result['success']:
@@ -163,11 +332,10 @@ async def call(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             "The recipient should receive the call shortly.",
             parse_mode='Markdown'
         )
-        logger.info(
-            f"User {
-                update.effective_user.id} initiated call to {to_number}")
+        increment_counter('calls_placed')
+        logger.info("User %s initiated call to %s", update.effective_user.id, to_number)
     else:
-        error_details = f"*Error:* {result['error']}\n"
+        error_details = f"*Error:* {escape_markdown(str(result['error']))}\n"
         if 'error_code' in result:
             error_details += f"*Error Code:* {result['error_code']}\n"
 
@@ -185,3 +353,162 @@ async def call(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             f"Call failed for user {
                 update.effective_user.id}: {
                 result['error']}")
+
+
+def parse_bulk_args(args: list) -> tuple:
+    """Split /callbulk arguments into numbers, message and option overrides.
+
+    Numbers are the leading arguments starting with '+' (comma separated
+    lists are accepted); everything after them is the message.
+
+    Returns:
+        tuple: (numbers, message, concurrency, rate)
+    """
+    args = list(args)
+    options = {'--concurrency': CALL_BULK_CONCURRENCY, '--rate': CALL_BULK_RATE}
+
+    for flag, default in options.items():
+        if flag in args:
+            index = args.index(flag)
+            if index + 1 >= len(args):
+                raise ValueError(f"{flag} flag requires a value")
+            value = args[index + 1]
+            try:
+                parsed = type(default)(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for {flag}: {value}")
+            # nan slips through both the <= 0 check and min(); inf is no cap at all
+            if not math.isfinite(parsed):
+                raise ValueError(f"Invalid value for {flag}: {value}")
+            if parsed <= 0:
+                raise ValueError(f"{flag} must be greater than zero")
+            # The configured values are caps; flags may only lower them
+            options[flag] = min(parsed, default)
+            args = args[:index] + args[index + 2:]
+
+    numbers = []
+    while args and args[0].startswith('+'):
+        for number in args.pop(0).split(','):
+            if number and number not in numbers:
+                numbers.append(number)
+
+    message = ' '.join(args) or None
+    return numbers, message, options['--concurrency'], options['--rate']
+
+
+def format_campaign_progress(totals: dict, finished: bool = False) -> str:
+    """Render the aggregate progress of a call campaign."""
+    header = "✅ *Call Campaign Finished*" if finished else "📞 *Call Campaign Running...*"
+    text = (
+        f"{header}\n\n"
+        f"*Progress:* {totals['completed']}/{totals['total']}\n"
+        f"*Succeeded:* {totals['succeeded']}\n"
+        f"*Failed:* {totals['failed']}"
+    )
+
+    if finished and totals['errors']:
+        text += "\n\n*Failures:*"
+        for number, error in list(totals['errors'].items())[:10]:
+            text += f"\n• `{number}`: {escape_markdown(str(error))}"
+        if len(totals['errors']) > 10:
+            text += f"\n• ...and {len(totals['errors']) - 10} more"
+
+    return text
+
+
+@admin_only
+async def callbulk(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /callbulk command to call many numbers in one campaign.
+
+    Restricted to admins: one rate-limit hit here can place up to
+    CALL_BULK_MAX_NUMBERS calls.
+
+    Usage:
+        /callbulk +12025550123 +13125550187
+        /callbulk +12025550123,+13125550187 Custom message --concurrency 3 --rate 0.5
+
+    Args:
+        update: Incoming update from Telegram.
+        context: Context object for the callback.
+    """
+    if is_rate_limited(update.effective_user.id, 'call'):
+        await update.message.reply_text(
+            "⏳ Too many requests. Please wait a minute and try again.")
+        return
+
+    try:
+        numbers, custom_message, concurrency, rate = parse_bulk_args(
+            context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+
+    if not numbers:
+        await update.message.reply_text(
+            "❌ *Usage Error*\n\n"
+            "Please provide one or more phone numbers to call.\n\n"
+            "*Format:*\n"
+            "`/callbulk +12025550123 +13125550187`\n"
+            "`/callbulk +12025550123,+13125550187 Your custom message`\n\n"
+            "*Options:*\n"
+            f"`--concurrency N` - Parallel calls (max {CALL_BULK_CONCURRENCY})\n"
+            f"`--rate R` - Calls started per second (max {CALL_BULK_RATE:g})",
+            parse_mode='Markdown'
+        )
+        return
+
+    # Reject the whole campaign if any recipient is malformed, before any call is placed
+    numbers, invalid = validate_numbers(numbers)
+    if invalid:
+        text = f"❌ *{len(invalid)} invalid phone number(s)*, no calls were placed:\n"
+        for error in list(invalid.values())[:10]:
+            text += f"\n• {escape_markdown(error)}"
+        if len(invalid) > 10:
+            text += f"\n• ...and {len(invalid) - 10} more"
+        await update.message.reply_text(text, parse_mode='Markdown')
+        return
+
+    if len(numbers) > CALL_BULK_MAX_NUMBERS:
+        await update.message.reply_text(
+            f"❌ Too many numbers: {len(numbers)} (maximum {CALL_BULK_MAX_NUMBERS})"
+        )
+        return
+
+    shown_message = escape_markdown(custom_message) if custom_message else 'Default greeting'
+    status_message = await update.message.reply_text(
+        "📞 *Starting Call Campaign...*\n\n"
+        f"*Numbers:* {len(numbers)}\n"
+        f"*Concurrency:* {concurrency}\n"
+        f"*Rate:* {rate:g} calls/sec\n"
+        f"*Message:* {shown_message}",
+        parse_mode='Markdown'
+    )
+
+    last_edit = 0.0
+
+    async def report_progress(totals: dict):
+        nonlocal last_edit
+        now = time.monotonic()
+        if now - last_edit < BULK_PROGRESS_INTERVAL or totals['completed'] == totals['total']:
+            return
+        last_edit = now
+        try:
+            await status_message.edit_text(
+                format_campaign_progress(totals), parse_mode='Markdown')
+        except Exception as e:
+            logger.warning(f"Failed to update campaign progress: {e}")
+
+    totals = await run_call_campaign(
+        numbers, custom_message, concurrency, rate, report_progress)
+
+    try:
+        await status_message.edit_text(
+            format_campaign_progress(totals, finished=True), parse_mode='Markdown')
+    except Exception as e:
+        # Reporting is best effort; the calls have been placed regardless
+        logger.warning(f"Failed to report campaign result: {e}")
+    if totals['succeeded']:
+        increment_counter('calls_placed', totals['succeeded'])
+    logger.info(
+        f"User {update.effective_user.id} ran call campaign: "
+        f"{totals['succeeded']}/{totals['total']} succeeded")
@@ -0,0 +1,51 @@
+"""Handlers for listing and cancelling scheduled SMS and call jobs."""
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes
+from bot.scheduler import scheduler, format_run_at
+
+logger = logging.getLogger(__name__)
+
+
+async def jobs(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """List the user's pending scheduled jobs."""
+    pending = scheduler.list_jobs(update.effective_user.id)
+
+    if not pending:
+        await update.message.reply_text(
+            "📭 You have no scheduled jobs.\n\n"
+            "Schedule one with --at, --in or --every, e.g.\n"
+            "/sms +12025550123 Reminder --at 09:00 --every 1d"
+        )
+        return
+
+    lines = ["⏰ Scheduled jobs:\n"]
+    for job in pending:
+        payload = job['payload']
+        try:
+            when = format_run_at(job['run_at'])
+        except (ValueError, OverflowError, OSError):
+            # Stored before run times were bounded; still listed so it can be cancelled
+            when = "an invalid time"
+        line = f"#{job['id']} {job['kind'].upper()} to {payload['phone'][:4]}**** at {when}"
+        if job['interval']:
+            line += f" (every {job['interval'] // 60} min)"
+        lines.append(line)
+    lines.append("\nCancel with /canceljob <id>")
+
+    await update.message.reply_text('\n'.join(lines))
+
+
+async def canceljob(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Cancel one of the user's scheduled jobs."""
+    if not context.args or not context.args[0].lstrip('#').isdigit():
+        await update.message.reply_text(
+            "❌ Usage: /canceljob <id>\nUse /jobs to see your job IDs.")
+        return
+
+    job_id = int(context.args[0].lstrip('#'))
+    if scheduler.cancel_job(job_id, user_id=update.effective_user.id):
+        logger.info(f"User {update.effective_user.id} cancelled job {job_id}")
+        await update.message.reply_text(f"🗑️ Job #{job_id} cancelled.")
+    else:
+        await update.message.reply_text(f"❌ No scheduled job #{job_id} found.")
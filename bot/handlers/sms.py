@@ -1,9 +1,12 @@
 """Handler for sending SMS messages via multiple providers (Textbelt & Twilio)."""
 import logging
-import requests
 from telegram import Update
 from telegram.ext import ContextTypes
-from bot.config import TEXTBELT_URL, TEXTBELT_KEY, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER
+from bot.config import TEXTBELT_URL, TEXTBELT_KEY, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, TWILIO_API_URL
+from bot.scheduler import scheduler, extract_schedule_args, format_run_at, JOB_SMS
+from bot.shared import is_rate_limited, increment_counter
+from bot.metrics import track_provider, OUTCOME_FAILED
+from bot.phone import normalize_phone, PhoneNumberError
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +33,8 @@ class TextbeltProvider(SMSProvider):
 
     def send(self, phone_number: str, message: str) -> dict:
         """Send SMS via Textbelt API."""
+        import requests
+
         try:
             response = requests.post(
                 self.api_url,
@@ -84,6 +89,8 @@ class TwilioProvider(SMSProvider):
 
     def send(self, phone_number: str, message: str) -> dict:
         """Send SMS via Twilio API."""
+        import requests
+
         try:
             if not all([self.account_sid, self.auth_token, self.from_phone]):
                 return {
@@ -92,7 +99,7 @@ class TwilioProvider(SMSProvider):
                 }
 
             # Twilio REST API endpoint
-            url = f'https://api.twilio.com/2010-04-01/Accounts/{
+            url = f'{TWILIO_API_URL}/2010-04-01/Accounts/{
                 self.account_sid}/Messages.json'
 
             response = requests.post(
@@ -155,6 +162,15 @@ def get_provider(provider_name: str) -> SMSProvider:
     return provider_class()
 
 
+def send_sms(provider: SMSProvider, provider_name: str, phone_number: str, message: str) -> dict:
+    """Send an SMS through a provider, recording latency and outcome metrics."""
+    with track_provider('sms', provider_name.lower()) as tracked:
+        result = provider.send(phone_number, message)
+        if not result['success']:
+            tracked.outcome = OUTCOME_FAILED
+    return result
+
+
 async def sms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send an SMS message using multiple provider options.
 
@@ -164,11 +180,13 @@ async def sms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     Usage:
         /sms <phone_number> <message> [--provider textbelt|twilio]
+             [--at HH:MM | --in 30m] [--every 1d]
 
     Examples:
-        /sms +1234567890 Hello World
-        /sms +1234567890 Hello World --provider twilio
-        /sms +1234567890 Hello World --provider textbelt
+        /sms +12025550123 Hello World
+        /sms +12025550123 Hello World --provider twilio
+        /sms +12025550123 Hello World --provider textbelt
+        /sms +12025550123 Stand-up time --at 09:00 --every 1d
     """
 
     try:
@@ -178,13 +196,20 @@ async def sms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
                 "❌ Invalid usage\n\n"
                 "📱 Usage: /sms <phone_number> <message> [--provider textbelt|twilio]\n\n"
                 "📝 Examples:\n"
-                "  • /sms +1234567890 Hello World\n"
-                "  • /sms +1234567890 Hello World --provider twilio\n"
-                "  • /sms +1234567890 Hello World --provider textbelt\n\n"
-                "🔧 Available providers: textbelt (default), twilio"
+                "  • /sms +12025550123 Hello World\n"
+                "  • /sms +12025550123 Hello World --provider twilio\n"
+                "  • /sms +12025550123 Hello World --provider textbelt\n"
+                "  • /sms +12025550123 Reminder --at 09:00 --every 1d\n\n"
+                "🔧 Available providers: textbelt (default), twilio\n"
+                "⏰ Scheduling: --at HH:MM, --in 30m, --every 1d"
             )
             return
 
+        if is_rate_limited(update.effective_user.id, 'sms'):
+            await update.message.reply_text(
+                "⏳ Too many requests. Please wait a minute and try again.")
+            return
+
         # Parse arguments
         phone_number = context.args[0]
 
@@ -207,6 +232,14 @@ async def sms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             except ValueError:
                 pass  # --provider not found, use default
 
+        # Look for schedule flags (--at, --in, --every)
+        try:
+            message_args, run_at, interval = extract_schedule_args(
+                message_args)
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+            return
+
         # Join remaining args as message
         message_text = ' '.join(message_args)
 
@@ -214,15 +247,50 @@ async def sms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             await update.message.reply_text("❌ Message cannot be empty")
             return
 
-        # Validate phone number format
-        if not phone_number.startswith('+'):
+        # Normalize to E.164 and reject malformed numbers before contacting a provider
+        try:
+            phone_number = normalize_phone(phone_number)
+        except PhoneNumberError as e:
             await update.message.reply_text(
-                f"⚠️ Warning: Phone number should start with '+' (country code)\n"
-                f"Proceeding with: {phone_number}"
+                f"❌ Invalid phone number: {e}\n\n"
+                f"Use international format, e.g. +12025550123"
             )
+            return
+
+        if run_at is not None:
+            try:
+                get_provider(provider_name)
+            except ValueError as e:
+                await update.message.reply_text(f"❌ Error: {str(e)}")
+                return
+
+            try:
+                job_id = scheduler.add_job(
+                    JOB_SMS,
+                    run_at,
+                    {
+                        'phone': phone_number,
+                        'message': message_text,
+                        'provider': provider_name.lower()
+                    },
+                    chat_id=update.effective_chat.id,
+                    user_id=update.effective_user.id,
+                    interval=interval)
+            except ValueError as e:
+                await update.message.reply_text(f"❌ {e}")
+                return
+
+            response_text = f"⏰ SMS scheduled (job #{job_id})\n\n"
+            response_text += f"📱 Provider: {provider_name.upper()}\n"
+            response_text += f"📞 To: {phone_number[:4]}****\n"
+            response_text += f"🕒 At: {format_run_at(run_at)}\n"
+            if interval:
+                response_text += f"🔁 Repeats every {interval // 60} min\n"
+            response_text += "\nUse /jobs to list and /canceljob <id> to cancel."
+            await update.message.reply_text(response_text)
+            return
 
-        logger.info(
-            f"Attempting to send SMS via {provider_name} to {phone_number[:4]}****")
+        logger.info("Attempting to send SMS via %s to %s****", provider_name, phone_number[:4])
 
         # Send initial processing message
         status_msg = await update.message.reply_text(
@@ -242,7 +310,7 @@ async def sms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             return
 
         # Send the SMS
-        result = provider.send(phone_number, message_text)
+        result = send_sms(provider, provider_name, phone_number, message_text)
 
         # Format response based on result
         if result['success']:
@@ -263,8 +331,8 @@ async def sms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
                 response_text += f"\n📈 Status: {result['status']}"
 
             await status_msg.edit_text(response_text)
-            logger.info(
-                f"SMS sent successfully via {provider_name} to {phone_number[:4]}****")
+            increment_counter('sms_sent')
+            logger.info("SMS sent successfully via %s to %s****", provider_name, phone_number[:4])
         else:
             response_text = "❌ Failed to send SMS\n\n"
             response_text += f"📱 Provider: {provider_name.upper()}\n"
@@ -1,46 +1,61 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
-from deep_translator import GoogleTranslator
-import json
-import os
+import hashlib
+import logging
+from bot.config import TRANSLATION_CACHE_TTL
+from bot.preferences import get_preference_store
+from bot.shared import get_shared_backend
+from bot.metrics import track_provider
+from bot.tracing import span
 
-# User language preferences storage (in production, use a database)
-USER_LANGUAGES = {}
-LANG_FILE = "user_languages.json"
-
-# Load saved user language preferences
-if os.path.exists(LANG_FILE):
-    try:
-        with open(LANG_FILE, 'r') as f:
-            USER_LANGUAGES = json.load(f)
-    except BaseException:
-        pass
-
-
-def save_user_languages():
-    """Save user language preferences to file"""
-    try:
-        with open(LANG_FILE, 'w') as f:
-            json.dump(USER_LANGUAGES, f)
-    except BaseException:
-        pass
+logger = logging.getLogger(__name__)
 
 
 def get_user_language(user_id: int) -> str:
     """Get user's preferred language, default to English"""
-    return USER_LANGUAGES.get(str(user_id), 'en')
+    return get_preference_store().get_language(user_id) or 'en'
+
+
+def set_user_language(user_id: int, language: str) -> None:
+    """Save user's preferred language"""
+    get_preference_store().set_language(user_id, language)
 
 
 def translate_text(text: str, target_lang: str) -> str:
     """Translate text to target language"""
     if target_lang == 'en':
         return text
+
+    with span('translate_text', target_lang=target_lang):
+        return _translate_text(text, target_lang)
+
+
+def _translate_text(text: str, target_lang: str) -> str:
+    """Translate through the shared cache, falling back to Google Translate"""
+    # Translations are shared by all workers through the shared backend
+    cache_key = f"translation:{target_lang}:{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+    try:
+        cached = get_shared_backend().get(cache_key)
+        if cached is not None:
+            return cached
+    except Exception as e:
+        logger.warning(f"Translation cache lookup failed: {e}")
+
     try:
-        translator = GoogleTranslator(source='auto', target=target_lang)
-        return translator.translate(text)
+        from deep_translator import GoogleTranslator
+
+        with track_provider('translation', 'google'):
+            translator = GoogleTranslator(source='auto', target=target_lang)
+            translated = translator.translate(text)
     except BaseException:
         return text  # Return original text if translation fails
 
+    try:
+        get_shared_backend().set(cache_key, translated, ttl=TRANSLATION_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Translation cache store failed: {e}")
+    return translated
+
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command with multilingual support"""
@@ -136,8 +151,7 @@ Current language: {}""".format(current_lang)
         return
 
     # Save the new language preference
-    USER_LANGUAGES[str(user_id)] = new_lang
-    save_user_languages()
+    set_user_language(user_id, new_lang)
 
     success_msg = f"Language successfully changed to: {new_lang}\nAll bot messages will now be in your selected language!"
     translated_success = translate_text(success_msg, new_lang)
@@ -0,0 +1,239 @@
+"""Active health probes for the bot's external dependencies.
+
+Each probe makes one cheap, read-only request to a dependency (Telegram
+``getMe``, the AI providers' model lists, the Textbelt quota, the Twilio
+account, the translator front page) or checks local log storage. All
+probes run concurrently with a short timeout, and the combined result is
+cached so repeated ``/health`` commands share a single round of probes
+instead of multiplying upstream traffic.
+"""
+import os
+import time
+import shutil
+import asyncio
+import logging
+import httpx
+from bot.config import (
+    TEXTBELT_URL,
+    TEXTBELT_KEY,
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_API_URL,
+    HEALTH_CACHE_SECONDS,
+    HEALTH_PROBE_TIMEOUT)
+from bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Probe status values
+STATUS_OK = 'ok'
+STATUS_DOWN = 'down'
+STATUS_UNCONFIGURED = 'unconfigured'
+
+STATUS_ICONS = {
+    STATUS_OK: '✅',
+    STATUS_DOWN: '❌',
+    STATUS_UNCONFIGURED: '⚪'
+}
+
+TRANSLATOR_URL = os.getenv('TRANSLATOR_HEALTH_URL', 'https://translate.google.com/m')
+OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
+# Log storage is reported down below this much free disk space
+MIN_FREE_LOG_BYTES = 50 * 1024 * 1024
+# Textbelt's shared demo key; its small quota is per IP and often used up
+TEXTBELT_DEMO_KEY = 'textbelt'
+
+DEPENDENCY_UP = REGISTRY.gauge(
+    'jarvis_dependency_up',
+    'Whether the last health probe of a dependency succeeded (1), failed (0) or was skipped (-1)',
+    ('dependency',))
+DEPENDENCY_PROBE_LATENCY = REGISTRY.gauge(
+    'jarvis_dependency_probe_seconds',
+    'Duration of the last health probe of a dependency',
+    ('dependency',))
+
+
+class ProbeError(Exception):
+    """A dependency answered, but not the way a healthy one would."""
+
+
+class _RedactTextbeltKey(logging.Filter):
+    """Hide the Textbelt key in httpx's request log lines.
+
+    The quota endpoint only accepts the key in the URL path, and httpx logs
+    every request URL at INFO level.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                str(arg).replace(f"/quota/{TEXTBELT_KEY}", "/quota/***")
+                if '/quota/' in str(arg) else arg
+                for arg in record.args)
+        return True
+
+
+if TEXTBELT_KEY and TEXTBELT_KEY != TEXTBELT_DEMO_KEY:
+    logging.getLogger('httpx').addFilter(_RedactTextbeltKey())
+
+
+def _metric_label(name: str) -> str:
+    # 'AI - DeepSeek' -> 'ai_deepseek'
+    return '_'.join(name.lower().replace('-', ' ').split())
+
+
+def _raise_for_status(response, expected: tuple = (200,)):
+    if response.status_code not in expected:
+        raise ProbeError(f"HTTP {response.status_code}")
+
+
+async def probe_telegram(bot, client: httpx.AsyncClient) -> str:
+    me = await bot.get_me(read_timeout=HEALTH_PROBE_TIMEOUT, connect_timeout=HEALTH_PROBE_TIMEOUT)
+    return f"@{me.username}"
+
+
+async def probe_deepseek(bot, client: httpx.AsyncClient) -> str:
+    api_key = os.getenv('DEEPSEEK_API_KEY', '')
+    if not api_key:
+        return None
+    api_url = os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1/chat/completions')
+    models_url = api_url.rsplit('/chat/completions', 1)[0] + '/models'
+    response = await client.get(models_url, headers={'Authorization': f'Bearer {api_key}'})
+    _raise_for_status(response)
+    return "API key accepted"
+
+
+async def probe_openai(bot, client: httpx.AsyncClient) -> str:
+    api_key = os.getenv('OPENAI_API_KEY', '')
+    if not api_key:
+        return None
+    response = await client.get(
+        f"{OPENAI_API_BASE.rstrip('/')}/models", headers={'Authorization': f'Bearer {api_key}'})
+    _raise_for_status(response)
+    return "API key accepted"
+
+
+async def probe_textbelt(bot, client: httpx.AsyncClient) -> str:
+    quota_url = f"{TEXTBELT_URL.rsplit('/text', 1)[0]}/quota/{TEXTBELT_KEY}"
+    response = await client.get(quota_url)
+    _raise_for_status(response)
+    quota = response.json().get('quotaRemaining')
+    if TEXTBELT_KEY == TEXTBELT_DEMO_KEY:
+        return "reachable (demo key)"
+    if quota is not None and quota <= 0:
+        raise ProbeError("quota exhausted")
+    return f"{quota} messages left" if quota is not None else "reachable"
+
+
+async def probe_twilio(bot, client: httpx.AsyncClient) -> str:
+    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
+        return None
+    response = await client.get(
+        f"{TWILIO_API_URL.rstrip('/')}/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}.json",
+        auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN))
+    _raise_for_status(response)
+    status = response.json().get('status', 'unknown')
+    if status != 'active':
+        raise ProbeError(f"account {status}")
+    return "account active"
+
+
+async def probe_translator(bot, client: httpx.AsyncClient) -> str:
+    response = await client.get(TRANSLATOR_URL)
+    _raise_for_status(response)
+    return "reachable"
+
+
+def _check_log_storage(log_dir: str) -> str:
+    if not os.path.isdir(log_dir):
+        raise ProbeError(f"{log_dir}/ not found")
+    if not os.access(log_dir, os.W_OK):
+        raise ProbeError(f"{log_dir}/ not writable")
+    free = shutil.disk_usage(log_dir).free
+    if free < MIN_FREE_LOG_BYTES:
+        raise ProbeError(f"only {free // (1024 * 1024)} MB free")
+    return f"{free // (1024 * 1024 * 1024)} GB free"
+
+
+def make_log_storage_probe(log_dir: str):
+    """Build a probe that checks the log directory exists, is writable and has space."""
+
+    async def probe_log_storage(bot, client: httpx.AsyncClient) -> str:
+        return await asyncio.to_thread(_check_log_storage, log_dir)
+
+    return probe_log_storage
+
+
+class HealthChecker:
+    """Runs dependency probes concurrently and caches the combined result.
+
+    Concurrent callers while a round of probes is in flight wait for that
+    round rather than starting their own.
+    """
+
+    def __init__(self, probes: dict, cache_seconds: float = HEALTH_CACHE_SECONDS,
+                 timeout: float = HEALTH_PROBE_TIMEOUT):
+        self.probes = probes
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        self._result = None
+        self._inflight = None
+
+    async def check(self, bot) -> dict:
+        """Return the cached result if fresh, otherwise probe every dependency.
+
+        Returns:
+            dict: {'checked_at': float, 'results': {name: {'status', 'latency', 'detail'}}}
+        """
+        if self._result and time.time() - self._result['checked_at'] < self.cache_seconds:
+            return self._result
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._run(bot))
+            self._inflight.add_done_callback(self._clear_inflight)
+        # Shield so one caller's cancellation doesn't abort the shared round
+        return await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, task):
+        self._inflight = None
+
+    async def _run(self, bot) -> dict:
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
+            names = list(self.probes)
+            outcomes = await asyncio.gather(
+                *(self._probe(name, self.probes[name], bot, client) for name in names))
+        self._result = {'checked_at': time.time(), 'results': dict(zip(names, outcomes))}
+        return self._result
+
+    async def _probe(self, name: str, probe, bot, client) -> dict:
+        start = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(probe(bot, client), self.timeout)
+            status = STATUS_OK if detail is not None else STATUS_UNCONFIGURED
+        except asyncio.TimeoutError:
+            status, detail = STATUS_DOWN, f"timed out after {self.timeout:g} s"
+        except Exception as e:
+            status, detail = STATUS_DOWN, str(e) or type(e).__name__
+        latency = time.perf_counter() - start
+
+        if status == STATUS_DOWN:
+            logger.warning(f"Health probe {name} failed: {detail}")
+        label = _metric_label(name)
+        DEPENDENCY_UP.set({STATUS_OK: 1, STATUS_DOWN: 0}.get(status, -1), dependency=label)
+        if status != STATUS_UNCONFIGURED:
+            DEPENDENCY_PROBE_LATENCY.set(latency, dependency=label)
+        return {'status': status, 'latency': latency, 'detail': detail or 'not configured'}
+
+
+def format_health(result: dict) -> str:
+    """Render a health result as a Markdown chat message."""
+    age = time.time() - result['checked_at']
+    lines = ["🏥 **Health Check**\n"]
+    for name, probe in result['results'].items():
+        # Keep provider error text from breaking the Markdown
+        detail = ''.join('\\' + ch if ch in '*_`[' else ch for ch in probe['detail'])
+        line = f"{STATUS_ICONS[probe['status']]} **{name}:** {detail}"
+        if probe['status'] != STATUS_UNCONFIGURED:
+            line += f" ({probe['latency'] * 1000:.0f} ms)"
+        lines.append(line)
+    lines.append(f"\n_Checked {age:.0f} s ago_")
+    return '\n'.join(lines)
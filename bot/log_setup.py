@@ -0,0 +1,171 @@
+"""Queue-based logging pipeline with JSON output and per-logger sampling.
+
+Handlers on the event loop only drop records onto an in-process queue; a
+listener thread formats them and writes to stderr. Message formatting,
+JSON encoding and the stream write therefore happen off the hot path.
+
+High-volume loggers (the per-message ``bot.messages`` log, ``httpx``
+request lines) can be sampled with ``LOG_SAMPLE_RATES`` so that only a
+fraction of their INFO records are kept. Warnings and errors always pass.
+"""
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from bot.config import LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES
+from bot.tracing import current_trace_id
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'trace_id'}
+
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def __init__(self, static_fields: dict = None):
+        super().__init__()
+        self.static_fields = static_fields or {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **self.static_fields
+        }
+        if getattr(record, 'trace_id', None):
+            entry['trace_id'] = record.trace_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in N INFO/DEBUG records of each sampled logger.
+
+    Sampling is deterministic (every Nth record) rather than random, so a
+    rate of 0.1 keeps exactly one record in ten.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _rate_for(self, name: str):
+        # Most specific configured logger wins: 'httpx' also covers 'httpx._client'
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        if rate is None or rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        every = round(1 / rate)
+        with self._lock:
+            count = self._counts.get(record.name, 0)
+            self._counts[record.name] = count + 1
+        return count % every == 0
+
+
+class TraceContextFilter(logging.Filter):
+    """Attach the current trace ID while still on the calling thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        return True
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock ``prepare`` formats the message up front so records can be
+    pickled across processes. The queue here never leaves the process, so
+    the record is passed through untouched.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(
+        level: str = LOG_LEVEL,
+        fmt: str = LOG_FORMAT,
+        sample_rates: dict = None,
+        process_label: str = None) -> QueueListener:
+    """Route all logging through a queue and a background writer thread.
+
+    Replaces any handlers already on the root logger. Only the first call
+    configures the pipeline, so an entry point can set its own options
+    before importing modules that call this with the defaults.
+
+    Args:
+        level: Root log level name
+        fmt: 'text' or 'json'
+        sample_rates: {logger_name: fraction kept}; defaults to LOG_SAMPLE_RATES
+        process_label: Added to every line to tell worker processes apart
+
+    Returns:
+        QueueListener: The running listener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if fmt == 'json':
+        formatter = JSONFormatter({'process': process_label} if process_label else None)
+    else:
+        text_format = TEXT_FORMAT.replace(
+            '%(name)s', f'{process_label} - %(name)s') if process_label else TEXT_FORMAT
+        formatter = logging.Formatter(text_format)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _InProcessQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATES if sample_rates is None else sample_rates))
+    queue_handler.addFilter(TraceContextFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
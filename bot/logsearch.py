@@ -0,0 +1,350 @@
+"""Searchable SQLite index over the request log.
+
+Entries from the request log segments (see ``bot.logstore``) are copied
+into an SQLite table indexed by user, username, intent and time, with an
+FTS5 full-text index over the message and response. Ingestion is
+incremental: the byte offset reached in each segment is stored, so each
+sync reads only lines appended since the last one, and fully ingested
+sealed segments are never opened again. A background task syncs every
+``LOG_SEARCH_SYNC_INTERVAL`` seconds, so a query only has to ingest the
+last few lines.
+
+Queries combine field filters with free-text terms::
+
+    user:12345 intent:sms last:7d
+    user:@alice since:2026-10-01 until:2026-10-08 refund
+"""
+import os
+import gzip
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from bot.config import LOG_SEARCH_DB, LOG_RETENTION_DAYS, LOG_SEARCH_SYNC_INTERVAL
+from bot.logstore import get_log
+from bot.scheduler import parse_duration
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY,
+        ts TEXT NOT NULL,
+        user_id INTEGER,
+        username TEXT COLLATE NOCASE,
+        intent TEXT,
+        message TEXT,
+        response TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts)',
+    'CREATE INDEX IF NOT EXISTS entries_user_ts ON entries (user_id, ts)',
+    'CREATE INDEX IF NOT EXISTS entries_username_ts ON entries (username, ts)',
+    'CREATE INDEX IF NOT EXISTS entries_intent_ts ON entries (intent, ts)',
+    '''CREATE TABLE IF NOT EXISTS ingested (
+        segment TEXT PRIMARY KEY,
+        offset INTEGER NOT NULL,
+        done INTEGER NOT NULL DEFAULT 0
+    )''')
+
+FTS_SCHEMA = (
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+        message, response, content='entries', content_rowid='id')''',
+    '''CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+        INSERT INTO entries_fts (rowid, message, response)
+        VALUES (new.id, new.message, new.response);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+        INSERT INTO entries_fts (entries_fts, rowid, message, response)
+        VALUES ('delete', old.id, old.message, old.response);
+    END''')
+
+
+def parse_query(text: str) -> dict:
+    """Parse a /logs query into filters and free-text terms.
+
+    Recognized filters: ``user:<id|@username>``, ``intent:<name>``,
+    ``last:<duration>`` (e.g. 7d), ``since:<date>``, ``until:<date>`` and
+    ``limit:<n>``. Everything else is a full-text term.
+
+    Raises:
+        ValueError: If a filter value is malformed
+    """
+    query = {'terms': [], 'limit': DEFAULT_LIMIT}
+    for token in text.split():
+        key, sep, value = token.partition(':')
+        key = key.lower()
+        if not sep or not value or key not in ('user', 'intent', 'last', 'since', 'until', 'limit'):
+            query['terms'].append(token)
+        elif key == 'user':
+            if value.lstrip('-').isdigit():
+                query['user_id'] = int(value)
+            else:
+                query['username'] = value.lstrip('@')
+        elif key == 'intent':
+            query['intent'] = value.lower()
+        elif key == 'last':
+            seconds = parse_duration(value)
+            try:
+                query['since'] = (datetime.now() - timedelta(seconds=seconds)).isoformat()
+            except OverflowError:
+                raise ValueError(f"Duration too long: {value}")
+        elif key in ('since', 'until'):
+            try:
+                query[key] = datetime.fromisoformat(value).isoformat()
+            except ValueError:
+                raise ValueError(f"Invalid {key} date: {value}. Use YYYY-MM-DD or an ISO date-time")
+        elif key == 'limit':
+            if not value.isdigit():
+                raise ValueError(f"Invalid limit: {value}")
+            query['limit'] = min(max(int(value), 1), MAX_LIMIT)
+    return query
+
+
+def _fts_expression(terms: list) -> str:
+    # Quote each term so punctuation can't break FTS syntax; a trailing * keeps prefix search
+    parts = []
+    for term in terms:
+        prefix = term.endswith('*') and len(term) > 1
+        phrase = '"' + term.rstrip('*').replace('"', '""') + '"'
+        parts.append(phrase + '*' if prefix else phrase)
+    return ' '.join(parts)
+
+
+class LogSearchIndex:
+    """Incrementally synced SQLite index over one segmented log."""
+
+    def __init__(self, db_path: str = None, log=None):
+        self.db_path = db_path or LOG_SEARCH_DB
+        self.log = log or get_log('requests')
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        try:
+            for statement in FTS_SCHEMA:
+                self._db.execute(statement)
+            self.full_text = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5; fall back to substring matching
+            logger.warning(f"FTS5 unavailable, /logs text search will use LIKE: {e}")
+            self.full_text = False
+        self._db.commit()
+
+    def sync(self) -> int:
+        """Ingest entries appended to the log since the last sync.
+
+        Returns:
+            int: Number of new entries indexed
+        """
+        added = 0
+        with self._lock:
+            done = {
+                row[0] for row in self._db.execute('SELECT segment FROM ingested WHERE done = 1')}
+            segments = []
+            for path in self.log.segments():
+                segment = os.path.basename(path).split('.', 1)[0]
+                segments.append(segment)
+                if segment not in done:
+                    added += self._ingest(segment, path)
+            if segments:
+                # Retention deletes the oldest segments; names sort chronologically
+                self._db.execute('DELETE FROM ingested WHERE segment < ?', (min(segments),))
+                self._db.commit()
+            if added and LOG_RETENTION_DAYS:
+                cutoff = (datetime.now() - timedelta(days=LOG_RETENTION_DAYS)).isoformat()
+                self._db.execute('DELETE FROM entries WHERE ts < ?', (cutoff,))
+                self._db.commit()
+        if added:
+            logger.info(f"Indexed {added} new log entries")
+        return added
+
+    def _ingest(self, segment: str, path: str) -> int:
+        sealed = path.endswith('.gz')
+        # IMMEDIATE so two worker processes can't ingest the same lines twice
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._db.execute(
+                'SELECT offset, done FROM ingested WHERE segment = ?', (segment,)).fetchone()
+            offset, done = row if row else (0, 0)
+            if done:
+                self._db.rollback()
+                return 0
+
+            rows = []
+            opener = gzip.open if sealed else open
+            try:
+                with opener(path, 'rb') as f:
+                    # Offsets count uncompressed bytes, so they carry over when a segment is sealed
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            # Partially written line; pick it up next sync
+                            break
+                        offset += len(line)
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        rows.append((
+                            entry.get('timestamp', ''),
+                            entry.get('user_id'),
+                            entry.get('username'),
+                            entry.get('detected_intent'),
+                            entry.get('message'),
+                            entry.get('response')))
+            except FileNotFoundError:
+                # Renamed for sealing since it was listed; read it next sync
+                self._db.rollback()
+                return 0
+
+            self._db.executemany(
+                'INSERT INTO entries (ts, user_id, username, intent, message, response) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._db.execute(
+                'INSERT INTO ingested (segment, offset, done) VALUES (?, ?, ?) '
+                'ON CONFLICT(segment) DO UPDATE SET offset = excluded.offset, done = excluded.done',
+                (segment, offset, int(sealed)))
+            self._db.commit()
+            return len(rows)
+        except Exception:
+            self._db.rollback()
+            raise
+
+    def search(self, query: dict) -> dict:
+        """Run a parsed query, newest entries first.
+
+        Returns:
+            dict: total, entries (list of dicts), elapsed_ms
+        """
+        start = time.perf_counter()
+        where = []
+        params = []
+        if 'user_id' in query:
+            where.append('user_id = ?')
+            params.append(query['user_id'])
+        if 'username' in query:
+            where.append('username = ?')
+            params.append(query['username'])
+        if 'intent' in query:
+            where.append('intent = ?')
+            params.append(query['intent'])
+        if 'since' in query:
+            where.append('ts >= ?')
+            params.append(query['since'])
+        if 'until' in query:
+            where.append('ts < ?')
+            params.append(query['until'])
+        if query['terms']:
+            if self.full_text:
+                where.append('id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)')
+                params.append(_fts_expression(query['terms']))
+            else:
+                for term in query['terms']:
+                    where.append('(message LIKE ? OR response LIKE ?)')
+                    params.extend([f"%{term.rstrip('*')}%"] * 2)
+        clause = f"WHERE {' AND '.join(where)}" if where else ''
+
+        with self._lock:
+            total = self._db.execute(f'SELECT COUNT(*) FROM entries {clause}', params).fetchone()[0]
+            rows = self._db.execute(
+                f'SELECT ts, user_id, username, intent, message, response FROM entries {clause} '
+                f'ORDER BY ts DESC LIMIT ?', params + [query['limit']]).fetchall()
+
+        entries = [
+            dict(zip(('timestamp', 'user_id', 'username', 'intent', 'message', 'response'), row))
+            for row in rows]
+        return {
+            'total': total,
+            'entries': entries,
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def format_results(result: dict, width: int = 160) -> str:
+    """Render search results as plain chat text."""
+    if not result['total']:
+        return f"🔎 No matching log entries ({result['elapsed_ms']:.0f} ms)"
+
+    lines = [
+        f"🔎 {result['total']} matches, showing {len(result['entries'])} "
+        f"({result['elapsed_ms']:.0f} ms)\n"]
+    for entry in result['entries']:
+        when = entry['timestamp'][:16].replace('T', ' ')
+        lines.append(
+            f"• {when} — @{entry['username'] or 'unknown'} ({entry['user_id']}) "
+            f"[{entry['intent'] or '-'}]")
+        lines.append(f"  💬 {(entry['message'] or '')[:width]}")
+        lines.append(f"  🤖 {(entry['response'] or '')[:width]}")
+    return '\n'.join(lines)
+
+
+class LogSearchSyncer:
+    """Keeps the shared search index caught up with the request log."""
+
+    def __init__(self, interval: float = LOG_SEARCH_SYNC_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        """Start the periodic sync task on the running event loop."""
+        if not self.interval or self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Log search index syncing every {self.interval:g} seconds")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(lambda: get_log_search().sync())
+            except Exception as e:
+                logger.error(f"Log search sync failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_log_search() -> LogSearchIndex:
+    """Return the shared search index, creating it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LogSearchIndex()
+        return _index
+
+
+def search_logs(text: str) -> dict:
+    """Sync the index with the request log, then run a /logs query. Blocking.
+
+    With the background syncer running, only lines logged since its last
+    pass are ingested here.
+    """
+    query = parse_query(text)
+    index = get_log_search()
+    index.sync()
+    return index.search(query)
+
+
+log_search_syncer = LogSearchSyncer()
@@ -0,0 +1,390 @@
+"""Append-only, segmented request and suggestion logs.
+
+Each log is a directory of JSON-lines segments. New entries are appended to
+the open segment; once it reaches ``LOG_SEGMENT_MAX_BYTES`` or
+``LOG_SEGMENT_MAX_AGE`` it is sealed: gzip-compressed on a background
+thread and summarized in a sidecar ``index.json`` (time range, entry
+count, user IDs and intent counts per segment).
+
+Readers use the index to skip segments outside a time range or without a
+given user, and to answer totals without decompressing anything.
+Retention deletes whole segments by their indexed end time.
+
+Layout::
+
+    logs/requests/
+        index.json
+        requests-20261019T080000000000.jsonl.gz   (sealed)
+        requests-20261019T093012000000.jsonl      (open)
+"""
+import os
+import json
+import gzip
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from bot.config import (
+    LOG_DIR,
+    LOG_SEGMENT_MAX_BYTES,
+    LOG_SEGMENT_MAX_AGE,
+    LOG_RETENTION_DAYS)
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+OPEN_SUFFIX = '.jsonl'
+SEALING_SUFFIX = '.jsonl.sealing'
+SEALED_SUFFIX = '.jsonl.gz'
+SEGMENT_TIME_FORMAT = '%Y%m%dT%H%M%S%f'
+# A .sealing file untouched this long was abandoned by a crashed process
+STALE_SEAL_SECONDS = 300
+
+
+@contextmanager
+def log_file_lock(path: str):
+    """Hold an exclusive lock on a log file so worker processes don't clobber it."""
+    try:
+        import fcntl
+    except ImportError:
+        # No advisory locks on this platform; single-process use only
+        yield
+        return
+
+    with open(f"{path}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def summarize_entries(entries) -> dict:
+    """Build the index entry for a sequence of log entries."""
+    summary = {'start': None, 'end': None, 'count': 0, 'user_ids': set(), 'intents': {}}
+    for entry in entries:
+        timestamp = entry.get('timestamp')
+        if timestamp:
+            if summary['start'] is None or timestamp < summary['start']:
+                summary['start'] = timestamp
+            if summary['end'] is None or timestamp > summary['end']:
+                summary['end'] = timestamp
+        summary['count'] += 1
+        if entry.get('user_id') is not None:
+            summary['user_ids'].add(entry['user_id'])
+        intent = entry.get('detected_intent')
+        if intent:
+            summary['intents'][intent] = summary['intents'].get(intent, 0) + 1
+    summary['user_ids'] = sorted(summary['user_ids'])
+    return summary
+
+
+def _read_lines(path: str):
+    opener = gzip.open if path.endswith('.gz') else open
+    try:
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn write from a crash; skip it rather than lose the segment
+                    continue
+    except FileNotFoundError:
+        # Sealed or deleted by another process between listing and reading
+        return
+
+
+class SegmentedLog:
+    """One append-only log split into rotated, compressed segments."""
+
+    def __init__(
+            self,
+            directory: str,
+            name: str,
+            max_bytes: int = LOG_SEGMENT_MAX_BYTES,
+            max_age: int = LOG_SEGMENT_MAX_AGE,
+            retention_days: int = LOG_RETENTION_DAYS,
+            migrate_from: str = None):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention_days = retention_days
+        self.lock_path = os.path.join(directory, name)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._active = None
+        self._thread_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if migrate_from:
+            self.migrate_legacy(migrate_from)
+        # Finish seals interrupted by a crash or restart
+        for path in self._segments(SEALING_SUFFIX):
+            if time.time() - os.path.getmtime(path) > STALE_SEAL_SECONDS:
+                self._seal(path)
+
+    def _segment_path(self, started: datetime, suffix: str = OPEN_SUFFIX) -> str:
+        return os.path.join(
+            self.directory, f"{self.name}-{started.strftime(SEGMENT_TIME_FORMAT)}{suffix}")
+
+    def _segment_start(self, path: str) -> datetime:
+        stamp = os.path.basename(path)[len(self.name) + 1:].split('.', 1)[0]
+        return datetime.strptime(stamp, SEGMENT_TIME_FORMAT)
+
+    def _segments(self, suffix: str) -> list:
+        prefix = f"{self.name}-"
+        return sorted(
+            os.path.join(self.directory, filename)
+            for filename in os.listdir(self.directory)
+            if filename.startswith(prefix) and filename.endswith(suffix))
+
+    def _open_segment(self, now: datetime) -> str:
+        """Return the segment to append to, sealing the current one if it is full or old."""
+        active = self._active
+        if active is None or not os.path.exists(active):
+            # Another process may have opened or sealed a segment since we last looked
+            open_segments = self._segments(OPEN_SUFFIX)
+            active = open_segments[-1] if open_segments else None
+
+        if active is not None:
+            too_big = os.path.getsize(active) >= self.max_bytes
+            too_old = (now - self._segment_start(active)).total_seconds() >= self.max_age
+            if too_big or too_old:
+                sealing = active[:-len(OPEN_SUFFIX)] + SEALING_SUFFIX
+                os.replace(active, sealing)
+                threading.Thread(
+                    target=self._seal, args=(sealing,), name='log-sealer', daemon=True).start()
+                active = None
+
+        if active is None:
+            active = self._segment_path(now)
+        self._active = active
+        return active
+
+    def append(self, entry: dict) -> None:
+        """Append one entry to the open segment."""
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._thread_lock, log_file_lock(self.lock_path):
+            path = self._open_segment(datetime.now())
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def _seal(self, sealing_path: str) -> None:
+        """Compress a segment, record it in the index and apply retention."""
+        temp_path = None
+        try:
+            summary = summarize_entries(_read_lines(sealing_path))
+            sealed_path = sealing_path[:-len(SEALING_SUFFIX)] + SEALED_SUFFIX
+            # Compress to a private file: workers resuming the same stale seal at
+            # startup must never truncate a sealed segment readers are using
+            temp_path = f"{sealed_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(sealing_path, 'rb') as source, gzip.open(temp_path, 'wb') as target:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+            summary['bytes'] = os.path.getsize(temp_path)
+
+            with log_file_lock(self.index_path):
+                if not os.path.exists(sealing_path):
+                    # Another process finished this seal first
+                    os.remove(temp_path)
+                    return
+                os.replace(temp_path, sealed_path)
+                index = self.load_index()
+                index[os.path.basename(sealed_path)] = summary
+                os.remove(sealing_path)
+                index = self._apply_retention(index)
+                self._write_index(index)
+            logger.info(
+                f"Sealed log segment {os.path.basename(sealed_path)} "
+                f"({summary['count']} entries, {summary['bytes']} bytes)")
+        except FileNotFoundError:
+            # Another process sealed it while we were reading
+            self._remove_temp(temp_path)
+        except Exception as e:
+            self._remove_temp(temp_path)
+            logger.error(f"Failed to seal log segment {sealing_path}: {e}", exc_info=True)
+
+    @staticmethod
+    def _remove_temp(path: str) -> None:
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _apply_retention(self, index: dict) -> dict:
+        if not self.retention_days:
+            return index
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        for filename, summary in list(index.items()):
+            if summary.get('end') and summary['end'] < cutoff:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+                del index[filename]
+                logger.info(f"Deleted log segment {filename} past {self.retention_days}-day retention")
+        return index
+
+    def load_index(self) -> dict:
+        """{sealed segment filename: summary} for this log."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.error(f"Log index {self.index_path} is corrupt, rebuilding: {e}")
+            return self.rebuild_index()
+
+    def _write_index(self, index: dict) -> None:
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temp_path, self.index_path)
+
+    def rebuild_index(self) -> dict:
+        """Re-summarize every sealed segment; used when the index is lost or corrupt."""
+        index = {
+            os.path.basename(path): {
+                **summarize_entries(_read_lines(path)),
+                'bytes': os.path.getsize(path)}
+            for path in self._segments(SEALED_SUFFIX)}
+        self._write_index(index)
+        return index
+
+    def _snapshot(self) -> tuple:
+        """(index, unsealed segment paths) without double-counting a segment being sealed."""
+        # List unsealed segments before reading the index: a segment sealed in
+        # between then shows up in the index and its unsealed file is skipped
+        unsealed = self._segments(OPEN_SUFFIX) + self._segments(SEALING_SUFFIX)
+        index = self.load_index()
+        unsealed = [
+            path for path in unsealed
+            if os.path.basename(path).split('.', 1)[0] + SEALED_SUFFIX not in index]
+        return index, unsealed
+
+    def segments(self, since: str = None, until: str = None, user_id: int = None) -> list:
+        """Paths of segments that may hold matching entries, oldest first.
+
+        Sealed segments are filtered by their indexed time range and user
+        IDs; open segments are always included.
+
+        Args:
+            since: ISO timestamp lower bound (inclusive)
+            until: ISO timestamp upper bound (exclusive)
+            user_id: Only segments containing this user
+        """
+        index, unsealed = self._snapshot()
+        paths = []
+        for filename, summary in index.items():
+            if since and summary.get('end') and summary['end'] < since:
+                continue
+            if until and summary.get('start') and summary['start'] >= until:
+                continue
+            if user_id is not None and user_id not in summary.get('user_ids', ()):
+                continue
+            paths.append(os.path.join(self.directory, filename))
+        # Segment names start with their creation time, so this is chronological
+        return sorted(paths + unsealed, key=os.path.basename)
+
+    def read_segment(self, path: str):
+        """Iterate the entries of one segment returned by ``segments``."""
+        return _read_lines(path)
+
+    def entries(self, since: str = None, until: str = None, user_id: int = None):
+        """Iterate matching entries, reading only segments that can contain them."""
+        for path in self.segments(since, until, user_id):
+            for entry in _read_lines(path):
+                timestamp = entry.get('timestamp', '')
+                if since and timestamp < since:
+                    continue
+                if until and timestamp >= until:
+                    continue
+                if user_id is not None and entry.get('user_id') != user_id:
+                    continue
+                yield entry
+
+    def summary(self) -> dict:
+        """Totals across all segments: count, intents and time range.
+
+        Sealed segments come from the index; only unsealed ones are read.
+        """
+        total = {'count': 0, 'intents': {}, 'start': None, 'end': None, 'segments': 0}
+        index, unsealed = self._snapshot()
+        summaries = list(index.values())
+        for path in unsealed:
+            summaries.append(summarize_entries(_read_lines(path)))
+
+        for summary in summaries:
+            total['segments'] += 1
+            total['count'] += summary['count']
+            for intent, count in summary['intents'].items():
+                total['intents'][intent] = total['intents'].get(intent, 0) + count
+            if summary['start'] and (total['start'] is None or summary['start'] < total['start']):
+                total['start'] = summary['start']
+            if summary['end'] and (total['end'] is None or summary['end'] > total['end']):
+                total['end'] = summary['end']
+        return total
+
+    def migrate_legacy(self, path: str) -> int:
+        """Import a legacy JSON-array log as one sealed segment and rename it to <path>.migrated."""
+        with log_file_lock(self.lock_path):
+            # Checked under the lock so only one worker process migrates
+            if not os.path.exists(path):
+                return 0
+            return self._migrate_legacy(path)
+
+    def _migrate_legacy(self, path: str) -> int:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read legacy log {path}: {e}")
+            return 0
+        if not (isinstance(entries, list) and all(isinstance(entry, dict) for entry in entries)):
+            # Left in place for an operator to look at
+            logger.warning(f"Not migrating legacy log {path}: expected a JSON array of entries")
+            return 0
+
+        if entries:
+            started = entries[0].get('timestamp')
+            try:
+                started = datetime.fromisoformat(started)
+            except (TypeError, ValueError):
+                started = datetime.now()
+            sealing = self._segment_path(started, SEALING_SUFFIX)
+            with open(sealing, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._seal(sealing)
+
+        try:
+            os.replace(path, f"{path}.migrated")
+        except OSError as e:
+            logger.warning(f"Could not rename migrated log {path}: {e}")
+
+        logger.info(f"Migrated {len(entries)} entries from {path} into {self.directory}")
+        return len(entries)
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_log(name: str) -> SegmentedLog:
+    """Return the shared segmented log with this name, e.g. 'requests'."""
+    with _logs_lock:
+        log = _logs.get(name)
+        if log is None:
+            log = _logs[name] = SegmentedLog(
+                os.path.join(LOG_DIR, name),
+                name,
+                migrate_from=os.path.join(LOG_DIR, f"{name}.json"))
+        return log
@@ -1,47 +1,80 @@
+from bot import startup
 import logging
 import os
-import json
+import asyncio
+import importlib.util
 from datetime import datetime
 from telegram import Update
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
-from bot.config import TOKEN
-from bot.handlers.call import call
+from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, TypeHandler, filters, ContextTypes
+from bot.config import TOKEN, TELEGRAM_API_URL, METRICS_PORT, METRICS_HOST, LOOP_MONITOR_ENABLED, LOG_DIR
+from bot.handlers.call import call, callbulk
 from bot.handlers.sms import sms
 from bot.handlers.start import start, setlang
-
-# AI imports
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-
-try:
-    import requests
-    REQUESTS_AVAILABLE = True
-except ImportError:
-    REQUESTS_AVAILABLE = False
-
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+from bot.handlers.jobs import jobs, canceljob
+from bot.scheduler import scheduler
+from bot.shared import get_counter
+from bot.handlers.admin import (
+    metrics_command,
+    traces_command,
+    profile_command,
+    logs_command,
+    suggestions_command)
+from bot.profiling import loop_monitor
+from bot.metrics import (
+    INTENTS,
+    OUTCOME_FAILED,
+    instrument_handler,
+    track_provider,
+    start_metrics_server)
+from bot.tracing import span, traced_handler, TracingRequest
+from bot.log_setup import setup_logging
+from bot.logstore import get_log
+from bot.suggestions import get_suggestion_clusters
+from bot.export import nightly_exporter
+from bot.logsearch import log_search_syncer
+from bot.preferences import close_preference_store
+from bot.prompting import build_prompt, record_usage, check_prompt_budget
+from bot.health import (
+    HealthChecker,
+    format_health,
+    make_log_storage_probe,
+    probe_deepseek,
+    probe_openai,
+    probe_telegram,
+    probe_textbelt,
+    probe_translator,
+    probe_twilio)
+
+# AI client libraries are imported on first use to keep startup fast
+OPENAI_AVAILABLE = importlib.util.find_spec('openai') is not None
+REQUESTS_AVAILABLE = importlib.util.find_spec('requests') is not None
+
+setup_logging()
 logger = logging.getLogger(__name__)
+# Per-message lines are high volume; sampled via LOG_SAMPLE_RATES
+message_logger = logging.getLogger('bot.messages')
+startup.mark(startup.PHASE_IMPORTS)
 
 # AI Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY', '')
-DEEPSEEK_API_URL = 'https://api.deepseek.com/v1/chat/completions'
-
-# Logging configuration
-LOG_DIR = 'logs'
-REQUESTS_LOG = os.path.join(LOG_DIR, 'requests.json')
-SUGGESTIONS_LOG = os.path.join(LOG_DIR, 'suggestions.json')
+DEEPSEEK_API_URL = os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1/chat/completions')
 
 # Create logs directory if it doesn't exist
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
+# Dependency probes behind /health, in display order
+health_checker = HealthChecker({
+    'Telegram API': probe_telegram,
+    'AI - DeepSeek': probe_deepseek,
+    'AI - OpenAI': probe_openai,
+    'Textbelt': probe_textbelt,
+    'Twilio': probe_twilio,
+    'Translator': probe_translator,
+    'Logs': make_log_storage_probe(LOG_DIR)
+})
+
 # Intent patterns and their corresponding commands
 INTENT_PATTERNS = {
     'sms': ['send sms', 'send message', 'text message', 'send text', 'sms to'],
@@ -68,26 +101,21 @@ def log_request(
             'response': response
         }
 
-        # Load existing logs
-        logs = []
-        if os.path.exists(REQUESTS_LOG):
-            try:
-                with open(REQUESTS_LOG, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-            except BaseException:
-                logs = []
-
-        logs.append(log_entry)
-
-        # Save updated logs
-        with open(REQUESTS_LOG, 'w', encoding='utf-8') as f:
-            json.dump(logs, f, indent=2, ensure_ascii=False)
+        get_log('requests').append(log_entry)
     except Exception as e:
         logger.error(f"Error logging request: {e}")
 
 
 def log_suggestion(user_id: int, message: str, suggestion: str):
-    """Log AI suggestions for improvement"""
+    """Log AI suggestions for improvement and cluster them with near-duplicates"""
+    # Fetched before the append so a first-use backfill can't also cluster this entry;
+    # clustering is best effort and never stops the suggestion from being logged
+    try:
+        clusters = get_suggestion_clusters()
+    except Exception as e:
+        logger.error(f"Error opening suggestion clusters: {e}")
+        clusters = None
+
     try:
         log_entry = {
             'timestamp': datetime.now().isoformat(),
@@ -96,22 +124,16 @@ def log_suggestion(user_id: int, message: str, suggestion: str):
             'suggestion': suggestion
         }
 
-        # Load existing suggestions
-        suggestions = []
-        if os.path.exists(SUGGESTIONS_LOG):
-            try:
-                with open(SUGGESTIONS_LOG, 'r', encoding='utf-8') as f:
-                    suggestions = json.load(f)
-            except BaseException:
-                suggestions = []
-
-        suggestions.append(log_entry)
-
-        # Save updated suggestions
-        with open(SUGGESTIONS_LOG, 'w', encoding='utf-8') as f:
-            json.dump(suggestions, f, indent=2, ensure_ascii=False)
+        get_log('suggestions').append(log_entry)
     except Exception as e:
         logger.error(f"Error logging suggestion: {e}")
+        return
+
+    if clusters is not None:
+        try:
+            clusters.add(user_id, message)
+        except Exception as e:
+            logger.error(f"Error clustering suggestion: {e}")
 
 
 def classify_intent(message: str) -> str:
@@ -128,21 +150,21 @@ def classify_intent(message: str) -> str:
 
 async def get_ai_response(message: str, user_id: int) -> str:
     """Get AI response using DeepSeek or OpenAI API"""
+    with span('get_ai_response'):
+        return await _get_ai_response(message, user_id)
+
 
-    system_prompt = """You are Jarvis, an intelligent Telegram bot assistant.
-    You can help users with:
-    - Sending SMS messages (/sms command)
-    - Making phone calls (/call command)
-    - Changing language preferences (/setlang command)
-    - Answering general questions
+async def _get_ai_response(message: str, user_id: int) -> str:
+    """Query the configured AI providers in order of preference"""
 
-    Be helpful, concise, and friendly. If the user asks about features you have,
-    explain them clearly. If they ask questions outside your domain, provide helpful
-    general answers."""
+    # Answer length, temperature and prompt size depend on the kind of question
+    prompt = build_prompt(message)
 
     # Try DeepSeek first
     if DEEPSEEK_API_KEY and REQUESTS_AVAILABLE:
         try:
+            import requests
+
             headers = {
                 'Authorization': f'Bearer {DEEPSEEK_API_KEY}',
                 'Content-Type': 'application/json'
@@ -150,24 +172,25 @@ async def get_ai_response(message: str, user_id: int) -> str:
 
             payload = {
                 'model': 'deepseek-chat',
-                'messages': [
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': message}
-                ],
-                'temperature': 0.7,
-                'max_tokens': 500
+                'messages': prompt['messages'],
+                'temperature': prompt['temperature'],
+                'max_tokens': prompt['max_tokens']
             }
 
-            response = requests.post(
-                DEEPSEEK_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=10)
+            with track_provider('ai', 'deepseek') as tracked:
+                response = requests.post(
+                    DEEPSEEK_API_URL,
+                    headers=headers,
+                    json=payload,
+                    timeout=10)
+                if response.status_code != 200:
+                    tracked.outcome = OUTCOME_FAILED
 
             if response.status_code == 200:
                 result = response.json()
                 ai_response = result['choices'][0]['message']['content']
-                logger.info(f"DeepSeek response for user {user_id}")
+                record_usage(
+                    'deepseek', 'deepseek-chat', prompt, ai_response, result.get('usage'), user_id)
                 return ai_response
         except Exception as e:
             logger.warning(f"DeepSeek API error: {e}")
@@ -175,19 +198,20 @@ async def get_ai_response(message: str, user_id: int) -> str:
     # Fallback to OpenAI
     if OPENAI_API_KEY and OPENAI_AVAILABLE:
         try:
+            import openai
+
             openai.api_key = OPENAI_API_KEY
-            response = openai.ChatCompletion.create(
-                model='gpt-3.5-turbo',
-                messages=[
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': message}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
+            with track_provider('ai', 'openai'):
+                response = openai.ChatCompletion.create(
+                    model='gpt-3.5-turbo',
+                    messages=prompt['messages'],
+                    temperature=prompt['temperature'],
+                    max_tokens=prompt['max_tokens']
+                )
 
             ai_response = response['choices'][0]['message']['content']
-            logger.info(f"OpenAI response for user {user_id}")
+            record_usage(
+                'openai', 'gpt-3.5-turbo', prompt, ai_response, response.get('usage'), user_id)
             return ai_response
         except Exception as e:
             logger.warning(f"OpenAI API error: {e}")
@@ -209,11 +233,13 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     message = update.message.text
 
-    logger.info(f"Message from {user.username} ({user.id}): {message}")
+    message_logger.info("Message from %s (%s): %s", user.username, user.id, message)
 
     # Classify intent
-    intent = classify_intent(message)
-    logger.info(f"Detected intent: {intent}")
+    with span('classify_intent'):
+        intent = classify_intent(message)
+    INTENTS.inc(intent=intent)
+    message_logger.debug("Detected intent: %s", intent)
 
     # Route to appropriate handler based on intent
     if intent == 'sms':
@@ -229,7 +255,7 @@ Note: You'll need to configure Twilio credentials in your .env file."""
         response = """To make a call, use the command:
 /call <number>
 
-Example: /call +1234567890
+Example: /call +12025550123
 
 Note: This is a demo feature. Configure Twilio for real functionality."""
         await update.message.reply_text(response)
@@ -257,10 +283,11 @@ Example: /setlang es (for Spanish)"""
         # Log suggestion for potential improvements
         if "don't" in response.lower() or "can't" in response.lower():
             suggestion = f"User asked: '{message}' - Consider adding this feature"
-            log_suggestion(user.id, message, suggestion)
+            await asyncio.to_thread(log_suggestion, user.id, message, suggestion)
 
-    # Log the request and response
-    log_request(user.id, user.username or 'Unknown', message, intent, response)
+    # Log the request and response; the append takes a file lock, so keep it off the loop
+    await asyncio.to_thread(
+        log_request, user.id, user.username or 'Unknown', message, intent, response)
 
 
 async def ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -275,13 +302,14 @@ async def ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     question = ' '.join(context.args)
-    logger.info(f"AI command from {user.username} ({user.id}): {question}")
+    message_logger.info("AI command from %s (%s): %s", user.username, user.id, question)
 
     response = await get_ai_response(question, user.id)
     await update.message.reply_text(response)
 
     # Log the request
-    log_request(
+    await asyncio.to_thread(
+        log_request,
         user.id,
         user.username or 'Unknown',
         f"/ai {question}",
@@ -292,30 +320,20 @@ async def ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show bot usage statistics"""
     try:
-        # Count total requests
-        total_requests = 0
-        intent_counts = {}
-
-        if os.path.exists(REQUESTS_LOG):
-            with open(REQUESTS_LOG, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
-                total_requests = len(logs)
-
-                for log in logs:
-                    intent = log.get('detected_intent', 'unknown')
-                    intent_counts[intent] = intent_counts.get(intent, 0) + 1
-
-        # Count suggestions
-        total_suggestions = 0
-        if os.path.exists(SUGGESTIONS_LOG):
-            with open(SUGGESTIONS_LOG, 'r', encoding='utf-8') as f:
-                suggestions = json.load(f)
-                total_suggestions = len(suggestions)
+        # Totals come from the segment index; only unsealed segments are read
+        requests_summary, suggestions_summary = await asyncio.gather(
+            asyncio.to_thread(get_log('requests').summary),
+            asyncio.to_thread(get_log('suggestions').summary))
+        total_requests = requests_summary['count']
+        intent_counts = requests_summary['intents']
+        total_suggestions = suggestions_summary['count']
 
         stats_message = f"""📊 Bot Statistics:
 
 📨 Total Requests: {total_requests}
 💡 Suggestions Logged: {total_suggestions}
+📱 SMS Sent: {get_counter('sms_sent')}
+📞 Calls Placed: {get_counter('calls_placed')}
 
 🎯 Intent Distribution:"""
 
@@ -331,24 +349,10 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def health_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Health check command to verify bot is running properly"""
+    """Health check command that probes every external dependency"""
     try:
-        # Check critical components
-        checks = {
-            'Bot Status': '✅ Running',
-            'Telegram API': '✅ Connected',
-            'AI - DeepSeek': '✅ Configured' if DEEPSEEK_API_KEY else '⚠️ Not configured',
-            'AI - OpenAI': '✅ Configured' if OPENAI_API_KEY else '⚠️ Not configured',
-            'Twilio': '✅ Configured' if os.getenv('TWILIO_ACCOUNT_SID') else '⚠️ Not configured',
-            'Textbelt': '✅ Ready',
-            'Logs': '✅ Working' if os.path.exists(LOG_DIR) else '❌ Not found'
-        }
-
-        health_message = "🏥 **Health Check**\n\n"
-        for component, status in checks.items():
-            health_message += f"**{component}:** {status}\n"
-
-        await update.message.reply_text(health_message, parse_mode='Markdown')
+        result = await health_checker.check(context.bot)
+        await update.message.reply_text(format_health(result), parse_mode='Markdown')
 
     except Exception as e:
         logger.error(f"Error in health check: {e}")
@@ -369,17 +373,28 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 📱 **Communication Commands:**
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 • `/sms <phone> <message>` - Send SMS
-  Example: `/sms +1234567890 Hello World`
+  Example: `/sms +12025550123 Hello World`
 
 • `/sms <phone> <message> --provider <name>` - Send SMS via specific provider
-  Example: `/sms +1234567890 Test --provider twilio`
+  Example: `/sms +12025550123 Test --provider twilio`
   Available providers: textbelt, twilio
 
 • `/call <phone>` - Make a voice call (Twilio required)
-  Example: `/call +1234567890`
+  Example: `/call +12025550123`
 
 • `/call <phone> <message>` - Make call with custom message
-  Example: `/call +1234567890 This is an automated call`
+  Example: `/call +12025550123 This is an automated call`
+
+• `/callbulk <phones> [message]` - Call many numbers in one campaign (admins only)
+  Example: `/callbulk +12025550123 +13125550187 --concurrency 3 --rate 0.5`
+
+⏰ **Scheduling:**
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+• Add `--at HH:MM`, `--in 30m` or `--every 1d` to `/sms` or `/call`
+  Example: `/sms +12025550123 Stand-up time --at 09:00 --every 1d`
+
+• `/jobs` - List your scheduled jobs
+• `/canceljob <id>` - Cancel a scheduled job
 
 🤖 **AI Commands:**
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -391,6 +406,11 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 📊 **Analytics Commands:**
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 • `/stats` - View bot usage statistics
+• `/metrics` - Latency and outcome metrics (admins only)
+• `/traces` - Slowest request traces as JSON (admins only)
+• `/profile <seconds>` - Sampling profile of hot functions (admins only)
+• `/logs user:<id> intent:<name> last:7d <words>` - Search request logs (admins only)
+• `/suggestions [count]` - Top clusters of similar feature requests (admins only)
 
 🌍 **Language Commands:**
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -416,27 +436,91 @@ Need more help? Visit our GitHub repository or contact support.
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
 
+async def post_init(application):
+    """Start background services once the application is initialized."""
+    if application.bot_data.get('run_scheduler', True):
+        await scheduler.start(application.bot)
+        nightly_exporter.start()
+        log_search_syncer.start()
+    if METRICS_PORT:
+        worker_index = int(os.getenv('JARVIS_WORKER_INDEX', '0'))
+        start_metrics_server(METRICS_PORT + worker_index, METRICS_HOST)
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    startup.mark(startup.PHASE_INITIALIZED)
+
+
+async def post_shutdown(application):
+    """Stop background services when the application shuts down."""
+    await scheduler.stop()
+    await nightly_exporter.stop()
+    await log_search_syncer.stop()
+    await loop_monitor.stop()
+    # The compact preference store saves its snapshot on close
+    await asyncio.to_thread(close_preference_store)
+
+
+def build_application(run_scheduler: bool = True):
+    """Build the Telegram application and register all handlers.
+
+    Args:
+        run_scheduler: Whether this process dispatches scheduled jobs. With
+            several workers exactly one of them should.
+    """
+    # Fail at startup rather than send every question trimmed to nothing
+    check_prompt_budget()
+    app = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .base_url(TELEGRAM_API_URL)
+        .request(TracingRequest(connection_pool_size=256))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    app.bot_data['run_scheduler'] = run_scheduler
+    startup.mark(startup.PHASE_APP_BUILT)
+
+    # Records time-to-first-update; runs before all other handlers
+    app.add_handler(TypeHandler(Update, startup.record_first_update), group=-1)
+
+    # Register command handlers, each timed by the metrics registry
+    commands = {
+        "start": start,
+        "help": help_command,
+        "health": health_command,
+        "sms": sms,
+        "call": call,
+        "callbulk": callbulk,
+        "jobs": jobs,
+        "canceljob": canceljob,
+        "setlang": setlang,
+        "ai": ai_command,
+        "stats": stats_command,
+        "metrics": metrics_command,
+        "traces": traces_command,
+        "profile": profile_command,
+        "logs": logs_command,
+        "suggestions": suggestions_command,
+    }
+    for name, callback in commands.items():
+        app.add_handler(CommandHandler(
+            name, instrument_handler(name, traced_handler(name, callback))))
+
+    # Register message handler for natural language Q&A
+    # This catches all non-command messages
+    app.add_handler(
+        MessageHandler(
+            filters.TEXT & ~filters.COMMAND,
+            instrument_handler("message", traced_handler("message", handle_message))))
+
+    return app
+
+
 def run():
     """Initialize and run the Telegram bot with AI capabilities."""
     try:
-        app = ApplicationBuilder().token(TOKEN).build()
-
-        # Register command handlers
-        app.add_handler(CommandHandler("start", start))
-        app.add_handler(CommandHandler("help", help_command))
-        app.add_handler(CommandHandler("health", health_command))
-        app.add_handler(CommandHandler("sms", sms))
-        app.add_handler(CommandHandler("call", call))
-        app.add_handler(CommandHandler("setlang", setlang))
-        app.add_handler(CommandHandler("ai", ai_command))
-        app.add_handler(CommandHandler("stats", stats_command))
-
-        # Register message handler for natural language Q&A
-        # This catches all non-command messages
-        app.add_handler(
-            MessageHandler(
-                filters.TEXT & ~filters.COMMAND,
-                handle_message))
+        app = build_application()
 
         logger.info(
             "Bot started successfully with AI-powered Q&A and intent detection")
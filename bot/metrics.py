@@ -0,0 +1,337 @@
+"""Low-overhead in-process metrics with Prometheus text exposition.
+
+Counters and histograms are plain dicts keyed by label values behind a
+lock, so recording a sample costs a dict lookup and a few additions. The
+registry can be served on a local HTTP port for Prometheus to scrape and
+summarized for the admin ``/metrics`` command.
+"""
+import time
+import bisect
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bot.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from fast cache hits to slow upstream APIs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Outcome label values
+OUTCOME_OK = 'ok'
+OUTCOME_FAILED = 'failed'
+OUTCOME_ERROR = 'error'
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Add amount to the counter for the given label values."""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Current value for the given label values."""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self) -> dict:
+        """Snapshot of {label_values: value}."""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge for the given label values."""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> list:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = 'histogram'
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: tuple = (),
+            buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one sample for the given label values."""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> dict:
+        """Snapshot of {label_values: (bucket_counts, sum, count)}."""
+        with self._lock:
+            return {
+                key: (list(counts), total, count)
+                for key, (counts, total, count) in self._values.items()}
+
+    def quantile(self, q: float, counts: list, count: int) -> float:
+        """Estimate a quantile from bucket counts by linear interpolation."""
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        lower = 0.0
+        for index, bucket_count in enumerate(counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+            if cumulative + bucket_count >= rank and bucket_count:
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.samples().items()):
+            cumulative = 0
+            for index, bucket in enumerate(self.buckets + (float('inf'),)):
+                cumulative += counts[index]
+                le = '+Inf' if bucket == float('inf') else repr(bucket)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: tuple = (),
+            buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    'jarvis_handler_duration_seconds',
+    'Time spent in each command handler',
+    ('handler', 'outcome'))
+INTENTS = REGISTRY.counter(
+    'jarvis_intents_total',
+    'Free-text messages by detected intent',
+    ('intent',))
+PROVIDER_LATENCY = REGISTRY.histogram(
+    'jarvis_provider_duration_seconds',
+    'Latency of calls to external AI, SMS, call and translation providers',
+    ('kind', 'provider', 'outcome'))
+
+
+def instrument_handler(name: str, callback):
+    """Wrap an async update handler to record its latency and outcome."""
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        outcome = OUTCOME_OK
+        try:
+            return await callback(update, context)
+        except Exception:
+            outcome = OUTCOME_ERROR
+            raise
+        finally:
+            HANDLER_LATENCY.observe(
+                time.perf_counter() - start, handler=name, outcome=outcome)
+
+    return wrapper
+
+
+class ProviderCall:
+    """Outcome holder for one timed provider call."""
+
+    def __init__(self):
+        self.outcome = OUTCOME_OK
+
+
+@contextmanager
+def track_provider(kind: str, provider: str):
+    """Time one provider call and record it with its outcome.
+
+    Usage:
+        with track_provider('sms', 'textbelt') as tracked:
+            result = provider.send(phone, message)
+            if not result['success']:
+                tracked.outcome = OUTCOME_FAILED
+
+    An exception marks the call as ``error``. The call is also recorded as
+    a ``<kind>.<provider>`` span of the current trace.
+    """
+    tracked = ProviderCall()
+    start = time.perf_counter()
+    try:
+        with span(f"{kind}.{provider}"):
+            yield tracked
+    except Exception:
+        tracked.outcome = OUTCOME_ERROR
+        raise
+    finally:
+        PROVIDER_LATENCY.observe(
+            time.perf_counter() - start,
+            kind=kind,
+            provider=provider,
+            outcome=tracked.outcome)
+
+
+def format_summary() -> str:
+    """Summarize handler, intent and provider metrics for chat output."""
+    lines = ["📈 Metrics (this process)\n", "⚙️ Handlers:"]
+
+    handler_samples = HANDLER_LATENCY.samples()
+    if not handler_samples:
+        lines.append("  • no data yet")
+    for (handler, outcome), (counts, total, count) in sorted(handler_samples.items()):
+        p50 = HANDLER_LATENCY.quantile(0.5, counts, count)
+        p95 = HANDLER_LATENCY.quantile(0.95, counts, count)
+        lines.append(
+            f"  • {handler} [{outcome}]: {count} calls, "
+            f"avg {total / count * 1000:.0f} ms, p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+
+    lines.append("\n🎯 Intents:")
+    intent_samples = INTENTS.samples()
+    if not intent_samples:
+        lines.append("  • no data yet")
+    for (intent,), value in sorted(intent_samples.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  • {intent}: {int(value)}")
+
+    lines.append("\n🔌 Providers:")
+    provider_samples = PROVIDER_LATENCY.samples()
+    if not provider_samples:
+        lines.append("  • no data yet")
+    for (kind, provider, outcome), (counts, total, count) in sorted(provider_samples.items()):
+        p95 = PROVIDER_LATENCY.quantile(0.95, counts, count)
+        lines.append(
+            f"  • {kind}/{provider} [{outcome}]: {count} calls, "
+            f"avg {total / count * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+
+    return '\n'.join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1'):
+    """Serve /metrics on a background thread. Safe to call more than once."""
+    global _server
+    if _server is not None:
+        return _server
+
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Could not start metrics endpoint on {host}:{port}: {e}")
+        return None
+
+    thread = threading.Thread(
+        target=_server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return _server
@@ -0,0 +1,241 @@
+"""E.164 phone number normalization and validation.
+
+Shared by the SMS and call handlers, bulk campaigns and scheduled jobs, so
+a malformed recipient is rejected before any provider request is made.
+
+Numbers are reduced to digits, the country calling code is found with a
+longest-prefix lookup and the remaining national number is checked
+against that country's allowed lengths. Results, including rejections,
+are kept in an LRU cache, so repeated recipients (bulk lists, recurring
+jobs) are validated once.
+"""
+import re
+from functools import lru_cache
+from bot.config import DEFAULT_COUNTRY_CODE, PHONE_CACHE_SIZE
+
+# E.164 allows at most 15 digits including the country code
+E164_MAX_DIGITS = 15
+E164_MIN_DIGITS = 8
+
+# Allowed national (significant) number lengths per country calling code.
+# Codes not listed fall back to the generic E.164 length limits.
+NATIONAL_LENGTHS = {
+    '1': (10,),             # NANP: US, Canada, Caribbean
+    '7': (10,),             # Russia, Kazakhstan
+    '20': (9, 10),          # Egypt
+    '27': (9,),             # South Africa
+    '30': (10,),            # Greece
+    '31': (9,),             # Netherlands
+    '32': (8, 9),           # Belgium
+    '33': (9,),             # France
+    '34': (9,),             # Spain
+    '36': (8, 9),           # Hungary
+    '39': (6, 7, 8, 9, 10, 11),  # Italy
+    '40': (9,),             # Romania
+    '41': (9,),             # Switzerland
+    '43': tuple(range(4, 14)),   # Austria
+    '44': (9, 10),          # United Kingdom
+    '45': (8,),             # Denmark
+    '46': tuple(range(7, 14)),   # Sweden
+    '47': (8,),             # Norway
+    '48': (9,),             # Poland
+    '49': tuple(range(6, 14)),   # Germany
+    '51': (8, 9),           # Peru
+    '52': (10,),            # Mexico
+    '53': (8,),             # Cuba
+    '54': (10, 11),         # Argentina
+    '55': (10, 11),         # Brazil
+    '56': (9,),             # Chile
+    '57': (8, 10),          # Colombia
+    '58': (10,),            # Venezuela
+    '60': (8, 9, 10),       # Malaysia
+    '61': (9,),             # Australia
+    '62': tuple(range(8, 13)),   # Indonesia
+    '63': (8, 9, 10),       # Philippines
+    '64': (8, 9, 10),       # New Zealand
+    '65': (8,),             # Singapore
+    '66': (8, 9),           # Thailand
+    '81': (9, 10),          # Japan
+    '82': (8, 9, 10),       # South Korea
+    '84': (9, 10),          # Vietnam
+    '86': (10, 11),         # China
+    '90': (10,),            # Turkey
+    '91': (10,),            # India
+    '92': (9, 10),          # Pakistan
+    '93': (9,),             # Afghanistan
+    '94': (9,),             # Sri Lanka
+    '95': (8, 9, 10),       # Myanmar
+    '98': (10,),            # Iran
+    '212': (9,),            # Morocco
+    '213': (9,),            # Algeria
+    '216': (8,),            # Tunisia
+    '234': (8, 10),         # Nigeria
+    '233': (9,),            # Ghana
+    '254': (9,),            # Kenya
+    '255': (9,),            # Tanzania
+    '256': (9,),            # Uganda
+    '351': (9,),            # Portugal
+    '352': tuple(range(4, 12)),  # Luxembourg
+    '353': (7, 8, 9),       # Ireland
+    '354': (7, 9),          # Iceland
+    '358': tuple(range(5, 13)),  # Finland
+    '359': (8, 9),          # Bulgaria
+    '370': (8,),            # Lithuania
+    '371': (8,),            # Latvia
+    '372': (7, 8),          # Estonia
+    '380': (9,),            # Ukraine
+    '381': (8, 9),          # Serbia
+    '385': (8, 9),          # Croatia
+    '386': (8,),            # Slovenia
+    '420': (9,),            # Czech Republic
+    '421': (9,),            # Slovakia
+    '852': (8,),            # Hong Kong
+    '886': (8, 9),          # Taiwan
+    '880': (10,),           # Bangladesh
+    '961': (7, 8),          # Lebanon
+    '962': (8, 9),          # Jordan
+    '964': (10,),           # Iraq
+    '966': (9,),            # Saudi Arabia
+    '971': (8, 9),          # United Arab Emirates
+    '972': (8, 9),          # Israel
+    '974': (8,),            # Qatar
+}
+
+# Trunk prefix dialled before a national number inside its country; '0'
+# unless listed here. Where it is '', a leading 0 belongs to the number
+# itself (Italian landlines are +39 06...), so nothing is stripped.
+TRUNK_PREFIXES = {
+    '1': '1',               # NANP: 1-202-555-0123
+    '7': '8',               # Russia, Kazakhstan
+    '36': '06',             # Hungary
+    '30': '',               # Greece
+    '34': '',               # Spain
+    '39': '',               # Italy
+    '45': '',               # Denmark
+    '47': '',               # Norway
+    '351': '',              # Portugal
+    '352': '',              # Luxembourg
+    '354': '',              # Iceland
+    '371': '',              # Latvia
+    '372': '',              # Estonia
+}
+
+# Calling codes are prefix-free, so at most one length matches a given number
+_SPECIFIC_CODES = {
+    length: frozenset(code for code in NATIONAL_LENGTHS if len(code) == length)
+    for length in (3, 2, 1)}
+_LENGTH_SETS = {code: frozenset(lengths) for code, lengths in NATIONAL_LENGTHS.items()}
+
+# Spaces, dots, dashes, slashes and parentheses are accepted as separators
+_SEPARATORS = re.compile(r'[\s.\-/()]+')
+_INTERNATIONAL = re.compile(r'^(?:\+|00)([1-9]\d*)$')
+_NATIONAL = re.compile(r'^\d+$')
+# NANP area codes and exchanges never start with 0 or 1
+_NANP = re.compile(r'^[2-9]\d{2}[2-9]\d{6}$')
+
+
+class PhoneNumberError(ValueError):
+    """Raised when a phone number cannot be normalized to valid E.164."""
+
+
+def _split_country_code(digits: str):
+    for length, codes in _SPECIFIC_CODES.items():
+        if digits[:length] in codes:
+            return digits[:length], digits[length:]
+    return None, digits
+
+
+def _strip_trunk_prefix(national: str, country_code: str) -> str:
+    """Drop one trunk prefix from a nationally dialled number, if it has one."""
+    trunk = TRUNK_PREFIXES.get(country_code, '0')
+    if not trunk or not national.startswith(trunk):
+        return national
+    stripped = national[len(trunk):]
+    lengths = _LENGTH_SETS.get(country_code)
+    # '8' and '1' can also start a number; only strip when that leaves a valid length
+    if lengths is not None and len(stripped) not in lengths and len(national) in lengths:
+        return national
+    return stripped
+
+
+def _check(digits: str) -> str:
+    """Return an error message for an international digit string, or None."""
+    if not E164_MIN_DIGITS <= len(digits) <= E164_MAX_DIGITS:
+        return f"must have {E164_MIN_DIGITS}-{E164_MAX_DIGITS} digits including the country code"
+    code, national = _split_country_code(digits)
+    if code is None:
+        return None
+    if len(national) not in _LENGTH_SETS[code]:
+        lengths = NATIONAL_LENGTHS[code]
+        expected = (
+            str(lengths[0]) if len(lengths) == 1 else f"{lengths[0]}-{lengths[-1]}")
+        return f"numbers for country code +{code} have {expected} digits after the code"
+    if code == '1' and not _NANP.match(national):
+        return "is not a valid North American number"
+    return None
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def _normalize(raw: str, default_country_code: str) -> tuple:
+    # Cached as (number, error) so rejected inputs are remembered too
+    cleaned = _SEPARATORS.sub('', raw.strip())
+    match = _INTERNATIONAL.match(cleaned)
+    if match:
+        digits = match.group(1)
+    elif _NATIONAL.match(cleaned) and default_country_code:
+        # National format: drop the trunk prefix and add the default country code
+        digits = default_country_code + _strip_trunk_prefix(cleaned, default_country_code)
+    elif _NATIONAL.match(cleaned):
+        return None, "must start with '+' followed by the country code"
+    else:
+        return None, "contains characters other than digits and separators"
+
+    error = _check(digits)
+    if error:
+        return None, error
+    return '+' + digits, None
+
+
+def normalize_phone(raw: str, default_country_code: str = None) -> str:
+    """Normalize a phone number to E.164 (``+<country code><number>``).
+
+    Args:
+        raw: Number as typed, e.g. "+1 (202) 555-0123" or "00441234567890"
+        default_country_code: Code assumed for numbers without '+' or 00;
+            defaults to DEFAULT_COUNTRY_CODE
+
+    Returns:
+        str: The E.164 number
+
+    Raises:
+        PhoneNumberError: If the number is malformed
+    """
+    if default_country_code is None:
+        default_country_code = DEFAULT_COUNTRY_CODE
+    number, error = _normalize(str(raw), default_country_code)
+    if error:
+        raise PhoneNumberError(f"{raw} {error}")
+    return number
+
+
+def validate_numbers(raw_numbers, default_country_code: str = None) -> tuple:
+    """Normalize a batch of recipients without any network access.
+
+    Returns:
+        tuple: (valid E.164 numbers in input order without duplicates,
+        {raw number: error message} for the rejected ones)
+    """
+    valid = []
+    seen = set()
+    invalid = {}
+    for raw in raw_numbers:
+        try:
+            number = normalize_phone(raw, default_country_code)
+        except PhoneNumberError as e:
+            invalid[raw] = str(e)
+            continue
+        if number not in seen:
+            seen.add(number)
+            valid.append(number)
+    return valid, invalid
+
@@ -0,0 +1,572 @@
+"""Pluggable storage for per-user preferences such as the interface language."""
+import os
+import json
+import mmap
+import time
+import bisect
+import struct
+import sqlite3
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from bot.config import (
+    PREFERENCE_BACKEND,
+    PREFERENCE_DB,
+    LANG_FILE,
+    PREFERENCE_CACHE_SIZE,
+    PREFERENCE_CACHE_TTL,
+    PREFERENCE_SNAPSHOT)
+
+logger = logging.getLogger(__name__)
+
+# Preference backend constants
+BACKEND_SQLITE = 'sqlite'
+BACKEND_JSON = 'json'
+BACKEND_SHARED = 'shared'
+BACKEND_COMPACT = 'compact'
+
+
+class PreferenceStore:
+    """Base class for user preference stores."""
+
+    def get_language(self, user_id: int) -> str:
+        """Return the user's language code, or None if not set."""
+        raise NotImplementedError
+
+    def set_language(self, user_id: int, language: str) -> None:
+        """Store the user's language code."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class JSONPreferenceStore(PreferenceStore):
+    """Legacy store keeping every preference in one JSON file.
+
+    The whole file is loaded at startup and rewritten on every change, so
+    it is only suitable for small single-process deployments.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or LANG_FILE
+        self.languages = load_json_languages(self.path)
+
+    def get_language(self, user_id: int) -> str:
+        return self.languages.get(str(user_id))
+
+    def set_language(self, user_id: int, language: str) -> None:
+        self.languages[str(user_id)] = language
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(self.languages, f)
+        except Exception as e:
+            logger.error(f"Error saving user languages: {e}")
+
+
+class SQLitePreferenceStore(PreferenceStore):
+    """SQLite store with one indexed row per user.
+
+    WAL mode lets several processes read while one writes, and a change
+    touches a single row instead of rewriting every user's preference.
+    """
+
+    def __init__(self, db_path: str = None, migrate_from: str = None):
+        self.db_path = db_path or PREFERENCE_DB
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.db_path, check_same_thread=False, timeout=10)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            '''CREATE TABLE IF NOT EXISTS user_preferences (
+                user_id INTEGER PRIMARY KEY,
+                language TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )''')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS user_preferences_updated '
+            'ON user_preferences (updated_at)')
+        self._db.commit()
+
+        if migrate_from:
+            migrate_json_languages(self, migrate_from)
+
+    def get_language(self, user_id: int) -> str:
+        with self._lock:
+            row = self._db.execute(
+                'SELECT language FROM user_preferences WHERE user_id = ?',
+                (int(user_id),)).fetchone()
+        return row[0] if row else None
+
+    def set_language(self, user_id: int, language: str) -> None:
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO user_preferences (user_id, language, updated_at) '
+                'VALUES (?, ?, ?) '
+                'ON CONFLICT(user_id) DO UPDATE SET '
+                'language = excluded.language, updated_at = excluded.updated_at',
+                (int(user_id), language, time.time()))
+            self._db.commit()
+
+    def iter_languages(self, since: float = None, batch_size: int = 50000):
+        """Yield (user_id, language) pairs in user ID order.
+
+        Args:
+            since: Only rows updated after this UNIX time
+            batch_size: Rows fetched per lock acquisition
+        """
+        query = 'SELECT user_id, language FROM user_preferences'
+        params = ()
+        if since is not None:
+            query += ' WHERE updated_at > ?'
+            params = (since,)
+        query += ' ORDER BY user_id'
+        with self._lock:
+            cursor = self._db.execute(query, params)
+        while True:
+            # Lock per batch, never across a yield
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    def import_languages(self, languages: dict) -> int:
+        """Bulk insert preferences without overwriting existing rows."""
+        now = time.time()
+        rows = [
+            (int(user_id), language, now)
+            for user_id, language in languages.items()
+            if str(user_id).lstrip('-').isdigit()]
+        with self._lock:
+            self._db.executemany(
+                'INSERT OR IGNORE INTO user_preferences (user_id, language, updated_at) '
+                'VALUES (?, ?, ?)', rows)
+            self._db.commit()
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class SharedPreferenceStore(PreferenceStore):
+    """Store kept in the shared backend (e.g. Redis) used by all workers."""
+
+    def __init__(self, backend=None):
+        from bot.shared import get_shared_backend
+
+        self.backend = backend or get_shared_backend()
+
+    def get_language(self, user_id: int) -> str:
+        return self.backend.get(f"pref:lang:{int(user_id)}")
+
+    def set_language(self, user_id: int, language: str) -> None:
+        self.backend.set(f"pref:lang:{int(user_id)}", language)
+
+    def import_languages(self, languages: dict) -> int:
+        """Bulk insert preferences without overwriting existing keys."""
+        count = 0
+        for user_id, language in languages.items():
+            if not str(user_id).lstrip('-').isdigit():
+                continue
+            if self.get_language(user_id) is None:
+                self.set_language(user_id, language)
+            count += 1
+        return count
+
+
+class CachedPreferenceStore(PreferenceStore):
+    """LRU cache of hot users in front of another preference store.
+
+    With several workers an entry may be served for up to ``ttl`` seconds
+    after another worker changed it; updates sharded to the same worker
+    are seen immediately.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, store: PreferenceStore, max_size: int = None, ttl: float = None):
+        self.store = store
+        self.max_size = max_size or PREFERENCE_CACHE_SIZE
+        self.ttl = PREFERENCE_CACHE_TTL if ttl is None else ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_language(self, user_id: int) -> str:
+        key = int(user_id)
+        with self._lock:
+            entry = self._cache.get(key, self._MISSING)
+            if entry is not self._MISSING:
+                language, expires_at = entry
+                if not expires_at or expires_at > time.monotonic():
+                    self._cache.move_to_end(key)
+                    return language
+
+        language = self.store.get_language(user_id)
+        self._remember(key, language)
+        return language
+
+    def set_language(self, user_id: int, language: str) -> None:
+        self.store.set_language(user_id, language)
+        self._remember(int(user_id), language)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user from the cache so the next read hits the store."""
+        with self._lock:
+            self._cache.pop(int(user_id), None)
+
+    def _remember(self, key: int, language: str) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._cache[key] = (language, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def close(self) -> None:
+        self.store.close()
+
+
+class CompactPreferenceStore(PreferenceStore):
+    """Every user's language held in memory in about 9 bytes per user.
+
+    User IDs are kept in a sorted ``array('q')`` with a parallel
+    ``array('B')`` of indexes into a table of interned language codes, so
+    a lookup is a binary search and millions of users take tens of MB
+    instead of the ~150 bytes per entry of a dict of strings. Recent
+    changes go to a small dict that a background thread merges into new
+    arrays once it reaches ``merge_threshold`` entries.
+
+    Writes go through to the backing SQLite store. With ``snapshot_path``
+    the arrays are saved to that file and memory-mapped, so startup skips
+    the full table scan (only rows changed since the snapshot are read)
+    and workers on one host share the pages. Changes made by other
+    workers are read by a background thread every ``ttl`` seconds
+    (0 = only at startup), so lookups never touch SQLite.
+    """
+
+    MAGIC = b'PREFSNP1'
+    MAX_LANGUAGES = 256
+
+    def __init__(self, store: SQLitePreferenceStore, snapshot_path: str = None,
+                 merge_threshold: int = 4096, ttl: float = None):
+        self.store = store
+        self.snapshot_path = snapshot_path
+        self.merge_threshold = merge_threshold
+        self.ttl = PREFERENCE_CACHE_TTL if ttl is None else ttl
+        self._codes = []
+        self._code_index = {}
+        self._lock = threading.Lock()
+        # (sorted user IDs, language indexes, recent changes, changes being merged),
+        # swapped as one reference so lock-free readers never see a half-merged state
+        self._state = (array('q'), array('B'), {}, {})
+        self._merger = None
+        self._synced_at = None
+        self._stopped = threading.Event()
+        self._syncer = None
+
+        if not (snapshot_path and self._load_snapshot(snapshot_path)):
+            self._load_store()
+        if self.ttl:
+            self._syncer = threading.Thread(
+                target=self._sync_loop, name='preference-sync', daemon=True)
+            self._syncer.start()
+
+    def get_language(self, user_id: int) -> str:
+        key = int(user_id)
+        ids, codes, recent, merging = self._state
+        index = recent.get(key)
+        if index is None:
+            index = merging.get(key)
+        if index is None:
+            position = bisect.bisect_left(ids, key)
+            if position == len(ids) or ids[position] != key:
+                return None
+            index = codes[position]
+        return self._codes[index]
+
+    def set_language(self, user_id: int, language: str) -> None:
+        index = self._intern(language)
+        self.store.set_language(user_id, language)
+        with self._lock:
+            self._state[2][int(user_id)] = index
+            self._start_merge()
+
+    def sync(self) -> int:
+        """Apply changes other processes made to the backing store.
+
+        Returns:
+            int: Number of changed users read
+        """
+        started = time.time()
+        changes = [
+            (user_id, self._intern(language))
+            for user_id, language in self.store.iter_languages(since=self._synced_at)]
+        with self._lock:
+            self._state[2].update(changes)
+            # Rows written while we were reading are read again next time
+            self._synced_at = started - 1
+            self._start_merge()
+        return len(changes)
+
+    def _sync_loop(self) -> None:
+        while not self._stopped.wait(self.ttl):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Preference sync failed: {e}", exc_info=True)
+
+    def _intern(self, language: str) -> int:
+        index = self._code_index.get(language)
+        if index is None:
+            with self._lock:
+                index = self._code_index.get(language)
+                if index is None:
+                    if len(self._codes) >= self.MAX_LANGUAGES:
+                        raise ValueError(
+                            f"Compact preference store holds at most {self.MAX_LANGUAGES} languages")
+                    index = len(self._codes)
+                    self._codes.append(language)
+                    self._code_index[language] = index
+        return index
+
+    def _start_merge(self) -> None:
+        """Merge in the background once enough changes piled up. Caller holds the lock."""
+        if len(self._state[2]) < self.merge_threshold or self._merger is not None:
+            return
+        # Rebuilding and rewriting the snapshot takes a while; keep it off the event loop
+        self._merger = threading.Thread(
+            target=self._merge, name='preference-merge', daemon=True)
+        self._merger.start()
+
+    def _merge(self) -> None:
+        """Fold recent changes into new sorted arrays and a new snapshot."""
+        with self._lock:
+            ids, codes, recent, _ = self._state
+            # Changes being merged stay visible to readers until the new arrays are in place
+            self._state = (ids, codes, {}, recent)
+        try:
+            merged_ids, merged_codes = self._merged_arrays(ids, codes, recent)
+            if self.snapshot_path:
+                # Re-map the saved file so the table lives in shared page cache, not the heap
+                mapped = self._save_snapshot(self.snapshot_path, merged_ids, merged_codes)
+                if mapped is not None:
+                    _, merged_ids, merged_codes = self._read_snapshot(mapped)
+        except Exception as e:
+            logger.error(f"Preference merge failed: {e}", exc_info=True)
+            with self._lock:
+                current = self._state
+                self._state = (current[0], current[1], {**recent, **current[2]}, {})
+                self._merger = None
+            return
+        with self._lock:
+            self._state = (merged_ids, merged_codes, self._state[2], {})
+            self._merger = None
+
+    @staticmethod
+    def _merged_arrays(ids, codes, changes: dict) -> tuple:
+        # Unchanged runs are copied as raw bytes, from arrays and mapped views alike
+        id_bytes = memoryview(ids).cast('B')
+        code_bytes = memoryview(codes).cast('B')
+        width = ids.itemsize
+        merged_ids = array('q')
+        merged_codes = array('B')
+        position = 0
+        for user_id, index in sorted(changes.items()):
+            end = bisect.bisect_left(ids, user_id, position)
+            merged_ids.frombytes(id_bytes[position * width:end * width])
+            merged_codes.frombytes(code_bytes[position:end])
+            merged_ids.append(user_id)
+            merged_codes.append(index)
+            position = end + 1 if end < len(ids) and ids[end] == user_id else end
+        merged_ids.frombytes(id_bytes[position * width:])
+        merged_codes.frombytes(code_bytes[position:])
+        return merged_ids, merged_codes
+
+    def _load_store(self) -> None:
+        started = time.time()
+        ids = array('q')
+        codes = array('B')
+        # Rows arrive sorted by the primary key, so they are appended in place
+        for user_id, language in self.store.iter_languages():
+            ids.append(user_id)
+            codes.append(self._intern(language))
+        self._synced_at = started - 1
+        if self.snapshot_path:
+            mapped = self._save_snapshot(self.snapshot_path, ids, codes)
+            if mapped is not None:
+                _, ids, codes = self._read_snapshot(mapped)
+        self._state = (ids, codes, {}, {})
+        logger.info(f"Loaded {len(ids)} user preferences into the compact store")
+
+    def _save_snapshot(self, path: str, ids, codes):
+        """Write a snapshot and return a map of the file just written, or None.
+
+        The map is taken from our own file descriptor before the rename, so
+        another worker replacing the shared snapshot in between can't swap
+        its arrays for ours.
+        """
+        # Layout: magic, header length, JSON header, padding to 8 bytes, IDs, indexes
+        header = json.dumps({
+            'count': len(ids),
+            'codes': self._codes[:],
+            'synced_at': self._synced_at
+        }).encode('utf-8')
+        header += b' ' * (-(len(self.MAGIC) + 4 + len(header)) % 8)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w+b') as f:
+                f.write(self.MAGIC)
+                f.write(struct.pack('<I', len(header)))
+                f.write(header)
+                f.write(memoryview(ids).cast('B'))
+                f.write(memoryview(codes).cast('B'))
+                f.flush()
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.replace(temp_path, path)
+            return mapped
+        except OSError as e:
+            logger.warning(f"Could not write preference snapshot {path}: {e}")
+            return None
+
+    def _read_snapshot(self, mapped) -> tuple:
+        """Parse a mapped snapshot into (header, IDs view, indexes view).
+
+        Raises:
+            ValueError: If the file is not a complete snapshot
+        """
+        if mapped[:len(self.MAGIC)] != self.MAGIC:
+            raise ValueError("not a preference snapshot")
+        start = len(self.MAGIC) + 4
+        (header_size,) = struct.unpack('<I', mapped[len(self.MAGIC):start])
+        header = json.loads(mapped[start:start + header_size])
+        count = header['count']
+        offset = start + header_size
+        if len(mapped) < offset + count * 9:
+            raise ValueError("truncated file")
+        view = memoryview(mapped)
+        return (header,
+                view[offset:offset + count * 8].cast('q'),
+                view[offset + count * 8:offset + count * 9].cast('B'))
+
+    def _load_snapshot(self, path: str) -> bool:
+        """Map the snapshot at startup and catch up with the store."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            header, ids, codes = self._read_snapshot(mapped)
+            languages = header['codes']
+            synced_at = header['synced_at']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable preference snapshot {path}: {e}")
+            return False
+
+        for language in languages:
+            self._code_index[language] = len(self._codes)
+            self._codes.append(language)
+        self._state = (ids, codes, {}, {})
+        self._synced_at = synced_at
+        self.sync()
+        logger.info(f"Mapped {len(ids)} user preferences from {path}")
+        return True
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._syncer is not None:
+            self._syncer.join()
+            self._syncer = None
+        merger = self._merger
+        if merger is not None:
+            merger.join()
+        with self._lock:
+            pending = self.snapshot_path and self._state[2]
+            if pending:
+                self._merger = threading.current_thread()
+        if pending:
+            self._merge()
+        self.store.close()
+
+
+def load_json_languages(path: str) -> dict:
+    """Load a legacy {user_id: language} JSON file, or an empty dict."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading user languages from {path}: {e}")
+        return {}
+
+
+def migrate_json_languages(store: PreferenceStore, path: str) -> int:
+    """Import a legacy JSON preference file and rename it to <path>.migrated."""
+    if not os.path.exists(path):
+        return 0
+
+    # Read directly rather than via load_json_languages: an unreadable or
+    # corrupt file must stay in place instead of being retired as empty
+    try:
+        with open(path, 'r') as f:
+            languages = json.load(f)
+    except Exception as e:
+        logger.error(f"Not migrating user languages from {path}: {e}")
+        return 0
+    if not isinstance(languages, dict):
+        logger.error(f"Not migrating user languages from {path}: expected a JSON object")
+        return 0
+
+    count = store.import_languages(languages)
+    try:
+        os.replace(path, f"{path}.migrated")
+    except OSError as e:
+        logger.warning(f"Could not rename migrated language file {path}: {e}")
+
+    logger.info(f"Migrated {count} user language preferences from {path}")
+    return count
+
+
+def create_preference_store(backend: str) -> PreferenceStore:
+    """Factory function to build a preference store for the given backend."""
+    backend = backend.lower()
+    if backend == BACKEND_SQLITE:
+        return CachedPreferenceStore(
+            SQLitePreferenceStore(PREFERENCE_DB, migrate_from=LANG_FILE))
+    if backend == BACKEND_SHARED:
+        store = SharedPreferenceStore()
+        migrate_json_languages(store, LANG_FILE)
+        return CachedPreferenceStore(store)
+    if backend == BACKEND_COMPACT:
+        return CompactPreferenceStore(
+            SQLitePreferenceStore(PREFERENCE_DB, migrate_from=LANG_FILE),
+            snapshot_path=PREFERENCE_SNAPSHOT or None)
+    if backend == BACKEND_JSON:
+        return JSONPreferenceStore(LANG_FILE)
+
+    raise ValueError(
+        f"Unknown preference backend: {backend}. "
+        f"Available: {BACKEND_SQLITE}, {BACKEND_COMPACT}, {BACKEND_SHARED}, {BACKEND_JSON}")
+
+
+_preference_store = None
+
+
+def get_preference_store() -> PreferenceStore:
+    """Return the process-wide preference store, creating it on first use."""
+    global _preference_store
+    if _preference_store is None:
+        _preference_store = create_preference_store(PREFERENCE_BACKEND)
+    return _preference_store
+
+
+def close_preference_store() -> None:
+    """Close the process-wide preference store if it was created."""
+    global _preference_store
+    if _preference_store is not None:
+        _preference_store.close()
+        _preference_store = None
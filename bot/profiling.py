@@ -0,0 +1,192 @@
+"""Event-loop lag detection and an on-demand sampling profiler.
+
+``LoopLagMonitor`` runs a heartbeat task on the event loop and a watchdog
+thread beside it. When the heartbeat stalls for longer than the threshold,
+something is blocking the loop (a synchronous HTTP call, a slow file write)
+and the watchdog logs the loop thread's current stack so the culprit can
+be found.
+
+``sample_profile`` samples the stacks of all threads at a fixed interval
+and reports the functions where the process spent its time. Threads
+parked in a wait (an idle event loop, idle executor workers, locks and
+queues) are counted as idle and left out of the hit tables.
+"""
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter
+from bot.config import LOOP_LAG_THRESHOLD_MS
+from bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Monitoring threads left out of profiles; they are idle by design
+PROFILER_IGNORED_THREADS = {'loop-lag-watchdog', 'metrics-http'}
+# Innermost frames of a thread that is waiting rather than working:
+# (end of the file path, function name)
+IDLE_FRAMES = (
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('concurrent/futures/thread.py', '_worker'),
+)
+
+LOOP_LAG = REGISTRY.histogram(
+    'jarvis_event_loop_lag_seconds',
+    'Delay between when the loop heartbeat was due and when it ran',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_STALLS = REGISTRY.counter(
+    'jarvis_event_loop_stalls_total',
+    'Times the event loop was blocked for longer than the lag threshold')
+
+
+class LoopLagMonitor:
+    """Detects event-loop stalls and logs the stack that caused them."""
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 2
+        self._loop_thread_id = None
+        self._last_beat = 0.0
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name='loop-lag-watchdog', daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop lag monitor started (threshold {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self):
+        """Stop the heartbeat task and the watchdog thread."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            LOOP_LAG.observe(max(0.0, now - due))
+            self._last_beat = now
+
+    def _watch(self):
+        reported = False
+        while not self._stopped.wait(self.interval):
+            stalled_for = time.monotonic() - self._last_beat - self.interval
+            if stalled_for < self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            # Report each stall once, with the stack that is blocking the loop
+            reported = True
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else '<no frame>'
+            logger.warning(
+                f"Event loop blocked for {stalled_for * 1000:.0f} ms; loop thread stack:\n{stack}")
+
+
+def _frame_key(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    filename = code.co_filename.replace('\\', '/')
+    return any(
+        code.co_name == name and filename.endswith(suffix)
+        for suffix, name in IDLE_FRAMES)
+
+
+def sample_profile(seconds: float, interval: float = 0.005) -> dict:
+    """Sample the stacks of every other thread for the given duration.
+
+    Blocks the calling thread; run it with ``asyncio.to_thread``.
+
+    Returns:
+        dict: samples, idle (samples of waiting threads, not in the
+        Counters), duration, and Counters of self and cumulative hits
+        keyed by function
+    """
+    ignored = {threading.get_ident()} | {
+        thread.ident for thread in threading.enumerate()
+        if thread.name in PROFILER_IGNORED_THREADS}
+    self_hits = Counter()
+    total_hits = Counter()
+    samples = 0
+    idle = 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in ignored:
+                continue
+            if _is_idle(frame):
+                idle += 1
+                continue
+            samples += 1
+            self_hits[_frame_key(frame)] += 1
+            seen = set()
+            while frame is not None:
+                key = _frame_key(frame)
+                if key not in seen:
+                    seen.add(key)
+                    total_hits[key] += 1
+                frame = frame.f_back
+        time.sleep(interval)
+
+    return {
+        'samples': samples,
+        'idle': idle,
+        'duration': seconds,
+        'self': self_hits,
+        'total': total_hits
+    }
+
+
+def format_profile(profile: dict, top: int = 40) -> str:
+    """Render a profile as a plain-text report of the hottest functions."""
+    samples = profile['samples'] or 1
+    lines = [
+        f"Sampling profile (wall clock, all threads): "
+        f"{profile['samples']} busy stack samples over {profile['duration']:g} s "
+        f"({profile.get('idle', 0)} idle samples of waiting threads skipped)",
+        "",
+        f"Top {top} functions by self time:",
+        f"{'self %':>7}  {'samples':>8}  function"]
+    for key, hits in profile['self'].most_common(top):
+        lines.append(f"{hits * 100 / samples:>6.1f}%  {hits:>8}  {key}")
+
+    lines += [
+        "",
+        f"Top {top} functions by cumulative time:",
+        f"{'total %':>7}  {'samples':>8}  function"]
+    for key, hits in profile['total'].most_common(top):
+        lines.append(f"{hits * 100 / samples:>6.1f}%  {hits:>8}  {key}")
+
+    return '\n'.join(lines) + '\n'
+
+
+loop_monitor = LoopLagMonitor()
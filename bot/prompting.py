@@ -0,0 +1,223 @@
+"""Token-aware prompt building for AI answers.
+
+Each question is matched to a response profile (factual, general,
+explain, creative) that sets ``max_tokens`` and ``temperature``, so short
+factual questions ask the provider for short answers instead of a fixed
+500 tokens. The system prompt is the compact form by default and the
+full feature description only when the question is about the bot
+itself, and the whole prompt is kept within ``AI_PROMPT_BUDGET`` tokens.
+
+Tokens are counted with ``tiktoken`` when it is installed and estimated
+from the text otherwise. After each answer the prompt and completion
+tokens (as reported by the provider when available) and the estimated
+cost are logged and added to the metrics registry.
+"""
+import re
+import logging
+import importlib.util
+from functools import lru_cache
+from bot.config import AI_PROMPT_BUDGET, AI_MAX_TOKENS, AI_PRICES
+from bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TIKTOKEN_AVAILABLE = importlib.util.find_spec('tiktoken') is not None
+
+SYSTEM_PROMPT = (
+    "You are Jarvis, an intelligent Telegram bot assistant. You can help users with: "
+    "sending SMS messages (/sms command), making phone calls (/call command), "
+    "changing language preferences (/setlang command) and answering general questions. "
+    "Be helpful, concise, and friendly. If the user asks about features you have, "
+    "explain them clearly. If they ask questions outside your domain, provide helpful "
+    "general answers.")
+SHORT_SYSTEM_PROMPT = "You are Jarvis, a helpful Telegram bot assistant. Be concise and friendly."
+
+# Question profile -> answer length, sampling temperature and a length hint for the model
+PROFILES = {
+    'factual': {'max_tokens': 150, 'temperature': 0.2, 'hint': "Answer in one or two sentences."},
+    'general': {'max_tokens': 350, 'temperature': 0.7, 'hint': None},
+    'explain': {'max_tokens': 500, 'temperature': 0.5, 'hint': None},
+    'creative': {'max_tokens': 500, 'temperature': 0.9, 'hint': None}
+}
+
+# Checked in order; the first match wins
+_PROFILE_PATTERNS = (
+    ('creative', re.compile(
+        r'\b(write|compose|draft|poem|story|joke|lyrics|slogan|imagine|brainstorm)\b', re.I)),
+    ('explain', re.compile(
+        r'\b(explain|why|how (do|does|can|to|should)|difference between|compare|steps?|guide)\b',
+        re.I)),
+    ('factual', re.compile(
+        r'^\s*(who|what|when|where|which|how (many|much|old|far|long|tall|big)|is|are|was|were|'
+        r'does|did|can|define)\b', re.I))
+)
+# Questions about the bot itself get the full feature description
+_ABOUT_BOT = re.compile(
+    r'\b(jarvis|bots?|features?)\b|/(sms|call|setlang)\b|\bwhat can you do\b', re.I)
+# Rough tokenizer for the estimate: words, numbers and single punctuation marks
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+FACTUAL_MAX_WORDS = 20
+TRIM_MARKER = " … "
+# Tokens always left for the question; the system prompt is trimmed first
+MIN_QUESTION_TOKENS = 64
+# Smallest AI_PROMPT_BUDGET accepted at startup
+MIN_PROMPT_BUDGET = 128
+
+AI_TOKENS = REGISTRY.counter(
+    'jarvis_ai_tokens_total',
+    'Tokens sent to and received from AI providers',
+    ('provider', 'direction'))
+AI_COST = REGISTRY.counter(
+    'jarvis_ai_cost_usd_total',
+    'Estimated AI provider spend in USD',
+    ('provider',))
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        # The encoding file is downloaded on first use; estimate if that fails
+        logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or estimate them without it."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Long words split into several tokens; ~4 characters each
+    return sum(
+        (len(piece) + 3) // 4 if len(piece) > 4 else 1
+        for piece in _TOKEN_PIECES.findall(text))
+
+
+def truncate_to_tokens(text: str, limit: int) -> str:
+    """Shorten text to about ``limit`` tokens, keeping its beginning and end."""
+    if limit <= 0:
+        return ''
+    total = count_tokens(text)
+    if total <= limit:
+        return text
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        head = limit * 2 // 3
+        return (encoding.decode(tokens[:head]) + TRIM_MARKER
+                + encoding.decode(tokens[-(limit - head):]))
+    # Cut characters in proportion, then shrink until the estimate fits
+    chars = len(text) * limit // total
+    while True:
+        head = chars * 2 // 3
+        trimmed = text[:head] + TRIM_MARKER + text[len(text) - (chars - head):]
+        if chars <= 0 or count_tokens(trimmed) <= limit:
+            return trimmed
+        chars = chars * 9 // 10
+
+
+def check_prompt_budget(budget: int = AI_PROMPT_BUDGET) -> None:
+    """Reject a prompt budget too small to hold a system prompt and a question.
+
+    Raises:
+        ValueError: If budget is below MIN_PROMPT_BUDGET
+    """
+    if budget < MIN_PROMPT_BUDGET:
+        raise ValueError(
+            f"AI_PROMPT_BUDGET must be at least {MIN_PROMPT_BUDGET} tokens, got {budget}")
+
+
+def classify_question(message: str) -> str:
+    """Pick the response profile for a free-text question."""
+    for profile, pattern in _PROFILE_PATTERNS:
+        if pattern.search(message):
+            if profile == 'factual' and len(message.split()) > FACTUAL_MAX_WORDS:
+                continue
+            return profile
+    return 'general'
+
+
+def build_prompt(message: str, budget: int = AI_PROMPT_BUDGET) -> dict:
+    """Build the chat messages and generation settings for one question.
+
+    Returns:
+        dict: profile, messages, max_tokens, temperature and prompt_tokens
+        (the local count of what will be sent)
+    """
+    profile = classify_question(message)
+    settings = PROFILES[profile]
+
+    system_prompt = SYSTEM_PROMPT if _ABOUT_BOT.search(message) else SHORT_SYSTEM_PROMPT
+    if settings['hint']:
+        system_prompt = f"{system_prompt} {settings['hint']}"
+
+    system_tokens = count_tokens(system_prompt)
+    # The question keeps at least this much of the budget, however small it is
+    reserved = min(count_tokens(message), MIN_QUESTION_TOKENS)
+    if system_tokens >= budget // 2 or system_tokens > budget - reserved:
+        # A tight budget goes to the question rather than the feature list
+        system_prompt = SHORT_SYSTEM_PROMPT
+        system_tokens = count_tokens(system_prompt)
+    if system_tokens > budget - reserved:
+        system_prompt = truncate_to_tokens(system_prompt, max(budget - reserved, 0))
+        system_tokens = count_tokens(system_prompt)
+    message = truncate_to_tokens(message, max(budget - system_tokens, reserved))
+
+    return {
+        'profile': profile,
+        'messages': [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': message}
+        ],
+        'max_tokens': min(settings['max_tokens'], AI_MAX_TOKENS),
+        'temperature': settings['temperature'],
+        'prompt_tokens': system_tokens + count_tokens(message)
+    }
+
+
+def record_usage(provider: str, model: str, prompt: dict, answer: str,
+                 usage: dict = None, user_id: int = None) -> dict:
+    """Log and count the tokens and estimated cost of one AI answer.
+
+    Args:
+        provider: Provider name for metrics, e.g. 'deepseek'
+        model: Model name used to look up AI_PRICES
+        prompt: Result of build_prompt
+        answer: The generated answer text
+        usage: Provider-reported ``usage`` block, if any
+        user_id: Telegram user ID for the log line
+
+    Returns:
+        dict: prompt_tokens, completion_tokens and cost (USD, or None if
+        the model has no configured price)
+    """
+    usage = usage or {}
+    prompt_tokens = usage.get('prompt_tokens') or prompt['prompt_tokens']
+    completion_tokens = usage.get('completion_tokens') or count_tokens(answer)
+
+    prices = AI_PRICES.get(model)
+    cost = None
+    if prices:
+        cost = (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+        AI_COST.inc(cost, provider=provider)
+    AI_TOKENS.inc(prompt_tokens, provider=provider, direction='prompt')
+    AI_TOKENS.inc(completion_tokens, provider=provider, direction='completion')
+
+    logger.info(
+        "AI answer via %s for user %s: profile=%s prompt_tokens=%d completion_tokens=%d "
+        "max_tokens=%d cost=%s",
+        provider, user_id, prompt['profile'], prompt_tokens, completion_tokens,
+        prompt['max_tokens'], f"${cost:.6f}" if cost is not None else "n/a",
+        extra={
+            'ai_provider': provider,
+            'ai_profile': prompt['profile'],
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'cost_usd': cost
+        })
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens, 'cost': cost}
@@ -0,0 +1,411 @@
+"""Persistent scheduler for delayed and recurring SMS and call jobs."""
+import re
+import json
+import time
+import heapq
+import sqlite3
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from bot.config import (
+    SCHEDULER_DB,
+    SCHEDULER_TIMEZONE,
+    SCHEDULER_MIN_INTERVAL,
+    SCHEDULER_MAX_DAYS,
+    SCHEDULER_POLL_INTERVAL)
+from bot.shared import increment_counter
+from bot.phone import normalize_phone, PhoneNumberError
+
+logger = logging.getLogger(__name__)
+
+# Job kinds
+JOB_SMS = 'sms'
+JOB_CALL = 'call'
+
+# Schedule flags understood by /sms and /call
+SCHEDULE_FLAGS = ('--at', '--in', '--every')
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+DURATION_PATTERN = re.compile(r'^(\d+)([smhdw])$')
+# Later run times overflow datetime and SQLite; nobody schedules that far out
+MAX_SCHEDULE_SECONDS = SCHEDULER_MAX_DAYS * 86400
+
+
+def parse_duration(value: str) -> int:
+    """Parse a duration such as 30m, 2h or 1d into seconds."""
+    match = DURATION_PATTERN.match(value.lower())
+    if not match:
+        raise ValueError(
+            f"Invalid duration: {value}. Use a number followed by s, m, h, d or w (e.g. 30m)")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_time(value: str, now: datetime = None) -> datetime:
+    """Parse an --at value into an aware datetime.
+
+    Accepts HH:MM (next occurrence of that time) or an ISO 8601 date-time.
+    Times without an offset are interpreted in SCHEDULER_TIMEZONE.
+    """
+    tz = ZoneInfo(SCHEDULER_TIMEZONE)
+    now = now or datetime.now(tz)
+
+    try:
+        clock = datetime.strptime(value, '%H:%M')
+    except ValueError:
+        clock = None
+
+    if clock:
+        run_at = now.replace(
+            hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        return run_at
+
+    try:
+        run_at = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(
+            f"Invalid time: {value}. Use HH:MM or YYYY-MM-DDTHH:MM")
+    if run_at.tzinfo is None:
+        run_at = run_at.replace(tzinfo=tz)
+    return run_at
+
+
+def extract_schedule_args(args: list) -> tuple:
+    """Remove schedule flags from command arguments.
+
+    Returns:
+        tuple: (remaining_args, run_at_timestamp or None, interval_seconds or None)
+    """
+    args = list(args)
+    values = {}
+
+    for flag in SCHEDULE_FLAGS:
+        if flag in args:
+            index = args.index(flag)
+            if index + 1 >= len(args):
+                raise ValueError(f"{flag} flag requires a value")
+            values[flag] = args[index + 1]
+            args = args[:index] + args[index + 2:]
+
+    if not values:
+        return args, None, None
+
+    if '--at' in values and '--in' in values:
+        raise ValueError("Use either --at or --in, not both")
+
+    interval = None
+    if '--every' in values:
+        interval = parse_duration(values['--every'])
+        if interval < SCHEDULER_MIN_INTERVAL:
+            raise ValueError(
+                f"--every must be at least {SCHEDULER_MIN_INTERVAL} seconds")
+        if interval > MAX_SCHEDULE_SECONDS:
+            raise ValueError(f"--every must be at most {SCHEDULER_MAX_DAYS} days")
+
+    now = time.time()
+    if '--at' in values:
+        run_at = parse_time(values['--at']).timestamp()
+    elif '--in' in values:
+        delay = parse_duration(values['--in'])
+        if delay > MAX_SCHEDULE_SECONDS:
+            raise ValueError(f"--in must be at most {SCHEDULER_MAX_DAYS} days")
+        run_at = now + delay
+    else:
+        run_at = now + interval
+
+    if run_at - now > MAX_SCHEDULE_SECONDS:
+        raise ValueError(f"Jobs can be scheduled at most {SCHEDULER_MAX_DAYS} days ahead")
+
+    return args, run_at, interval
+
+
+def format_run_at(timestamp: float) -> str:
+    """Format a job timestamp in the scheduler timezone."""
+    tz = ZoneInfo(SCHEDULER_TIMEZONE)
+    return datetime.fromtimestamp(timestamp, tz).strftime('%Y-%m-%d %H:%M %Z')
+
+
+class JobScheduler:
+    """Timer heap of future jobs persisted in SQLite.
+
+    Every pending job is a row in the ``jobs`` table (indexed on ``run_at``),
+    so the schedule survives restarts. At runtime a heap of
+    ``(run_at, job_id)`` pairs gives O(log n) insertion and O(1) access to
+    the next due job; the dispatch loop sleeps until that job is due and is
+    woken early only when a new job becomes the head of the heap.
+
+    Jobs are removed (or rescheduled, when recurring) before dispatch, so a
+    crash mid-dispatch never sends the same SMS or call twice.
+
+    With several worker processes only one runs the dispatch loop; the
+    others just insert rows, which the running scheduler picks up every
+    ``poll_interval`` seconds.
+    """
+
+    def __init__(self, db_path: str = SCHEDULER_DB, poll_interval: float = SCHEDULER_POLL_INTERVAL):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._db = None
+        self._heap = []
+        self._max_id = 0
+        self._wakeup = None
+        self._task = None
+        self._bot = None
+        self._inflight = set()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Open the job database on first use."""
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, timeout=10)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                '''CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_at REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    interval INTEGER,
+                    chat_id INTEGER,
+                    user_id INTEGER,
+                    created_at REAL NOT NULL
+                )''')
+            self._db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_jobs_run_at ON jobs (run_at)')
+            self._db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, run_at)')
+            self._db.commit()
+        return self._db
+
+    def add_job(
+            self,
+            kind: str,
+            run_at: float,
+            payload: dict,
+            chat_id: int = None,
+            user_id: int = None,
+            interval: int = None) -> int:
+        """Persist a job and push it onto the timer heap. Returns the job ID.
+
+        Raises:
+            ValueError: If run_at or interval cannot be stored and shown
+        """
+        # Validate before committing: a stored job that cannot be formatted
+        # would break /jobs for its owner on every call
+        try:
+            when = format_run_at(run_at)
+        except (ValueError, OverflowError, OSError):
+            raise ValueError(f"Invalid run time: {run_at}")
+        if interval is not None and not 0 < interval <= MAX_SCHEDULE_SECONDS:
+            raise ValueError(f"Interval must be between 1 second and {SCHEDULER_MAX_DAYS} days")
+
+        cursor = self.db.execute(
+            'INSERT INTO jobs (run_at, kind, payload, interval, chat_id, user_id, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (run_at, kind, json.dumps(payload), interval, chat_id, user_id, time.time()))
+        self.db.commit()
+        job_id = cursor.lastrowid
+        self._max_id = max(self._max_id, job_id)
+
+        heapq.heappush(self._heap, (run_at, job_id))
+        if self._heap[0][1] == job_id and self._wakeup:
+            self._wakeup.set()
+
+        logger.info(f"Scheduled {kind} job {job_id} for {when}")
+        return job_id
+
+    def cancel_job(self, job_id: int, user_id: int = None) -> bool:
+        """Delete a pending job. Its heap entry is discarded lazily when due."""
+        if user_id is None:
+            cursor = self.db.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        else:
+            cursor = self.db.execute(
+                'DELETE FROM jobs WHERE id = ? AND user_id = ?', (job_id, user_id))
+        self.db.commit()
+        return cursor.rowcount > 0
+
+    def list_jobs(self, user_id: int, limit: int = 20) -> list:
+        """Return a user's next pending jobs ordered by run time."""
+        rows = self.db.execute(
+            'SELECT * FROM jobs WHERE user_id = ? ORDER BY run_at LIMIT ?',
+            (user_id, limit)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def pending_count(self) -> int:
+        """Number of jobs waiting to run."""
+        return self.db.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def _load(self):
+        """Rebuild the timer heap from the persisted jobs."""
+        self._heap = [
+            (row['run_at'], row['id'])
+            for row in self.db.execute('SELECT id, run_at FROM jobs')]
+        heapq.heapify(self._heap)
+        self._max_id = max((job_id for _, job_id in self._heap), default=0)
+        logger.info(f"Scheduler loaded {len(self._heap)} pending jobs")
+
+    def _poll_new_jobs(self):
+        """Push jobs inserted by other processes since the last poll."""
+        rows = self.db.execute(
+            'SELECT id, run_at FROM jobs WHERE id > ?', (self._max_id,)).fetchall()
+        for row in rows:
+            heapq.heappush(self._heap, (row['run_at'], row['id']))
+            self._max_id = max(self._max_id, row['id'])
+
+    async def start(self, bot):
+        """Load pending jobs and start the dispatch loop."""
+        self._bot = bot
+        self._wakeup = asyncio.Event()
+        self._load()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the dispatch loop and close the database."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A locked or broken database must not end the dispatch loop
+                logger.error(f"Scheduler dispatch loop error: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval or 5)
+                try:
+                    # The failed step may have popped a job it never rescheduled
+                    self.db.rollback()
+                    self._load()
+                except Exception as e:
+                    logger.error(f"Could not reload scheduled jobs: {e}")
+
+    async def _step(self):
+        """Wait for the next due job, or dispatch it once it is due."""
+        self._wakeup.clear()
+        if self.poll_interval:
+            self._poll_new_jobs()
+
+        if self._heap:
+            delay = self._heap[0][0] - time.time()
+        else:
+            delay = None
+        if self.poll_interval and (delay is None or delay > self.poll_interval):
+            delay = self.poll_interval
+
+        if delay is None or delay > 0:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        run_at, job_id = heapq.heappop(self._heap)
+        row = self.db.execute(
+            'SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        # Cancelled, or superseded by a reschedule
+        if row is None or row['run_at'] != run_at:
+            return
+
+        job = self._row_to_job(row)
+        if job['interval']:
+            next_run = run_at + job['interval']
+            now = time.time()
+            if next_run <= now:
+                # Skip occurrences missed while the bot was down
+                missed = (now - next_run) // job['interval'] + 1
+                next_run += missed * job['interval']
+            self.db.execute(
+                'UPDATE jobs SET run_at = ? WHERE id = ?', (next_run, job_id))
+            heapq.heappush(self._heap, (next_run, job_id))
+        else:
+            self.db.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        self.db.commit()
+
+        task = asyncio.create_task(self._dispatch(job))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, job: dict):
+        """Run a due job through its provider and notify the requesting chat."""
+        dispatcher = JOB_DISPATCHERS.get(job['kind'])
+        if not dispatcher:
+            logger.error(f"Unknown job kind {job['kind']} for job {job['id']}")
+            return
+
+        try:
+            text = await dispatcher(job['payload'])
+        except Exception as e:
+            logger.error(f"Scheduled job {job['id']} failed: {e}", exc_info=True)
+            text = f"❌ Scheduled {job['kind']} job #{job['id']} failed: {e}"
+
+        if job['chat_id'] and self._bot:
+            try:
+                await self._bot.send_message(job['chat_id'], text)
+            except Exception as e:
+                logger.warning(f"Could not notify chat for job {job['id']}: {e}")
+
+
+async def dispatch_sms(payload: dict) -> str:
+    """Send a scheduled SMS through the regular SMS providers."""
+    from bot.handlers.sms import get_provider, send_sms
+
+    # Jobs stored before numbers were validated at scheduling time may still be malformed
+    try:
+        phone = normalize_phone(payload['phone'])
+    except PhoneNumberError as e:
+        return f"❌ Scheduled SMS not sent: {e}"
+
+    provider = get_provider(payload['provider'])
+    result = await asyncio.to_thread(
+        send_sms, provider, payload['provider'], phone, payload['message'])
+
+    if result['success']:
+        increment_counter('sms_sent')
+        return f"⏰ Scheduled SMS sent: {result['message']}"
+    return f"❌ Scheduled SMS to {phone[:4]}**** failed: {result['message']}"
+
+
+async def dispatch_call(payload: dict) -> str:
+    """Place a scheduled call through the Twilio call handler."""
+    from bot.handlers.call import get_twilio_handler
+
+    try:
+        phone = normalize_phone(payload['phone'])
+    except PhoneNumberError as e:
+        return f"❌ Scheduled call not placed: {e}"
+
+    result = await get_twilio_handler().make_call_async(phone, payload.get('message'))
+
+    if result['success']:
+        increment_counter('calls_placed')
+        return f"⏰ Scheduled call to {phone} initiated (SID: {result['call_sid']})"
+    return f"❌ Scheduled call to {phone} failed: {result['error']}"
+
+
+JOB_DISPATCHERS = {
+    JOB_SMS: dispatch_sms,
+    JOB_CALL: dispatch_call
+}
+
+# Shared scheduler instance, started from the application's post_init hook
+scheduler = JobScheduler()
@@ -0,0 +1,295 @@
+"""Shared state backends for running several bot worker processes.
+
+Counters, caches and rate-limit windows go through a ``SharedBackend`` so
+that every worker sees the same values. The in-memory backend is for a
+single process; the SQLite backend works for workers on one host and the
+Redis backend (optional ``redis`` package) for workers on several hosts.
+"""
+import time
+import sqlite3
+import logging
+import threading
+from bot.config import (
+    SHARED_BACKEND,
+    SHARED_DB,
+    REDIS_URL,
+    RATE_LIMIT_PER_MINUTE)
+
+logger = logging.getLogger(__name__)
+
+# Shared backend constants
+BACKEND_MEMORY = 'memory'
+BACKEND_SQLITE = 'sqlite'
+BACKEND_REDIS = 'redis'
+
+
+class SharedBackend:
+    """Base class for shared key-value backends."""
+
+    def get(self, key: str) -> str:
+        """Return the value stored at key, or None."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        """Store a value, optionally expiring after ttl seconds."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove a key."""
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        """Atomically add amount to an integer counter and return the new value.
+
+        The ttl, if given, is applied when the counter is created.
+        """
+        raise NotImplementedError
+
+    def hit_rate_limit(self, key: str, limit: int, window: float) -> bool:
+        """Count one hit in the current fixed window.
+
+        Returns:
+            bool: True if the hit exceeds ``limit`` within ``window`` seconds
+        """
+        bucket = int(time.time() // window)
+        return self.incr(f"ratelimit:{key}:{bucket}", ttl=window) > limit
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class MemoryBackend(SharedBackend):
+    """Process-local backend; state is not shared between workers."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _alive(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: str) -> str:
+        with self._lock:
+            item = self._alive(key)
+        return item[0] if item else None
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._purge_expired()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        with self._lock:
+            item = self._alive(key)
+            if item:
+                value = int(item[0]) + amount
+                expires_at = item[1]
+            else:
+                value = amount
+                expires_at = time.time() + ttl if ttl else None
+            self._data[key] = (str(value), expires_at)
+            self._purge_expired()
+        return value
+
+    def _purge_expired(self) -> None:
+        """Drop expired keys at most once a minute. Caller holds the lock.
+
+        Rate-limit windows and cached translations are rarely read again
+        once expired, so without this they would accumulate forever.
+        """
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        expired = [
+            key for key, (_, expires_at) in self._data.items()
+            if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._data[key]
+
+
+class SQLiteBackend(SharedBackend):
+    """Backend stored in an SQLite database shared by workers on one host."""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or SHARED_DB
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=10,
+            isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            '''CREATE TABLE IF NOT EXISTS shared_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            )''')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS idx_shared_state_expires ON shared_state (expires_at)')
+        self._last_purge = 0.0
+
+    def get(self, key: str) -> str:
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM shared_state WHERE key = ? '
+                'AND (expires_at IS NULL OR expires_at > ?)',
+                (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, str(value), expires_at))
+            self._purge_expired()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute('DELETE FROM shared_state WHERE key = ?', (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.execute(
+                    'DELETE FROM shared_state WHERE key = ? AND expires_at <= ?',
+                    (key, now))
+                self._db.execute(
+                    'INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?',
+                    (key, str(amount), expires_at, amount))
+                value = self._db.execute(
+                    'SELECT value FROM shared_state WHERE key = ?', (key,)).fetchone()[0]
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._purge_expired()
+        return int(value)
+
+    def _purge_expired(self) -> None:
+        """Delete expired keys at most once a minute. Caller holds the lock."""
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        self._db.execute(
+            'DELETE FROM shared_state WHERE expires_at IS NOT NULL AND expires_at <= ?',
+            (now,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class RedisBackend(SharedBackend):
+    """Backend stored in a Redis-compatible server (requires the redis package)."""
+
+    def __init__(self, url: str = None):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                "The redis shared backend requires the 'redis' package (pip install redis)")
+        self.url = url or REDIS_URL
+        self._client = redis.Redis.from_url(self.url, decode_responses=True)
+
+    def get(self, key: str) -> str:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        self._client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        if not ttl:
+            return int(self._client.incrby(key, amount))
+        # Create the counter with its expiry and increment it in one MULTI, so a
+        # crash in between can't leave a rate-limit key that never expires
+        pipeline = self._client.pipeline(transaction=True)
+        pipeline.set(key, 0, px=int(ttl * 1000), nx=True)
+        pipeline.incrby(key, amount)
+        return int(pipeline.execute()[1])
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_shared_backend(backend: str) -> SharedBackend:
+    """Factory function to build a shared backend by name."""
+    backends = {
+        BACKEND_MEMORY: MemoryBackend,
+        BACKEND_SQLITE: SQLiteBackend,
+        BACKEND_REDIS: RedisBackend
+    }
+
+    backend_class = backends.get(backend.lower())
+    if not backend_class:
+        raise ValueError(
+            f"Unknown shared backend: {backend}. Available: {', '.join(backends.keys())}")
+
+    return backend_class()
+
+
+_shared_backend = None
+
+
+def get_shared_backend() -> SharedBackend:
+    """Return the process-wide shared backend, creating it on first use."""
+    global _shared_backend
+    if _shared_backend is None:
+        _shared_backend = create_shared_backend(SHARED_BACKEND)
+    return _shared_backend
+
+
+def is_rate_limited(user_id: int, action: str) -> bool:
+    """Count one action for the user and report whether the limit is exceeded.
+
+    The limit is RATE_LIMIT_PER_MINUTE across all workers; 0 disables it.
+    """
+    if RATE_LIMIT_PER_MINUTE <= 0:
+        return False
+    try:
+        return get_shared_backend().hit_rate_limit(
+            f"{action}:{user_id}", RATE_LIMIT_PER_MINUTE, 60)
+    except Exception as e:
+        logger.warning(f"Rate limit check failed, allowing request: {e}")
+        return False
+
+
+def increment_counter(name: str, amount: int = 1) -> None:
+    """Increment a shared usage counter, ignoring backend errors."""
+    try:
+        get_shared_backend().incr(f"counter:{name}", amount)
+    except Exception as e:
+        logger.warning(f"Failed to increment counter {name}: {e}")
+
+
+def get_counter(name: str) -> int:
+    """Read a shared usage counter (0 if unset)."""
+    try:
+        return int(get_shared_backend().get(f"counter:{name}") or 0)
+    except Exception as e:
+        logger.warning(f"Failed to read counter {name}: {e}")
+        return 0
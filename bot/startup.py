@@ -0,0 +1,133 @@
+"""Startup timing: phase marks for the running bot and an import cost report.
+
+Import this module before anything else in the entry point so that
+``PROCESS_START`` is as close as possible to interpreter start.
+
+Run ``python -m bot.startup`` to print the per-module import cost of
+``bot.main`` (measured with ``python -X importtime`` in a fresh interpreter).
+Pass ``--budget-ms`` to exit non-zero when the total exceeds a budget, so
+startup regressions fail CI.
+"""
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+PROCESS_START = time.perf_counter()
+
+# Startup phases in the order they are expected to happen
+PHASE_IMPORTS = 'imports'
+PHASE_APP_BUILT = 'app_built'
+PHASE_INITIALIZED = 'initialized'
+PHASE_FIRST_UPDATE = 'first_update'
+
+IMPORTTIME_PATTERN = re.compile(
+    r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+_marks = {}
+
+
+def mark(phase: str) -> float:
+    """Record the first time a startup phase is reached.
+
+    Returns:
+        float: Seconds since process start at which the phase was reached
+    """
+    if phase not in _marks:
+        _marks[phase] = time.perf_counter() - PROCESS_START
+        logger.info(f"Startup phase '{phase}' reached after {_marks[phase] * 1000:.0f} ms")
+    return _marks[phase]
+
+
+def get_marks() -> dict:
+    """Return the recorded phases as {phase: seconds since process start}."""
+    return dict(_marks)
+
+
+async def record_first_update(update, context) -> None:
+    """Update handler that records time-to-first-update.
+
+    Register in an early handler group; it never stops processing.
+    """
+    if PHASE_FIRST_UPDATE not in _marks:
+        mark(PHASE_FIRST_UPDATE)
+        logger.info(f"Startup report: {format_marks()}")
+
+
+def format_marks() -> str:
+    """Render the recorded phases as a single log-friendly line."""
+    return ', '.join(
+        f"{phase} {seconds * 1000:.0f} ms"
+        for phase, seconds in sorted(_marks.items(), key=lambda item: item[1]))
+
+
+def measure_imports(module: str = 'bot.main', python: str = None) -> list:
+    """Measure the import cost of ``module`` in a fresh interpreter.
+
+    Returns:
+        list: (module_name, self_us, cumulative_us, depth) tuples in import order
+    """
+    env = dict(os.environ)
+    env.setdefault('PYTHONPATH', os.getcwd())
+    completed = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False)
+
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    results = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            depth = (len(indent) - 1) // 2
+            results.append((name, int(self_us), int(cumulative_us), depth))
+    return results
+
+
+def format_import_report(results: list, top: int = 20) -> str:
+    """Render the most expensive imports and the total import time."""
+    total_us = sum(self_us for _, self_us, _, _ in results)
+    slowest = sorted(results, key=lambda r: r[2], reverse=True)[:top]
+
+    lines = [f"Total import time: {total_us / 1000:.1f} ms ({len(results)} modules)", ""]
+    lines.append(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for name, self_us, cumulative_us, _ in slowest:
+        lines.append(f"{cumulative_us / 1000:>14.1f}  {self_us / 1000:>8.1f}  {name}")
+    return '\n'.join(lines)
+
+
+def main(argv: list = None) -> int:
+    """Command-line entry point for the import cost report."""
+    parser = argparse.ArgumentParser(
+        description="Report per-module import cost of the bot")
+    parser.add_argument('--module', default='bot.main',
+                        help="Module to import (default: bot.main)")
+    parser.add_argument('--top', type=int, default=20,
+                        help="Number of most expensive imports to list")
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="Exit with status 1 if total import time exceeds this")
+    args = parser.parse_args(argv)
+
+    results = measure_imports(args.module)
+    print(format_import_report(results, args.top))
+
+    total_ms = sum(self_us for _, self_us, _, _ in results) / 1000
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nFAIL: import time {total_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Near-duplicate clustering of logged feature suggestions.
+
+Each suggestion's user message is reduced to a MinHash signature over
+character shingles. Signatures are split into LSH bands stored in SQLite,
+so a new suggestion is compared only against clusters that share at least
+one band bucket with it: joining a cluster (or starting a new one) costs a
+handful of indexed lookups however many suggestions have been logged.
+
+The ``/suggestions`` report lists the largest clusters with a
+representative message, so hundreds of "can you book a flight" variants
+show up as one line with a count.
+"""
+import os
+import re
+import time
+import zlib
+import random
+import sqlite3
+import logging
+import threading
+from array import array
+from datetime import datetime
+from bot.config import SUGGESTION_DB, SUGGESTION_SIMILARITY
+from bot.logstore import get_log
+
+logger = logging.getLogger(__name__)
+
+NUM_PERMUTATIONS = 64
+# 16 bands of 4 rows: a pair with similarity s shares a bucket with probability
+# 1 - (1 - s**4)**16, i.e. ~64% at 0.5, ~89% at 0.6 and ~99% at 0.7
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 4
+# Candidate clusters compared exactly per new suggestion
+MAX_CANDIDATES = 32
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)]
+
+_NON_WORD = re.compile(r'[^a-z0-9 ]+')
+_DIGITS = re.compile(r'\d')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and mask digits so trivial variants match."""
+    text = _DIGITS.sub('0', text.lower())
+    text = _NON_WORD.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def shingles(text: str) -> set:
+    """Hashed character shingles of the normalized text."""
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {
+        zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8'))
+        for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> array:
+    """MinHash signature of the text's shingles."""
+    hashed = shingles(text)
+    return array('Q', (
+        min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashed)
+        for a, b in _PERMUTATIONS))
+
+
+def similarity(first: array, second: array) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERMUTATIONS
+
+
+def band_buckets(signature: array) -> list:
+    """One bucket key per LSH band; equal keys mean an identical band."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        buckets.append((band << 32) | zlib.crc32(rows.tobytes()))
+    return buckets
+
+
+class SuggestionClusters:
+    """SQLite-backed incremental MinHash/LSH clusters of suggestions."""
+
+    def __init__(self, db_path: str = None, threshold: float = SUGGESTION_SIMILARITY):
+        self.db_path = db_path or SUGGESTION_DB
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            '''CREATE TABLE IF NOT EXISTS clusters (
+                id INTEGER PRIMARY KEY,
+                representative TEXT NOT NULL,
+                latest TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                count INTEGER NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            )''')
+        self._db.execute(
+            '''CREATE TABLE IF NOT EXISTS cluster_users (
+                cluster_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (cluster_id, user_id)
+            ) WITHOUT ROWID''')
+        self._db.execute(
+            '''CREATE TABLE IF NOT EXISTS lsh_buckets (
+                bucket INTEGER NOT NULL,
+                cluster_id INTEGER NOT NULL,
+                PRIMARY KEY (bucket, cluster_id)
+            ) WITHOUT ROWID''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS clusters_count ON clusters (count DESC)')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._db.execute(
+            '''CREATE TABLE IF NOT EXISTS backfill_progress (
+                segment TEXT PRIMARY KEY,
+                position INTEGER NOT NULL
+            )''')
+        self._db.commit()
+
+    def add(self, user_id: int, message: str, timestamp: float = None) -> int:
+        """Attach a suggestion to its nearest cluster or start a new one.
+
+        Returns:
+            int: The cluster ID
+        """
+        signature = minhash(message)
+        buckets = band_buckets(signature)
+        timestamp = timestamp or time.time()
+
+        with self._lock:
+            # IMMEDIATE so two worker processes can't both start the same cluster
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                cluster_id = self._add(user_id, message, timestamp, signature, buckets)
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+        return cluster_id
+
+    def _add(self, user_id, message, timestamp, signature, buckets) -> int:
+        placeholders = ','.join('?' * len(buckets))
+        candidates = self._db.execute(
+            f'SELECT c.id, c.signature FROM clusters c WHERE c.id IN ('
+            f'SELECT DISTINCT cluster_id FROM lsh_buckets WHERE bucket IN ({placeholders}) '
+            f'LIMIT {MAX_CANDIDATES})', buckets).fetchall()
+
+        best_id, best_score = None, 0.0
+        for cluster_id, blob in candidates:
+            score = similarity(signature, array('Q', blob))
+            if score > best_score:
+                best_id, best_score = cluster_id, score
+
+        if best_id is not None and best_score >= self.threshold:
+            self._db.execute(
+                'UPDATE clusters SET count = count + 1, latest = ?, last_seen = MAX(last_seen, ?) '
+                'WHERE id = ?', (message, timestamp, best_id))
+            cluster_id = best_id
+        else:
+            cluster_id = self._db.execute(
+                'INSERT INTO clusters '
+                '(representative, latest, signature, count, first_seen, last_seen) '
+                'VALUES (?, ?, ?, 1, ?, ?)',
+                (message, message, signature.tobytes(), timestamp, timestamp)).lastrowid
+            self._db.executemany(
+                'INSERT OR IGNORE INTO lsh_buckets (bucket, cluster_id) VALUES (?, ?)',
+                [(bucket, cluster_id) for bucket in buckets])
+
+        if user_id is not None:
+            self._db.execute(
+                'INSERT OR IGNORE INTO cluster_users (cluster_id, user_id) VALUES (?, ?)',
+                (cluster_id, user_id))
+        return cluster_id
+
+    def top(self, limit: int = 10) -> list:
+        """Largest clusters first, as dicts."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT c.id, c.representative, c.latest, c.count, c.first_seen, c.last_seen, '
+                '(SELECT COUNT(*) FROM cluster_users u WHERE u.cluster_id = c.id) '
+                'FROM clusters c ORDER BY c.count DESC, c.last_seen DESC LIMIT ?',
+                (limit,)).fetchall()
+        keys = ('id', 'representative', 'latest', 'count', 'first_seen', 'last_seen', 'users')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def totals(self) -> dict:
+        """Number of clusters and clustered suggestions."""
+        with self._lock:
+            clusters, suggestions = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(count), 0) FROM clusters').fetchone()
+        return {'clusters': clusters, 'suggestions': suggestions}
+
+    def backfill(self, log) -> int:
+        """Cluster already-logged suggestions, resuming where a previous run stopped.
+
+        Progress is the number of entries consumed per segment, keyed by
+        the segment's name (which survives sealing), and is stored in the
+        same transaction as each entry is clustered. A crash part-way
+        through resumes at the next entry, concurrent workers never cluster
+        an entry twice, and segments deleted by retention don't shift the
+        position in the others.
+
+        Args:
+            log: The SegmentedLog holding the suggestions
+        """
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE key = 'backfilled'").fetchone()
+        if done:
+            return 0
+
+        count = 0
+        for path in log.segments():
+            segment = os.path.basename(path).split('.', 1)[0]
+            for position, entry in enumerate(log.read_segment(path)):
+                if self._backfill_entry(segment, position, entry):
+                    count += 1
+
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', '1')")
+            self._db.execute('DELETE FROM backfill_progress')
+            self._db.commit()
+        if count:
+            logger.info(f"Clustered {count} previously logged suggestions")
+        return count
+
+    def _backfill_entry(self, segment: str, position: int, entry: dict) -> bool:
+        """Cluster one logged entry unless an earlier run already did."""
+        message = entry.get('message')
+        try:
+            timestamp = datetime.fromisoformat(entry['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            timestamp = None
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._db.execute(
+                    'SELECT position FROM backfill_progress WHERE segment = ?',
+                    (segment,)).fetchone()
+                if position < (row[0] if row else 0):
+                    self._db.rollback()
+                    return False
+                if message:
+                    signature = minhash(message)
+                    self._add(entry.get('user_id'), message, timestamp or time.time(),
+                              signature, band_buckets(signature))
+                self._db.execute(
+                    'INSERT OR REPLACE INTO backfill_progress (segment, position) VALUES (?, ?)',
+                    (segment, position + 1))
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+        return bool(message)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def format_report(clusters: list, totals: dict, width: int = 120) -> str:
+    """Render the top clusters as plain chat text."""
+    if not clusters:
+        return "💡 No suggestions logged yet."
+
+    lines = [
+        f"💡 Top suggestion clusters "
+        f"({totals['suggestions']} suggestions in {totals['clusters']} clusters)\n"]
+    for rank, cluster in enumerate(clusters, 1):
+        last_seen = time.strftime('%Y-%m-%d', time.localtime(cluster['last_seen']))
+        lines.append(
+            f"{rank}. {cluster['count']}× from {cluster['users']} users, last {last_seen}")
+        lines.append(f"   “{cluster['representative'][:width]}”")
+        if cluster['latest'] != cluster['representative']:
+            lines.append(f"   latest: “{cluster['latest'][:width]}”")
+    return '\n'.join(lines)
+
+
+_clusters = None
+_clusters_lock = threading.Lock()
+
+
+def get_suggestion_clusters() -> SuggestionClusters:
+    """Return the shared cluster store, backfilling it from the suggestions log on first use."""
+    global _clusters
+    with _clusters_lock:
+        if _clusters is None:
+            clusters = SuggestionClusters()
+            try:
+                clusters.backfill(get_log('suggestions'))
+            except Exception:
+                # Retried, and resumed, on the next call instead of caching a partial index
+                clusters.close()
+                raise
+            _clusters = clusters
+        return _clusters
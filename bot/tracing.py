@@ -0,0 +1,215 @@
+"""Span-based request tracing kept in an in-memory ring buffer.
+
+Every incoming update starts a trace; ``span()`` records child spans for
+intent classification, translation, AI and provider calls and Telegram API
+requests. Finished traces are sampled (all slow traces, a fraction of the
+rest) into a bounded ring buffer that can be exported as JSON.
+
+The current span lives in a ``contextvars.ContextVar``, so spans opened in
+``asyncio.to_thread`` workers attach to the trace of the calling handler.
+"""
+import json
+import time
+import random
+import logging
+import secrets
+import functools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from telegram.request import HTTPXRequest
+from bot.config import (
+    TRACING_ENABLED,
+    TRACE_BUFFER_SIZE,
+    TRACE_SAMPLE_RATE,
+    TRACE_SLOW_THRESHOLD_MS)
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('jarvis_current_span', default=None)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'start', 'duration', 'attributes', 'error')
+
+    def __init__(self, trace, name: str, parent_id: str = None, attributes: dict = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.duration = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+class Trace:
+    """All spans recorded while handling one update."""
+
+    def __init__(self, name: str):
+        self.trace_id = secrets.token_hex(8)
+        self.name = name
+        self.spans = []
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration or 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'start': self.root.start,
+            'duration_ms': round(self.duration * 1000, 3),
+            'spans': [span.to_dict() for span in self.spans]
+        }
+
+
+class TraceBuffer:
+    """Bounded ring buffer of sampled traces."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE):
+        self._traces = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, trace: Trace) -> bool:
+        """Keep the trace if it is slow or falls within the sample rate."""
+        slow = trace.duration * 1000 >= TRACE_SLOW_THRESHOLD_MS
+        if not slow and random.random() >= TRACE_SAMPLE_RATE:
+            return False
+        with self._lock:
+            self._traces.append(trace)
+        if slow:
+            logger.info(
+                f"Slow trace {trace.trace_id} ({trace.name}): {trace.duration * 1000:.0f} ms")
+        return True
+
+    def traces(self) -> list:
+        """Snapshot of buffered traces, oldest first."""
+        with self._lock:
+            return list(self._traces)
+
+    def slowest(self, limit: int = 10) -> list:
+        return sorted(self.traces(), key=lambda trace: trace.duration, reverse=True)[:limit]
+
+    def export_json(self) -> str:
+        """Serialize all buffered traces as a JSON document."""
+        return json.dumps(
+            {'exported_at': time.time(), 'traces': [trace.to_dict() for trace in self.traces()]},
+            ensure_ascii=False,
+            indent=2)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+TRACE_BUFFER = TraceBuffer()
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Start a new trace with a root span and make it current."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+
+    trace = Trace(name)
+    root = Span(trace, name, attributes=attributes)
+    trace.spans.append(root)
+    token = _current_span.set(root)
+    start = time.perf_counter()
+    try:
+        yield root
+    except Exception as e:
+        root.error = repr(e)
+        raise
+    finally:
+        root.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        TRACE_BUFFER.record(trace)
+
+
+def current_trace_id() -> str:
+    """ID of the trace being recorded in this context, or None."""
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record a child span of the current trace; a no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    parent.trace.spans.append(child)
+    token = _current_span.set(child)
+    start = time.perf_counter()
+    try:
+        yield child
+    except Exception as e:
+        child.error = repr(e)
+        raise
+    finally:
+        child.duration = time.perf_counter() - start
+        _current_span.reset(token)
+
+
+def traced_handler(name: str, callback):
+    """Wrap an async update handler so each update starts a trace."""
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        user = getattr(update, 'effective_user', None)
+        with start_trace(name, user_id=user.id if user else None):
+            return await callback(update, context)
+
+    return wrapper
+
+
+class TracingRequest(HTTPXRequest):
+    """Telegram request backend that records a span per Bot API call."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        endpoint = url.rsplit('/', 1)[-1]
+        with span(f"telegram.{endpoint}"):
+            return await super().do_request(url, method, *args, **kwargs)
+
+
+def format_trace_summary(limit: int = 10) -> str:
+    """Describe the slowest buffered traces for chat output."""
+    traces = TRACE_BUFFER.slowest(limit)
+    if not traces:
+        return "🔍 No traces recorded yet."
+
+    lines = [f"🔍 Slowest traces ({len(TRACE_BUFFER.traces())} buffered)\n"]
+    for trace in traces:
+        lines.append(f"• {trace.name}: {trace.duration * 1000:.0f} ms [{trace.trace_id}]")
+        children = sorted(
+            (s for s in trace.spans[1:] if s.duration is not None),
+            key=lambda s: s.duration,
+            reverse=True)[:3]
+        for child in children:
+            lines.append(f"    ↳ {child.name}: {child.duration * 1000:.0f} ms")
+    return '\n'.join(lines)
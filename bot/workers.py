@@ -0,0 +1,219 @@
+"""Multi-process webhook mode: one front process, several bot workers.
+
+The front process receives Telegram webhook updates over HTTP and hands
+each one to a worker chosen by chat ID, so all updates of one chat are
+processed in order by the same worker while different chats run in
+parallel on separate cores. Workers share preferences, counters, caches
+and rate limits through the shared backend (see ``bot.shared``).
+
+Usage:
+    SHARED_BACKEND=sqlite PREFERENCE_BACKEND=sqlite \\
+    WEBHOOK_URL=https://bot.example.com/telegram python -m bot.workers --workers 4
+"""
+import os
+import sys
+import json
+import hmac
+import signal
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bot.config import (
+    TOKEN,
+    BOT_WORKERS,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    SHARED_BACKEND)
+from bot.log_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Update fields that carry a chat, checked in order
+CHAT_FIELDS = (
+    'message',
+    'edited_message',
+    'channel_post',
+    'edited_channel_post',
+    'my_chat_member',
+    'chat_member',
+    'chat_join_request')
+
+# Environment variable telling a worker process its index
+WORKER_INDEX_ENV = 'JARVIS_WORKER_INDEX'
+
+
+def shard_key(update: dict) -> int:
+    """Return the chat ID (or best available ID) used to pick a worker."""
+    for field in CHAT_FIELDS:
+        chat = (update.get(field) or {}).get('chat')
+        if chat and 'id' in chat:
+            return int(chat['id'])
+
+    callback = update.get('callback_query')
+    if callback:
+        message = callback.get('message') or {}
+        if 'chat' in message:
+            return int(message['chat']['id'])
+        return int(callback['from']['id'])
+
+    for value in update.values():
+        if isinstance(value, dict) and 'from' in value:
+            return int(value['from']['id'])
+
+    return int(update.get('update_id', 0))
+
+
+def worker_for(update: dict, workers: int) -> int:
+    """Pick the worker index that owns this update's chat."""
+    return shard_key(update) % workers
+
+
+async def _serve_worker(index: int, updates: multiprocessing.Queue):
+    """Process updates from the queue with a full bot application."""
+    from telegram import Update
+    from bot.main import build_application
+
+    # Only the first worker dispatches scheduled jobs
+    app = build_application(run_scheduler=(index == 0))
+    loop = asyncio.get_running_loop()
+
+    async with app:
+        if app.post_init:
+            await app.post_init(app)
+        await app.start()
+        logger.info(f"Worker {index} ready (pid {os.getpid()})")
+
+        while True:
+            raw = await loop.run_in_executor(None, updates.get)
+            if raw is None:
+                break
+            try:
+                update = Update.de_json(json.loads(raw), app.bot)
+                await app.update_queue.put(update)
+            except Exception as e:
+                logger.error(f"Worker {index} dropped malformed update: {e}")
+
+        await app.stop()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+    logger.info(f"Worker {index} stopped")
+
+
+def worker_main(index: int, updates: multiprocessing.Queue):
+    """Entry point of a worker process."""
+    os.environ[WORKER_INDEX_ENV] = str(index)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging(process_label=f'worker{index}')
+    asyncio.run(_serve_worker(index, updates))
+
+
+def make_request_handler(queues: list):
+    """Build the HTTP handler class that routes webhook posts to worker queues."""
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.split('?')[0] != WEBHOOK_PATH:
+                self.send_error(404)
+                return
+
+            if WEBHOOK_SECRET:
+                token = self.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+                if not hmac.compare_digest(token, WEBHOOK_SECRET):
+                    self.send_error(403)
+                    return
+
+            length = int(self.headers.get('Content-Length', 0))
+            raw = self.rfile.read(length)
+            try:
+                update = json.loads(raw)
+                queues[worker_for(update, len(queues))].put(raw)
+            except (ValueError, TypeError, KeyError) as e:
+                logger.warning(f"Rejected malformed webhook payload: {e}")
+                self.send_error(400)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            # Per-request access logs are too noisy at webhook rates
+            pass
+
+    return WebhookHandler
+
+
+def set_webhook(url: str) -> None:
+    """Point Telegram at the front process."""
+    import requests
+
+    data = {'url': url}
+    if WEBHOOK_SECRET:
+        data['secret_token'] = WEBHOOK_SECRET
+    response = requests.post(
+        f'https://api.telegram.org/bot{TOKEN}/setWebhook', data=data, timeout=10)
+    response.raise_for_status()
+    logger.info(f"Webhook set to {url}")
+
+
+def serve(workers: int, listen: str, port: int):
+    """Start the worker processes and the webhook front end."""
+    if workers > 1 and SHARED_BACKEND == 'memory':
+        logger.warning(
+            "SHARED_BACKEND=memory: counters, caches and rate limits will not be "
+            "shared between workers. Use sqlite or redis.")
+
+    # Workers must pick up jobs and preference changes made by their peers
+    os.environ.setdefault('SCHEDULER_POLL_INTERVAL', '5')
+    os.environ.setdefault('PREFERENCE_CACHE_TTL', '30')
+
+    context = multiprocessing.get_context('spawn')
+    queues = [context.Queue() for _ in range(workers)]
+    processes = [
+        context.Process(target=worker_main, args=(index, queues[index]), name=f'bot-worker-{index}')
+        for index in range(workers)]
+    for process in processes:
+        process.start()
+
+    if WEBHOOK_URL:
+        set_webhook(WEBHOOK_URL)
+
+    server = ThreadingHTTPServer((listen, port), make_request_handler(queues))
+    logger.info(f"Webhook front end listening on {listen}:{port}{WEBHOOK_PATH} with {workers} workers")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for queue in queues:
+            queue.put(None)
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+
+
+def main(argv: list = None) -> int:
+    """Command-line entry point for multi-worker mode."""
+    parser = argparse.ArgumentParser(description="Run the bot as several webhook workers")
+    parser.add_argument('--workers', type=int, default=BOT_WORKERS,
+                        help="Number of worker processes")
+    parser.add_argument('--listen', default=WEBHOOK_LISTEN, help="Address to listen on")
+    parser.add_argument('--port', type=int, default=WEBHOOK_PORT, help="Port to listen on")
+    args = parser.parse_args(argv)
+
+    setup_logging(process_label='front')
+    serve(max(1, args.workers), args.listen, args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import sys
+import asyncio
+import pytest
+
+if sys.version_info < (3, 12):
+    # bot.handlers.call uses multi-line f-string expressions
+    pytest.skip("bot.handlers.call requires Python 3.12", allow_module_level=True)
+
+from bot.handlers import call as call_module
+from bot.handlers.call import (
+    CALL_BULK_CONCURRENCY,
+    CALL_BULK_RATE,
+    CallRateLimiter,
+    format_campaign_progress,
+    parse_bulk_args,
+    run_call_campaign)
+
+
+class FakeCallHandler:
+    """Records calls and how many were in flight at once."""
+
+    def __init__(self, failing: set = frozenset()):
+        self.failing = failing
+        self.called = []
+        self.active = 0
+        self.peak = 0
+
+    async def make_call_async(self, number: str, message: str = None) -> dict:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.called.append(number)
+        if number in self.failing:
+            return {'success': False, 'error': 'Number_unreachable'}
+        return {'success': True, 'call_sid': 'CA1', 'status': 'queued', 'from': '+1'}
+
+
+def test_rate_limiter_spaces_call_starts():
+    async def start_times():
+        limiter = CallRateLimiter(20)
+        loop = asyncio.get_running_loop()
+        times = []
+        for _ in range(4):
+            await limiter.wait()
+            times.append(loop.time())
+        return times
+
+    times = asyncio.run(start_times())
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
+
+
+def test_rate_limiter_without_rate_never_waits():
+    assert CallRateLimiter(0).interval == 0.0
+
+
+def test_campaign_bounds_concurrency_and_reports_failures(monkeypatch):
+    handler = FakeCallHandler(failing={'+13125550187'})
+    monkeypatch.setattr(call_module, '_twilio_handler', handler)
+    numbers = ['+12025550123', '+13125550187', '+14155552671', '+12125550100', 'bogus']
+    progress = []
+
+    async def on_progress(totals):
+        progress.append(totals['completed'])
+
+    totals = asyncio.run(run_call_campaign(
+        numbers, 'hello', concurrency=2, rate=0, on_progress=on_progress))
+
+    assert handler.peak == 2
+    assert sorted(handler.called) == sorted(numbers[:4])
+    assert (totals['total'], totals['completed'], totals['succeeded'], totals['failed']) == (5, 5, 3, 2)
+    assert set(totals['errors']) == {'+13125550187', 'bogus'}
+    assert progress == [2, 3, 4, 5]
+
+    report = format_campaign_progress(totals, finished=True)
+    assert 'Number\\_unreachable' in report
+
+
+def test_parse_bulk_args():
+    numbers, message, concurrency, rate = parse_bulk_args(
+        ['+12025550123,+13125550187', '+12025550123', 'Hi', 'there', '--concurrency', '1'])
+    assert numbers == ['+12025550123', '+13125550187']
+    assert message == 'Hi there'
+    assert concurrency == 1
+    assert rate == CALL_BULK_RATE
+
+
+def test_parse_bulk_args_options_only_lower_the_caps():
+    _, _, concurrency, _ = parse_bulk_args(['+12025550123', '--concurrency', '1000'])
+    assert concurrency == CALL_BULK_CONCURRENCY
+
+
+@pytest.mark.parametrize('args', [
+    ['--rate', 'nan'],
+    ['--rate', 'inf'],
+    ['--rate', '0'],
+    ['--concurrency', 'two'],
+    ['--concurrency'],
+])
+def test_parse_bulk_args_rejects_bad_options(args):
+    with pytest.raises(ValueError):
+        parse_bulk_args(['+12025550123'] + args)
@@ -0,0 +1,129 @@
+import os
+import json
+from datetime import datetime, timedelta
+import pytest
+from bot.logsearch import LogSearchIndex, parse_query
+from bot.logstore import SegmentedLog
+
+
+def write_segment(directory, stamp: str, entries: list) -> str:
+    path = os.path.join(directory, f"requests-{stamp}.jsonl")
+    with open(path, 'a') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+    return path
+
+
+def entry(user_id: int, message: str, day: int = 1, intent: str = 'general_question') -> dict:
+    return {
+        'timestamp': f'2026-01-{day:02d}T12:00:00',
+        'user_id': user_id,
+        'username': f'user{user_id}',
+        'message': message,
+        'detected_intent': intent,
+        'response': 'ok'
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    log_dir = tmp_path / 'requests'
+    log_dir.mkdir()
+    search = LogSearchIndex(str(tmp_path / 'search.db'), SegmentedLog(str(log_dir), 'requests'))
+    yield search
+    search.close()
+
+
+def ingested(search: LogSearchIndex) -> dict:
+    return dict(search._db.execute('SELECT segment, offset FROM ingested'))
+
+
+def test_parse_query_filters_and_terms():
+    query = parse_query('user:@Alice intent:SMS limit:5 refund since:2026-01-02')
+    assert query == {
+        'terms': ['refund'],
+        'limit': 5,
+        'username': 'Alice',
+        'intent': 'sms',
+        'since': '2026-01-02T00:00:00'
+    }
+    assert parse_query('user:12345')['user_id'] == 12345
+
+
+def test_parse_query_last():
+    since = datetime.fromisoformat(parse_query('last:7d')['since'])
+    assert abs(datetime.now() - timedelta(days=7) - since) < timedelta(seconds=5)
+
+
+@pytest.mark.parametrize('text', ['last:7x', 'last:99999999999w', 'since:yesterday', 'limit:many'])
+def test_parse_query_rejects_bad_filters(text):
+    with pytest.raises(ValueError):
+        parse_query(text)
+
+
+def test_sync_reads_only_appended_lines(index):
+    directory = index.log.directory
+    path = write_segment(directory, '20260101T000000000000', [entry(1, 'first')])
+    assert index.sync() == 1
+    offset = ingested(index)['requests-20260101T000000000000']
+    assert offset == os.path.getsize(path)
+
+    write_segment(directory, '20260101T000000000000', [entry(2, 'second')])
+    assert index.sync() == 1
+    assert index.sync() == 0
+    assert index.search(parse_query('second'))['total'] == 1
+
+
+def test_partial_line_is_picked_up_next_sync(index):
+    path = write_segment(index.log.directory, '20260101T000000000000', [entry(1, 'whole')])
+    line = json.dumps(entry(2, 'torn'))
+    with open(path, 'a') as f:
+        f.write(line[:10])
+    assert index.sync() == 1
+
+    with open(path, 'a') as f:
+        f.write(line[10:] + '\n')
+    assert index.sync() == 1
+    assert index.search(parse_query('torn'))['total'] == 1
+
+
+def test_offset_carries_over_when_segment_is_sealed(index):
+    directory = index.log.directory
+    path = write_segment(directory, '20260101T000000000000', [entry(1, 'before')])
+    assert index.sync() == 1
+
+    write_segment(directory, '20260101T000000000000', [entry(2, 'after')])
+    sealing = path[:-len('.jsonl')] + '.jsonl.sealing'
+    os.replace(path, sealing)
+    index.log._seal(sealing)
+    assert os.path.exists(path + '.gz')
+    assert index.sync() == 1
+    assert index.search(parse_query('user:1'))['total'] == 1
+    assert index.search(parse_query('user:2'))['total'] == 1
+
+
+def test_search_filters(index):
+    write_segment(index.log.directory, '20260101T000000000000', [
+        entry(1, 'send a text', day=1, intent='sms'),
+        entry(1, 'call my mom', day=2, intent='call'),
+        entry(2, 'send a text', day=3, intent='sms'),
+    ])
+    index.sync()
+    assert index.search(parse_query('user:1'))['total'] == 2
+    assert index.search(parse_query('intent:sms'))['total'] == 2
+    assert index.search(parse_query('since:2026-01-02 until:2026-01-03'))['total'] == 1
+    result = index.search(parse_query('text limit:1'))
+    assert result['total'] == 2
+    assert [found['user_id'] for found in result['entries']] == [2]
+
+
+def test_sync_forgets_segments_removed_by_retention(index):
+    directory = index.log.directory
+    old = write_segment(directory, '20260101T000000000000', [entry(1, 'old')])
+    write_segment(directory, '20260102T000000000000', [entry(2, 'new')])
+    index.sync()
+    assert len(ingested(index)) == 2
+
+    os.remove(old)
+    index.sync()
+    assert list(ingested(index)) == ['requests-20260102T000000000000']
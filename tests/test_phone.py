@@ -0,0 +1,71 @@
+import pytest
+from bot.phone import (
+    NATIONAL_LENGTHS,
+    PhoneNumberError,
+    normalize_phone,
+    validate_numbers)
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('+12025550123', '+12025550123'),
+    ('+1 (202) 555-0123', '+12025550123'),
+    ('001.202.555.0123', '+12025550123'),
+    ('+44 20 7123 4567', '+442071234567'),
+    ('+39 06 1234 5678', '+390612345678'),
+    ('+49 30 1234567', '+49301234567'),
+    ('+85212345678', '+85212345678'),
+])
+def test_international_numbers(raw, expected):
+    assert normalize_phone(raw, '') == expected
+
+
+@pytest.mark.parametrize('raw', [
+    '2025550123',            # no country code and no default
+    '+1 202 555 012',        # too short for NANP
+    '+1 202 155 0123',       # NANP exchange can't start with 1
+    '+44 20 7123 45',        # too short for the UK
+    '+1234',                 # below the E.164 minimum
+    '+1234567890123456',     # above the E.164 maximum
+    '+1 202 555 O123',       # letter O
+    '',
+])
+def test_rejects_malformed_numbers(raw):
+    with pytest.raises(PhoneNumberError):
+        normalize_phone(raw, '')
+
+
+@pytest.mark.parametrize('raw, country_code, expected', [
+    ('(202) 555-0123', '1', '+12025550123'),
+    ('1 202 555 0123', '1', '+12025550123'),
+    ('020 7123 4567', '44', '+442071234567'),
+    ('07123 456789', '44', '+447123456789'),
+    ('030 1234567', '49', '+49301234567'),
+    ('06 30 123 4567', '36', '+36301234567'),
+    ('8 912 345 6789', '7', '+79123456789'),
+    # The 8 of a toll-free number is not a trunk prefix
+    ('800 123 4567', '7', '+78001234567'),
+])
+def test_national_numbers_drop_one_trunk_prefix(raw, country_code, expected):
+    assert normalize_phone(raw, country_code) == expected
+
+
+@pytest.mark.parametrize('raw, country_code, expected', [
+    # Italian landlines keep their leading 0
+    ('06 1234 5678', '39', '+390612345678'),
+    ('612 345 678', '34', '+34612345678'),
+])
+def test_leading_zero_kept_without_trunk_prefix(raw, country_code, expected):
+    assert normalize_phone(raw, country_code) == expected
+
+
+def test_length_table_codes_are_prefix_free():
+    codes = list(NATIONAL_LENGTHS)
+    for code in codes:
+        assert not any(other != code and other.startswith(code) for other in codes), code
+
+
+def test_validate_numbers_deduplicates_and_reports_errors():
+    valid, invalid = validate_numbers(
+        ['+12025550123', '+1 202-555-0123', 'not a number', '+44 20 7123 4567'], '')
+    assert valid == ['+12025550123', '+442071234567']
+    assert list(invalid) == ['not a number']
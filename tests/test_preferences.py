@@ -0,0 +1,156 @@
+import time
+import json
+import pytest
+from bot.preferences import (
+    CompactPreferenceStore,
+    SQLitePreferenceStore,
+    migrate_json_languages)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'preferences.db')
+
+
+def compact(db_path, **kwargs) -> CompactPreferenceStore:
+    kwargs.setdefault('ttl', 0)
+    return CompactPreferenceStore(SQLitePreferenceStore(db_path), **kwargs)
+
+
+def wait_for_merge(store: CompactPreferenceStore):
+    merger = store._merger
+    if merger is not None:
+        merger.join()
+
+
+def test_lookups_before_and_after_merge(db_path):
+    store = compact(db_path, merge_threshold=3)
+    store.set_language(30, 'es')
+    store.set_language(10, 'fr')
+    assert store.get_language(10) == 'fr'
+    assert store.get_language(20) is None
+
+    store.set_language(20, 'de')
+    wait_for_merge(store)
+    ids, codes, recent, merging = store._state
+    assert list(ids) == [10, 20, 30]
+    assert not recent and not merging
+    assert [store.get_language(user_id) for user_id in (10, 20, 30)] == ['fr', 'de', 'es']
+    store.close()
+
+
+def test_merge_overwrites_existing_users(db_path):
+    store = compact(db_path, merge_threshold=2)
+    store.set_language(1, 'en')
+    store.set_language(2, 'en')
+    wait_for_merge(store)
+    store.set_language(2, 'ja')
+    store.set_language(3, 'ko')
+    wait_for_merge(store)
+    assert list(store._state[0]) == [1, 2, 3]
+    assert [store.get_language(user_id) for user_id in (1, 2, 3)] == ['en', 'ja', 'ko']
+    store.close()
+
+
+def test_failed_merge_keeps_changes(db_path, monkeypatch):
+    store = compact(db_path, merge_threshold=1)
+
+    def failing_merge(*args):
+        raise MemoryError('no room')
+
+    monkeypatch.setattr(CompactPreferenceStore, '_merged_arrays', staticmethod(failing_merge))
+    store.set_language(5, 'it')
+    wait_for_merge(store)
+    assert store.get_language(5) == 'it'
+    assert store._state[2] == {5: store._code_index['it']}
+    store.close()
+
+
+def test_loads_existing_rows_from_the_store(db_path):
+    backing = SQLitePreferenceStore(db_path)
+    for user_id, language in ((3, 'pt'), (1, 'en'), (2, 'pt')):
+        backing.set_language(user_id, language)
+    backing.close()
+
+    store = compact(db_path)
+    assert list(store._state[0]) == [1, 2, 3]
+    assert store.get_language(2) == 'pt'
+    store.close()
+
+
+def test_snapshot_round_trip_catches_up_with_the_store(db_path, tmp_path):
+    snapshot = str(tmp_path / 'preferences.snapshot')
+    store = compact(db_path, snapshot_path=snapshot)
+    store.set_language(1, 'en')
+    store.set_language(2, 'fr')
+    store.close()
+
+    # A change made while no compact store was running is read on startup
+    time.sleep(0.01)
+    other = SQLitePreferenceStore(db_path)
+    other.set_language(3, 'de')
+    other.close()
+
+    reopened = compact(db_path, snapshot_path=snapshot)
+    assert [reopened.get_language(user_id) for user_id in (1, 2, 3)] == ['en', 'fr', 'de']
+    reopened.close()
+
+
+def test_unreadable_snapshot_falls_back_to_the_store(db_path, tmp_path):
+    snapshot = tmp_path / 'preferences.snapshot'
+    snapshot.write_bytes(b'not a snapshot')
+    backing = SQLitePreferenceStore(db_path)
+    backing.set_language(9, 'nl')
+    backing.close()
+
+    store = compact(db_path, snapshot_path=str(snapshot))
+    assert store.get_language(9) == 'nl'
+    store.close()
+
+
+def test_ttl_refresh_runs_in_the_background(db_path, monkeypatch):
+    store = compact(db_path, ttl=0.05)
+    other = SQLitePreferenceStore(db_path)
+    other.set_language(42, 'sv')
+
+    # Lookups never query SQLite themselves
+    reads = []
+    iter_languages = store.store.iter_languages
+
+    def counting_iter_languages(**kwargs):
+        reads.append(kwargs)
+        return iter_languages(**kwargs)
+
+    monkeypatch.setattr(store.store, 'iter_languages', counting_iter_languages)
+    assert store.get_language(42) is None
+    assert reads == []
+
+    deadline = time.monotonic() + 2
+    while store.get_language(42) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.get_language(42) == 'sv'
+    assert reads
+
+    store.close()
+    assert not store._syncer
+    other.close()
+
+
+def test_no_sync_thread_without_ttl(db_path):
+    store = compact(db_path, ttl=0)
+    assert store._syncer is None
+    store.close()
+
+
+def test_migration_keeps_corrupt_json(db_path, tmp_path):
+    store = SQLitePreferenceStore(db_path)
+    legacy = tmp_path / 'user_languages.json'
+    legacy.write_text('{not json')
+    assert migrate_json_languages(store, str(legacy)) == 0
+    assert legacy.exists()
+
+    legacy.write_text(json.dumps({'7': 'es'}))
+    assert migrate_json_languages(store, str(legacy)) == 1
+    assert not legacy.exists()
+    assert store.get_language(7) == 'es'
+    store.close()
@@ -0,0 +1,69 @@
+import pytest
+from bot.prompting import (
+    MIN_PROMPT_BUDGET,
+    MIN_QUESTION_TOKENS,
+    SHORT_SYSTEM_PROMPT,
+    SYSTEM_PROMPT,
+    TRIM_MARKER,
+    build_prompt,
+    check_prompt_budget,
+    classify_question,
+    count_tokens,
+    truncate_to_tokens)
+
+LONG_QUESTION = "Tell me about your features and " + "how does the weather work " * 80 + "END?"
+
+
+@pytest.mark.parametrize('question, profile', [
+    ("Write a poem about the sea", 'creative'),
+    ("Explain how vaccines work", 'explain'),
+    ("What is the capital of France?", 'factual'),
+    ("I had a long day at work", 'general'),
+])
+def test_classify_question(question, profile):
+    assert classify_question(question) == profile
+
+
+def test_long_what_questions_are_not_factual():
+    assert classify_question("What " + "really long question " * 10) == 'general'
+
+
+@pytest.mark.parametrize('question, full', [
+    ("What can you do?", True),
+    ("How do I use /sms?", True),
+    ("Hi Jarvis", True),
+    ("What is the capital of France?", False),
+    ("How do phone calls work?", False),
+])
+def test_full_system_prompt_only_for_questions_about_the_bot(question, full):
+    system = build_prompt(question)['messages'][0]['content']
+    assert system.startswith(SYSTEM_PROMPT if full else SHORT_SYSTEM_PROMPT)
+
+
+def test_truncate_keeps_beginning_and_end():
+    trimmed = truncate_to_tokens(LONG_QUESTION, 50)
+    assert count_tokens(trimmed) <= 50
+    assert trimmed.startswith("Tell me") and trimmed.endswith("END?")
+    assert TRIM_MARKER in trimmed
+    assert truncate_to_tokens("short", 50) == "short"
+
+
+def test_prompt_stays_within_budget():
+    prompt = build_prompt(LONG_QUESTION, 300)
+    assert prompt['prompt_tokens'] <= 300
+    assert prompt['messages'][1]['content'].endswith("END?")
+
+
+@pytest.mark.parametrize('budget', [MIN_PROMPT_BUDGET, 40, 10])
+def test_question_keeps_its_reserve_under_tiny_budgets(budget):
+    prompt = build_prompt(LONG_QUESTION, budget)
+    question = prompt['messages'][1]['content']
+    assert question.startswith("Tell me") and question.endswith("END?")
+    # Trimming may land a few tokens short of the reserve, never near zero
+    assert MIN_QUESTION_TOKENS * 0.9 <= count_tokens(question)
+
+
+def test_check_prompt_budget():
+    check_prompt_budget(MIN_PROMPT_BUDGET)
+    with pytest.raises(ValueError):
+        check_prompt_budget(MIN_PROMPT_BUDGET - 1)
@@ -0,0 +1,167 @@
+import time
+import asyncio
+import pytest
+from bot import scheduler as scheduler_module
+from bot.scheduler import (
+    JobScheduler,
+    MAX_SCHEDULE_SECONDS,
+    extract_schedule_args,
+    parse_duration)
+
+
+@pytest.fixture
+def job_scheduler(tmp_path):
+    jobs = JobScheduler(str(tmp_path / 'jobs.db'))
+    yield jobs
+    if jobs._db is not None:
+        jobs._db.close()
+
+
+def run_steps(jobs: JobScheduler, steps: int = 1):
+    async def steps_on_loop():
+        jobs._wakeup = asyncio.Event()
+        for _ in range(steps):
+            await jobs._step()
+        if jobs._inflight:
+            await asyncio.gather(*jobs._inflight)
+
+    asyncio.run(steps_on_loop())
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ('45s', 45), ('30m', 1800), ('2h', 7200), ('1d', 86400), ('1W', 604800)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+@pytest.mark.parametrize('value', ['', '10', 'm', '1.5h', '-1d', '3y'])
+def test_parse_duration_rejects_malformed(value):
+    with pytest.raises(ValueError):
+        parse_duration(value)
+
+
+def test_extract_schedule_args_strips_flags():
+    args, run_at, interval = extract_schedule_args(['Wake', 'up', '--in', '2h', '--every', '1d'])
+    assert args == ['Wake', 'up']
+    assert interval == 86400
+    assert run_at == pytest.approx(time.time() + 7200, abs=5)
+
+
+def test_extract_schedule_args_without_flags():
+    assert extract_schedule_args(['hello']) == (['hello'], None, None)
+
+
+@pytest.mark.parametrize('args', [
+    ['--in'],
+    ['--at', '09:00', '--in', '1h'],
+    ['--every', '1s'],
+])
+def test_extract_schedule_args_rejects_bad_combinations(args):
+    with pytest.raises(ValueError):
+        extract_schedule_args(['hi'] + args)
+
+
+@pytest.mark.parametrize('args', [
+    ['--in', '99999999999w'],
+    ['--every', '99999999999999w'],
+    ['--at', '9999-01-01T00:00'],
+])
+def test_extract_schedule_args_rejects_overflowing_times(args):
+    with pytest.raises(ValueError):
+        extract_schedule_args(['hi'] + args)
+
+
+@pytest.mark.parametrize('run_at, interval', [
+    (1e20, None),
+    (time.time() + 60, 10 ** 20),
+    (time.time() + 60, MAX_SCHEDULE_SECONDS + 1),
+])
+def test_add_job_rejects_unstorable_jobs(job_scheduler, run_at, interval):
+    with pytest.raises(ValueError):
+        job_scheduler.add_job('sms', run_at, {'phone': '+12025550123'}, interval=interval)
+    assert job_scheduler.pending_count() == 0
+    assert job_scheduler._heap == []
+
+
+def test_heap_orders_jobs_by_run_time(job_scheduler):
+    now = time.time()
+    late = job_scheduler.add_job('sms', now + 300, {'phone': '+1'})
+    early = job_scheduler.add_job('sms', now + 60, {'phone': '+1'})
+    assert job_scheduler._heap[0] == (now + 60, early)
+    assert {late, early} == {job_id for _, job_id in job_scheduler._heap}
+
+
+def test_due_job_is_dispatched_once_and_deleted(job_scheduler, monkeypatch):
+    sent = []
+
+    async def dispatch(payload):
+        sent.append(payload)
+        return 'sent'
+
+    monkeypatch.setitem(scheduler_module.JOB_DISPATCHERS, 'sms', dispatch)
+    job_scheduler.add_job('sms', time.time() - 1, {'phone': '+1'})
+    run_steps(job_scheduler)
+    assert sent == [{'phone': '+1'}]
+    assert job_scheduler.pending_count() == 0
+
+
+def test_recurring_job_skips_missed_occurrences(job_scheduler, monkeypatch):
+    async def dispatch(payload):
+        return 'sent'
+
+    monkeypatch.setitem(scheduler_module.JOB_DISPATCHERS, 'sms', dispatch)
+    now = time.time()
+    # Due 10.5 intervals ago: the next run is the first one still in the future
+    job_id = job_scheduler.add_job(
+        'sms', now - 3600 * 10.5, {'phone': '+1'}, user_id=7, interval=3600)
+    run_steps(job_scheduler)
+
+    [job] = job_scheduler.list_jobs(7)
+    assert job['id'] == job_id
+    assert now < job['run_at'] <= now + 3600
+    assert job_scheduler._heap == [(job['run_at'], job_id)]
+
+
+def test_cancelled_job_is_not_dispatched(job_scheduler, monkeypatch):
+    sent = []
+
+    async def dispatch(payload):
+        sent.append(payload)
+        return 'sent'
+
+    monkeypatch.setitem(scheduler_module.JOB_DISPATCHERS, 'sms', dispatch)
+    job_id = job_scheduler.add_job('sms', time.time() - 1, {'phone': '+1'}, user_id=7)
+    assert not job_scheduler.cancel_job(job_id, user_id=8)
+    assert job_scheduler.cancel_job(job_id, user_id=7)
+    run_steps(job_scheduler)
+    assert sent == []
+
+
+def test_dispatch_loop_survives_errors(job_scheduler, monkeypatch):
+    sent = []
+
+    async def dispatch(payload):
+        sent.append(payload)
+        return 'sent'
+
+    monkeypatch.setitem(scheduler_module.JOB_DISPATCHERS, 'sms', dispatch)
+    job_scheduler.poll_interval = 0.01
+    job_scheduler.add_job('sms', time.time() - 1, {'phone': '+1'})
+    step = job_scheduler._step
+    failures = []
+
+    async def flaky_step():
+        if not failures:
+            failures.append(True)
+            raise RuntimeError('database is locked')
+        await step()
+
+    monkeypatch.setattr(job_scheduler, '_step', flaky_step)
+
+    async def run_briefly():
+        await job_scheduler.start(None)
+        await asyncio.sleep(0.2)
+        await job_scheduler.stop()
+
+    asyncio.run(run_briefly())
+    assert failures and sent == [{'phone': '+1'}]
@@ -0,0 +1,139 @@
+import os
+import json
+import pytest
+from bot import suggestions
+from bot.logstore import SegmentedLog
+from bot.suggestions import (
+    SuggestionClusters,
+    band_buckets,
+    minhash,
+    normalize,
+    similarity,
+    BANDS)
+
+
+@pytest.fixture
+def clusters(tmp_path):
+    store = SuggestionClusters(str(tmp_path / 'clusters.db'))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def log(tmp_path):
+    directory = tmp_path / 'suggestions'
+    directory.mkdir()
+    return SegmentedLog(str(directory), 'suggestions')
+
+
+def write_segment(log: SegmentedLog, day: int, messages: list) -> str:
+    path = os.path.join(log.directory, f"suggestions-202601{day:02d}T000000000000.jsonl")
+    with open(path, 'a') as f:
+        for user_id, message in enumerate(messages):
+            f.write(json.dumps({
+                'timestamp': f'2026-01-{day:02d}T12:00:00',
+                'user_id': user_id,
+                'message': message
+            }) + '\n')
+    return path
+
+
+def test_normalize_ignores_case_digits_and_punctuation():
+    assert normalize('Book a FLIGHT to Paris on the 12th!!') == normalize('book a flight to paris on the 31th')
+
+
+def test_similarity_of_near_duplicates():
+    first = minhash('can you book a flight to paris for me')
+    assert similarity(first, minhash('can you book a flight to paris for me please')) > 0.6
+    assert similarity(first, minhash('what is the weather like in tokyo today')) < 0.3
+    assert len(band_buckets(first)) == BANDS
+
+
+def test_near_duplicates_share_a_cluster(clusters):
+    first = clusters.add(1, 'can you book a flight to paris for me')
+    assert clusters.add(2, 'Can you book a flight to Paris for me?') == first
+    assert clusters.add(3, 'what is the weather like in tokyo today') != first
+
+    top = clusters.top(1)[0]
+    assert (top['id'], top['count'], top['users']) == (first, 2, 2)
+    assert clusters.totals() == {'clusters': 2, 'suggestions': 3}
+
+
+def test_backfill_clusters_each_logged_entry_once(clusters, log):
+    write_segment(log, 1, ['order me a pizza', 'translate this song'])
+    write_segment(log, 2, ['play some music'])
+    assert clusters.backfill(log) == 3
+    assert clusters.totals()['suggestions'] == 3
+    # Later calls are no-ops
+    assert clusters.backfill(log) == 0
+
+
+def test_failed_backfill_resumes_without_double_counting(clusters, log, monkeypatch):
+    write_segment(log, 1, [f'first segment suggestion {word}' for word in ('alpha', 'beta', 'gamma')])
+    write_segment(log, 2, [f'second segment idea {word}' for word in ('delta', 'epsilon')])
+    backfill_entry = clusters._backfill_entry
+    calls = []
+
+    def failing_entry(*args):
+        calls.append(args)
+        if len(calls) == 4:
+            raise OSError('disk error')
+        return backfill_entry(*args)
+
+    monkeypatch.setattr(clusters, '_backfill_entry', failing_entry)
+    with pytest.raises(OSError):
+        clusters.backfill(log)
+    assert clusters.totals()['suggestions'] == 3
+
+    monkeypatch.setattr(clusters, '_backfill_entry', backfill_entry)
+    assert clusters.backfill(log) == 2
+    assert clusters.totals()['suggestions'] == 5
+
+
+def test_backfill_resumes_after_retention_removes_a_segment(clusters, log, monkeypatch):
+    old = write_segment(log, 1, [f'old segment request {word}' for word in ('one', 'two', 'three')])
+    write_segment(log, 2, [f'new segment request {word}' for word in ('four', 'five', 'six')])
+    backfill_entry = clusters._backfill_entry
+    calls = []
+
+    def failing_entry(*args):
+        calls.append(args)
+        if len(calls) == 5:
+            raise OSError('disk error')
+        return backfill_entry(*args)
+
+    monkeypatch.setattr(clusters, '_backfill_entry', failing_entry)
+    with pytest.raises(OSError):
+        clusters.backfill(log)
+    assert clusters.totals()['suggestions'] == 4
+
+    # Positions are per segment, so deleting the oldest one shifts nothing
+    os.remove(old)
+    monkeypatch.setattr(clusters, '_backfill_entry', backfill_entry)
+    assert clusters.backfill(log) == 2
+    assert clusters.totals()['suggestions'] == 6
+
+
+def test_failed_backfill_is_not_cached(tmp_path, log, monkeypatch):
+    write_segment(log, 1, ['order me a pizza'])
+    monkeypatch.setattr(suggestions, '_clusters', None)
+    monkeypatch.setattr(suggestions, 'SUGGESTION_DB', str(tmp_path / 'shared.db'))
+    monkeypatch.setattr(suggestions, 'get_log', lambda name: log)
+    backfill = SuggestionClusters.backfill
+    failures = []
+
+    def failing_backfill(self, source):
+        if not failures:
+            failures.append(True)
+            raise OSError('corrupt segment')
+        return backfill(self, source)
+
+    monkeypatch.setattr(SuggestionClusters, 'backfill', failing_backfill)
+    with pytest.raises(OSError):
+        suggestions.get_suggestion_clusters()
+    assert suggestions._clusters is None
+
+    store = suggestions.get_suggestion_clusters()
+    assert store.totals()['suggestions'] == 1
+    assert suggestions.get_suggestion_clusters() is store
+    store.close()